@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ProjectsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'projects'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from django.db.models.signals import post_migrate
+        from softdesk_api import metrics, sqlite
+        from . import signals
+
+        post_migrate.connect(signals.ensure_search_triggers, sender=self)
+        connection_created.connect(sqlite.apply_pragmas)
+        connection_created.connect(metrics.instrument_connection)
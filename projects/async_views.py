@@ -0,0 +1,197 @@
+"""
+Vues asynchrones (ASGI) en lecture seule pour les projets, issues et commentaires.
+
+Sous ASGI, les viewsets DRF synchrones s'exécutent chacun dans un thread via
+``sync_to_async``. Ces vues font tout le travail dans la boucle d'événements :
+authentification JWT (``aauthenticate``), appartenance au projet
+(``ais_contributor``), pagination (``acount`` / ``async for``) et lectures
+(``aget``). Elles renvoient le même JSON que les viewsets : les listes sont
+lues en ``values()`` comme dans ``ValuesListMixin``, les détails sérialisés
+avec les mêmes serializers (les relations sont des clés primaires : aucune requête).
+"""
+import asyncio
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.core.exceptions import ObjectDoesNotExist
+from django.core.handlers.asgi import ASGIRequest
+from django.http import JsonResponse, StreamingHttpResponse
+from rest_framework.exceptions import APIException, NotAuthenticated, PermissionDenied
+from rest_framework.request import Request
+
+from users.authentication import CachedJWTAuthentication
+from . import events
+from .membership import ais_contributor
+from .models import Project, Issue, Comment
+from .pagination import AsyncPageNumberPagination
+from .serializers import (
+    ProjectSerializer, IssueSerializer, CommentSerializer,
+    ProjectValuesSerializer, IssueValuesSerializer, CommentValuesSerializer,
+)
+from .views import ProjectViewSet, IssueViewSet, CommentViewSet
+
+
+def async_api_view(view):
+    """Authentifie la requête et traduit les exceptions DRF en réponses JSON."""
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return JsonResponse({'detail': f'Method "{request.method}" not allowed.'}, status=405)
+        authenticator = CachedJWTAuthentication()
+        try:
+            result = await authenticator.aauthenticate(request)
+            if result is None:
+                raise NotAuthenticated()
+            user, _ = result
+            return await view(Request(request), user, *args, **kwargs)
+        except ObjectDoesNotExist as exc:
+            model_name = type(exc).__qualname__.split('.')[0]
+            return JsonResponse({'detail': f"No {model_name} matches the given query."}, status=404)
+        except APIException as exc:
+            response = JsonResponse({'detail': exc.detail}, status=exc.status_code)
+            if exc.status_code == 401:
+                response['WWW-Authenticate'] = authenticator.authenticate_header(request)
+            return response
+    return wrapper
+
+
+async def require_contributor(request, user, project_pk):
+    # Comme IsContributor : 403 aussi pour un projet inexistant
+    if not await ais_contributor(request, project_pk, user=user):
+        raise PermissionDenied()
+
+
+async def paginated(request, queryset, serializer_class):
+    paginator = AsyncPageNumberPagination()
+    queryset = queryset.values(*serializer_class.get_columns())
+    page = await paginator.apaginate_queryset(queryset, request)
+    data = serializer_class(page).data
+    return JsonResponse(paginator.get_paginated_data(data))
+
+
+def project_queryset():
+    return Project.objects.filter(deleting=False).order_by('id').only(*ProjectViewSet.read_only_fields)
+
+
+def issue_queryset(project_pk):
+    return (
+        Issue.objects.filter(project_id=project_pk).order_by('created_time', 'id')
+        .only(*IssueViewSet.read_only_fields)
+    )
+
+
+def comment_queryset(project_pk, issue_pk):
+    return (
+        Comment.objects.filter(issue_id=issue_pk, issue__project_id=project_pk)
+        .order_by('-created_time', '-id').only(*CommentViewSet.read_only_fields)
+    )
+
+
+@async_api_view
+async def project_list(request, user):
+    return await paginated(request, project_queryset(), ProjectValuesSerializer)
+
+
+@async_api_view
+async def project_detail(request, user, pk):
+    project = await project_queryset().aget(pk=pk)
+    return JsonResponse(ProjectSerializer(project).data)
+
+
+@async_api_view
+async def issue_list(request, user, project_pk):
+    await require_contributor(request, user, project_pk)
+    return await paginated(request, issue_queryset(project_pk), IssueValuesSerializer)
+
+
+@async_api_view
+async def issue_detail(request, user, project_pk, pk):
+    await require_contributor(request, user, project_pk)
+    issue = await issue_queryset(project_pk).aget(pk=pk)
+    return JsonResponse(IssueSerializer(issue).data)
+
+
+@async_api_view
+async def comment_list(request, user, project_pk, issue_pk):
+    await require_contributor(request, user, project_pk)
+    return await paginated(request, comment_queryset(project_pk, issue_pk), CommentValuesSerializer)
+
+
+@async_api_view
+async def comment_detail(request, user, project_pk, issue_pk, pk):
+    await require_contributor(request, user, project_pk)
+    comment = await comment_queryset(project_pk, issue_pk).aget(pk=pk)
+    return JsonResponse(CommentSerializer(comment).data)
+
+
+def last_event_id(request):
+    """Position de reprise : en-tête ``Last-Event-ID`` (ou ``?last_event_id=``), -1 si invalide."""
+    value = request.META.get('HTTP_LAST_EVENT_ID') or request.query_params.get('last_event_id')
+    if not value:
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        return -1
+
+
+async def event_stream(backend, subscription, history):
+    loop = asyncio.get_running_loop()
+    try:
+        yield f"retry: {events.setting('RETRY_MS', 3000)}\n\n"
+        last_id = None
+        if history is None:
+            # Historique insuffisant : le client se resynchronise par changes/
+            yield 'event: reset\ndata: {}\n\n'
+        for event in history or ():
+            yield events.format_event(event)
+            last_id = event.id
+
+        # Flux fermé après MAX_AGE : la reconnexion revérifie l'appartenance
+        deadline = loop.time() + events.setting('MAX_AGE', 300)
+        keepalive = events.setting('KEEPALIVE', 15)
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event = await subscription.get(min(keepalive, remaining))
+            except TimeoutError:
+                yield ': keepalive\n\n'
+                continue
+            if event is events.OVERFLOW:
+                break
+            if last_id is not None and event.id <= last_id:
+                continue  # déjà envoyé avec l'historique
+            yield events.format_event(event)
+            last_id = event.id
+            if event.type == 'project.deleted':
+                break
+    finally:
+        backend.hub.unsubscribe(subscription)
+
+
+@async_api_view
+async def project_events(request, user, project_pk):
+    """
+    Flux SSE de l'activité du projet (voir ``projects.events``). Aucune
+    requête ni aucun thread n'est utilisé tant qu'il ne se passe rien.
+
+    ASGI seulement : sous WSGI, Django lit un itérateur asynchrone en entier
+    avant d'envoyer la réponse, le client ne recevrait rien avant la fermeture
+    du flux. On répond 501 plutôt que de le laisser attendre.
+    """
+    if not isinstance(request._request, ASGIRequest):
+        return JsonResponse({'detail': "Ce flux nécessite un serveur ASGI."}, status=501)
+    await require_contributor(request, user, project_pk)
+    backend = events.get_backend()
+    # Abonnement avant la lecture de l'historique : rien ne se perd entre les deux
+    subscription = backend.hub.subscribe(int(project_pk))
+    try:
+        await sync_to_async(backend.start)()
+        resume = last_event_id(request)
+        history = [] if resume is None else await sync_to_async(backend.history)(int(project_pk), resume)
+    except BaseException:
+        backend.hub.unsubscribe(subscription)
+        raise
+    response = StreamingHttpResponse(event_stream(backend, subscription, history), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx : pas de mise en tampon
+    return response
@@ -0,0 +1,478 @@
+"""
+Banc d'essai reproductible de l'API (utilisé par ``manage.py benchmark``).
+
+1. ``seed()`` remplit la base avec un jeu synthétique déterministe
+   (utilisateurs, projets, contributeurs, issues, commentaires) en ``bulk_create``.
+2. ``SCENARIOS`` décrit au moins une requête par route nommée de l'API
+   (``projects/urls.py``, ``users/urls.py`` et les jetons) ; ``prepare()``
+   crée les objets que les scénarios destructifs consomment, un par appel.
+3. ``measure_queries()`` joue chaque scénario séquentiellement avec le client de
+   test, compte les requêtes SQL et mesure la durée médiane d'un appel seul
+   (comparée aux objectifs de ``LATENCY_TARGETS``) ; ``measure_load()`` le
+   rejoue en concurrence via le gestionnaire ASGI en processus
+   (``AsyncClient``) et mesure latences et débit.
+
+Le résultat est un dict sérialisable en JSON, comparable d'un commit à l'autre
+avec ``compare()``.
+
+``measure_serializers()`` (``manage.py benchmark_serializers``) compare à part
+la sérialisation d'une grande liste d'issues par ``IssueSerializer`` et par
+``IssueValuesSerializer``, et ``measure_payloads()`` (``manage.py
+benchmark_payloads``) la taille transmise et le temps CPU par page des listes
+d'issues et de commentaires selon le rendu JSON et la compression.
+"""
+import asyncio
+import random
+import re
+import statistics
+import tempfile
+import time
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from softdesk_api import compression, renderers
+
+from users.models import CustomUser
+from . import counters, jobs
+from .models import Project, Contributor, Issue, Comment, Job
+from .serializers import IssueSerializer, IssueValuesSerializer
+
+PASSWORD = 'benchmark-password'
+
+DEFAULT_DATASET = {
+    'users': 50,
+    'projects': 10,
+    'contributors': 10,  # par projet, en plus de l'auteur
+    'issues': 200,  # par projet
+    'comments': 5,  # par issue
+}
+
+WORDS = (
+    'crash login export cache timeout mobile backend frontend payment search '
+    'sync notification upload profile settings dashboard report api token error'
+).split()
+
+
+def sentence(rng, words=8):
+    return ' '.join(rng.choice(WORDS) for _ in range(words))
+
+
+def seed(users, projects, contributors, issues, comments, seed=0):
+    """Crée le jeu de données et renvoie le contexte utilisé par les scénarios."""
+    rng = random.Random(seed)
+    password = make_password(PASSWORD)  # un seul hachage pour tous les comptes
+    CustomUser.objects.bulk_create([
+        CustomUser(username=f'bench{i}', email=f'bench{i}@example.com', password=password, age=20 + i % 40)
+        for i in range(users)
+    ])
+    user_ids = list(CustomUser.objects.filter(username__startswith='bench').order_by('id').values_list('id', flat=True))
+    owner = user_ids[0]
+
+    Project.objects.bulk_create([
+        Project(name=f'Projet {i}', description=sentence(rng, 20), type=rng.choice(Project.TYPE_CHOICES)[0],
+                author_id=owner)
+        for i in range(projects)
+    ])
+    project_ids = list(Project.objects.filter(author_id=owner).order_by('id').values_list('id', flat=True))
+
+    Contributor.objects.bulk_create([
+        Contributor(project_id=project_id, user_id=user_id)
+        for project_id in project_ids
+        for user_id in [owner] + rng.sample(user_ids[1:], min(contributors, len(user_ids) - 1))
+    ])
+
+    Issue.objects.bulk_create([
+        Issue(
+            title=sentence(rng, 4), description=sentence(rng, 30),
+            tag=rng.choice(Issue.TAG_CHOICES)[0], priority=rng.choice(Issue.PRIORITY_CHOICES)[0],
+            status=rng.choice(Issue.STATUS_CHOICES)[0],
+            project_id=project_id, author_id=owner, assignee_id=rng.choice(user_ids),
+        )
+        for project_id in project_ids
+        for _ in range(issues)
+    ], batch_size=1000)
+    issue_ids = list(Issue.objects.filter(project_id__in=project_ids).order_by('id').values_list('id', flat=True))
+
+    Comment.objects.bulk_create([
+        Comment(issue_id=issue_id, description=sentence(rng, 15), author_id=owner)
+        for issue_id in issue_ids
+        for _ in range(comments)
+    ], batch_size=1000)
+
+    counters.recount_projects(project_ids, touch=False)
+    counters.recount_issues(issue_ids, touch=False)
+
+    project = project_ids[0]
+    project_issues = list(Issue.objects.filter(project_id=project).order_by('id').values_list('id', flat=True))
+    issue = project_issues[0]
+    owner = CustomUser.objects.get(pk=owner)
+    return {
+        'owner': owner,
+        'refresh': str(RefreshToken.for_user(owner)),
+        'user_ids': user_ids,
+        'project_ids': project_ids,
+        'project': project,
+        'contributor': Contributor.objects.values_list('id', flat=True).get(project_id=project, user_id=owner.pk),
+        'issue': issue,
+        'comment': Comment.objects.filter(issue_id=issue).order_by('id').values_list('id', flat=True).first(),
+        # Issues supprimées par le scénario DELETE, une par appel
+        'disposable_issues': project_issues[1:],
+    }
+
+
+def prepare(ctx, calls):
+    """
+    Ajoute au contexte ce que consomment les scénarios destructifs (``calls``
+    objets chacun) et une tâche d'export terminée pour ``jobs-download``.
+    L'export est écrit dans ``SOFTDESK_EXPORT_DIR``.
+    """
+    owner, member = ctx['owner'].pk, ctx['user_ids'][1]
+    Project.objects.bulk_create([
+        Project(name=f'Jetable {i}', description='d', type='BACKEND', author_id=owner)
+        for i in range(2 * calls)
+    ])
+    disposable = list(Project.objects.filter(name__startswith='Jetable ').order_by('id').values_list('id', flat=True))
+    Contributor.objects.bulk_create([
+        Contributor(project_id=project_id, user_id=user_id)
+        for project_id in disposable
+        for user_id in (owner, member)
+    ])
+    # Projets supprimés par ``projects-destroy`` ; les autres gardent leurs contributeurs
+    # pour ``project-contributors-create`` et ``-destroy``
+    ctx['disposable_projects'] = disposable[:calls]
+    ctx['scratch_contributors'] = list(
+        Contributor.objects.filter(project_id__in=disposable[calls:], user_id=member)
+        .order_by('project_id').values_list('project_id', 'id')
+    )
+
+    Comment.objects.bulk_create([
+        Comment(issue_id=ctx['issue'], description=f'Jetable {i}', author_id=owner) for i in range(calls)
+    ])
+    ctx['disposable_comments'] = list(
+        Comment.objects.filter(issue_id=ctx['issue'], description__startswith='Jetable ')
+        .order_by('id').values_list('id', flat=True)
+    )
+    counters.recount_issues([ctx['issue']], touch=False)
+
+    job = jobs.enqueue(Job.EXPORT_PROJECT, ctx['project'], ctx['owner'], output='ndjson')
+    jobs.run(jobs.claim('benchmark'))
+    ctx['job'] = job.pk
+    return ctx
+
+
+def issue_payload(ctx, i):
+    return {
+        'title': f'Bench {i}', 'description': 'Créée par le banc d\'essai', 'tag': 'TASK',
+        'priority': 'LOW', 'assignee': ctx['owner'].pk,
+    }
+
+
+# (nom de route, méthode, chemin, corps) ; chemin et corps reçoivent (ctx, i)
+SCENARIOS = [
+    ('users-list', 'get', lambda c, i: '/api/users/', None),
+    ('users-detail', 'get', lambda c, i: f"/api/users/{c['user_ids'][i % len(c['user_ids'])]}/", None),
+    ('users-create', 'post', lambda c, i: '/api/users/', lambda c, i: {
+        'username': f'created{i}', 'password': PASSWORD, 'age': 30,
+    }),
+    ('token_obtain_pair', 'post', lambda c, i: '/api/token/', lambda c, i: {
+        'username': c['owner'].username, 'password': PASSWORD,
+    }),
+    ('token_refresh', 'post', lambda c, i: '/api/token/refresh/', lambda c, i: {'refresh': c['refresh']}),
+    ('api-root', 'get', lambda c, i: '/api/', None),
+    ('projects-list', 'get', lambda c, i: '/api/projects/', None),
+    ('projects-membership', 'get',
+     lambda c, i: f"/api/projects/membership/?ids={','.join(map(str, c['project_ids']))}", None),
+    ('projects-detail', 'get', lambda c, i: f"/api/projects/{c['project']}/", None),
+    ('projects-create', 'post', lambda c, i: '/api/projects/', lambda c, i: {
+        'name': f'Bench {i}', 'description': 'd', 'type': 'BACKEND',
+    }),
+    ('projects-partial-update', 'patch',
+     lambda c, i: f"/api/projects/{c['project']}/", lambda c, i: {'description': f'Révision {i}'}),
+    ('projects-destroy', 'delete', lambda c, i: f"/api/projects/{c['disposable_projects'][i]}/", None),
+    ('projects-export', 'get', lambda c, i: f"/api/projects/{c['project']}/export/", None),
+    ('projects-stats', 'get', lambda c, i: f"/api/projects/{c['project']}/stats/", None),
+    ('projects-rebuild-counters', 'post', lambda c, i: f"/api/projects/{c['project']}/rebuild-counters/", None),
+    ('my-work-list', 'get', lambda c, i: '/api/my-work/', None),
+    ('jobs-list', 'get', lambda c, i: '/api/jobs/', None),
+    ('jobs-detail', 'get', lambda c, i: f"/api/jobs/{c['job']}/", None),
+    ('jobs-download', 'get', lambda c, i: f"/api/jobs/{c['job']}/download/", None),
+    ('project-contributors-list', 'get', lambda c, i: f"/api/projects/{c['project']}/contributors/", None),
+    ('project-contributors-detail', 'get',
+     lambda c, i: f"/api/projects/{c['project']}/contributors/{c['contributor']}/", None),
+    ('project-contributors-create', 'post',
+     lambda c, i: f"/api/projects/{c['scratch_contributors'][i][0]}/contributors/",
+     lambda c, i: {'user': c['user_ids'][2]}),
+    ('project-contributors-destroy', 'delete',
+     lambda c, i: "/api/projects/{}/contributors/{}/".format(*c['scratch_contributors'][i]), None),
+    ('project-contributors-bulk', 'post', lambda c, i: f"/api/projects/{c['project']}/contributors/bulk/",
+     lambda c, i: c['user_ids'][1:]),
+    ('project-issues-list', 'get', lambda c, i: f"/api/projects/{c['project']}/issues/?page_size=100", None),
+    ('project-issues-list-cursor', 'get',
+     lambda c, i: f"/api/projects/{c['project']}/issues/?pagination=cursor&page_size=100", None),
+    ('project-issues-detail', 'get', lambda c, i: f"/api/projects/{c['project']}/issues/{c['issue']}/", None),
+    ('project-issues-create', 'post', lambda c, i: f"/api/projects/{c['project']}/issues/", issue_payload),
+    ('project-issues-partial-update', 'patch',
+     lambda c, i: f"/api/projects/{c['project']}/issues/{c['issue']}/", lambda c, i: {'status': 'IN_PROGRESS'}),
+    ('project-issues-destroy', 'delete',
+     lambda c, i: f"/api/projects/{c['project']}/issues/{c['disposable_issues'][i]}/", None),
+    ('project-issues-bulk', 'post', lambda c, i: f"/api/projects/{c['project']}/issues/bulk/",
+     lambda c, i: [issue_payload(c, i * 100 + n) for n in range(100)]),
+    ('project-changes-list', 'get', lambda c, i: f"/api/projects/{c['project']}/changes/", None),
+    ('project-search-list', 'get', lambda c, i: f"/api/projects/{c['project']}/search/?q=crash", None),
+    ('project-search-list-prefix', 'get',
+     lambda c, i: f"/api/projects/{c['project']}/search/?q=crash+lo", None),
+    ('issue-comments-list', 'get',
+     lambda c, i: f"/api/projects/{c['project']}/issues/{c['issue']}/comments/", None),
+    ('issue-comments-detail', 'get',
+     lambda c, i: f"/api/projects/{c['project']}/issues/{c['issue']}/comments/{c['comment']}/", None),
+    ('issue-comments-create', 'post', lambda c, i: f"/api/projects/{c['project']}/issues/{c['issue']}/comments/",
+     lambda c, i: {'description': f'Commentaire {i}'}),
+    ('issue-comments-partial-update', 'patch',
+     lambda c, i: f"/api/projects/{c['project']}/issues/{c['issue']}/comments/{c['comment']}/",
+     lambda c, i: {'description': f'Révision {i}'}),
+    ('issue-comments-destroy', 'delete',
+     lambda c, i: f"/api/projects/{c['project']}/issues/{c['issue']}/comments/{c['disposable_comments'][i]}/", None),
+    ('async-projects-list', 'get', lambda c, i: '/api/async/projects/', None),
+    ('async-projects-detail', 'get', lambda c, i: f"/api/async/projects/{c['project']}/", None),
+    ('async-project-issues-list', 'get',
+     lambda c, i: f"/api/async/projects/{c['project']}/issues/?page_size=100", None),
+    ('async-project-issues-detail', 'get',
+     lambda c, i: f"/api/async/projects/{c['project']}/issues/{c['issue']}/", None),
+    ('async-issue-comments-list', 'get',
+     lambda c, i: f"/api/async/projects/{c['project']}/issues/{c['issue']}/comments/", None),
+    ('async-issue-comments-detail', 'get',
+     lambda c, i: f"/api/async/projects/{c['project']}/issues/{c['issue']}/comments/{c['comment']}/", None),
+    # Sous WSGI (comptage séquentiel) le flux répond 501 ; en charge (ASGI), ``run()``
+    # ramène sa durée à zéro : l'appel mesure l'ouverture et le rejeu de l'historique
+    ('async-project-events', 'get', lambda c, i: f"/api/async/projects/{c['project']}/events/", None),
+]
+
+
+# Objectifs en millisecondes pour un appel seul (médiane en séquentiel : sous
+# charge, la latence inclut l'attente derrière les autres appels)
+LATENCY_TARGETS = {
+    'project-search-list': 50,
+    'project-search-list-prefix': 50,
+}
+
+
+def percentile(values, q):
+    """Percentile par rang le plus proche sur une liste triée."""
+    if not values:
+        return None
+    index = max(0, min(len(values) - 1, round(q / 100 * len(values)) - 1))
+    return values[index]
+
+
+def select_scenarios(pattern=None):
+    return [s for s in SCENARIOS if pattern is None or re.search(pattern, s[0])]
+
+
+def auth_headers(ctx):
+    return {'Authorization': f"Bearer {AccessToken.for_user(ctx['owner'])}"}
+
+
+def build_request(scenario, ctx, i):
+    name, method, path, body = scenario
+    return method, path(ctx, i), body(ctx, i) if body else None
+
+
+def request_kwargs(data, headers=None):
+    kwargs = {} if headers is None else {'headers': headers}
+    if data is not None:
+        kwargs.update(data=data, content_type='application/json')
+    return kwargs
+
+
+def measure_queries(scenarios, ctx, samples, offsets):
+    """Nombre médian de requêtes SQL et durée médiane par appel, en séquentiel."""
+    client = Client(headers=auth_headers(ctx))
+    results = {}
+    for scenario in scenarios:
+        name = scenario[0]
+        counts, durations, statuses = [], [], set()
+        for _ in range(samples):
+            method, path, data = build_request(scenario, ctx, offsets[name])
+            offsets[name] += 1
+            with CaptureQueriesContext(connection) as captured:
+                start = time.perf_counter()
+                response = getattr(client, method)(path, **request_kwargs(data))
+                if getattr(response, 'streaming', False):
+                    b''.join(response.streaming_content)
+                durations.append(time.perf_counter() - start)
+            counts.append(len(captured.captured_queries))
+            statuses.add(response.status_code)
+        results[name] = {
+            'queries': statistics.median(counts),
+            'status': sorted(statuses),
+            'sequential_ms': round(statistics.median(durations) * 1000, 3),
+        }
+        if name in LATENCY_TARGETS:
+            results[name]['target_ms'] = LATENCY_TARGETS[name]
+            results[name]['target_met'] = results[name]['sequential_ms'] < LATENCY_TARGETS[name]
+    return results
+
+
+async def _load(scenario, ctx, total, concurrency, offsets, headers):
+    client = AsyncClient()
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies, errors = [], 0
+    name = scenario[0]
+    requests = []
+    for _ in range(total):
+        requests.append(build_request(scenario, ctx, offsets[name]))
+        offsets[name] += 1
+
+    async def one(method, path, data):
+        nonlocal errors
+        async with semaphore:
+            start = time.perf_counter()
+            response = await getattr(client, method)(path, **request_kwargs(data, headers))
+            if getattr(response, 'streaming', False):
+                content = response.streaming_content
+                if hasattr(content, '__aiter__'):
+                    async for _ in content:
+                        pass
+                else:
+                    # Comme le gestionnaire ASGI de Django pour un itérateur synchrone
+                    await sync_to_async(list)(content)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code >= 400:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one(*request) for request in requests))
+    return latencies, errors, time.perf_counter() - start
+
+
+def measure_load(scenarios, ctx, total, concurrency, offsets):
+    headers = auth_headers(ctx)
+    results = {}
+    for scenario in scenarios:
+        latencies, errors, elapsed = asyncio.run(_load(scenario, ctx, total, concurrency, offsets, headers))
+        latencies.sort()
+        results[scenario[0]] = {
+            'requests': len(latencies),
+            'errors': errors,
+            'throughput': round(len(latencies) / elapsed, 2),
+            'mean_ms': round(statistics.fmean(latencies) * 1000, 3),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+            'p99_ms': round(percentile(latencies, 99) * 1000, 3),
+        }
+    return results
+
+
+def run(dataset, requests, concurrency, query_samples, pattern=None, seed_value=0):
+    with tempfile.TemporaryDirectory() as directory, \
+            override_settings(SOFTDESK_EXPORT_DIR=directory, SOFTDESK_EVENTS_MAX_AGE=0):
+        ctx = prepare(seed(**dataset, seed=seed_value), requests + query_samples)
+        scenarios = select_scenarios(pattern)
+        offsets = {scenario[0]: 0 for scenario in scenarios}
+        queries = measure_queries(scenarios, ctx, query_samples, offsets)
+        load = measure_load(scenarios, ctx, requests, concurrency, offsets)
+    results = {}
+    for scenario in scenarios:
+        name, method, path, _ = scenario
+        results[name] = {'method': method.upper(), **queries[name], **load[name]}
+    return results
+
+
+def compare(baseline, current, metric='p95_ms'):
+    """Lignes (scénario, avant, après, variation %) pour une métrique."""
+    rows = []
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name, {}).get(metric)
+        after = result.get(metric)
+        change = None
+        if before and after is not None:
+            change = round((after - before) / before * 100, 1)
+        rows.append((name, before, after, change))
+    return rows
+
+
+def timed(function, repeat):
+    """Durée médiane en millisecondes et dernier résultat."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        durations.append(time.perf_counter() - start)
+    return round(statistics.median(durations) * 1000, 3), result
+
+
+def measure_serializers(project_id, repeat=5):
+    """
+    Sérialisation de toutes les issues d'un projet : lignes déjà chargées
+    (``serialize``) puis lecture comprise (``fetch_serialize``), pour le
+    ``ModelSerializer`` et pour la version ``values()``.
+    """
+    from .views import IssueViewSet
+
+    queryset = Issue.objects.filter(project_id=project_id).order_by('created_time', 'id')
+    instances = queryset.only(*IssueViewSet.read_only_fields)
+    rows = queryset.values(*IssueValuesSerializer.get_columns())
+    loaded_instances, loaded_rows = list(instances), list(rows)
+
+    model_ms, model_data = timed(lambda: IssueSerializer(loaded_instances, many=True).data, repeat)
+    values_ms, values_data = timed(lambda: IssueValuesSerializer(loaded_rows).data, repeat)
+    model_total_ms, _ = timed(lambda: IssueSerializer(list(instances.all()), many=True).data, repeat)
+    values_total_ms, _ = timed(lambda: IssueValuesSerializer(list(rows.all())).data, repeat)
+    return {
+        'issues': len(loaded_rows),
+        'identical': list(model_data) == values_data,
+        'serialize': {'model_ms': model_ms, 'values_ms': values_ms},
+        'fetch_serialize': {'model_ms': model_total_ms, 'values_ms': values_total_ms},
+    }
+
+
+PAYLOAD_SCENARIOS = [
+    ('project-issues-list', lambda c: f"/api/projects/{c['project']}/issues/?page_size=100"),
+    ('issue-comments-list', lambda c: f"/api/projects/{c['project']}/issues/{c['issue']}/comments/?page_size=100"),
+]
+
+
+def cpu_ms(function, repeat):
+    """Temps CPU médian du processus en millisecondes et dernier résultat."""
+    durations = []
+    for _ in range(repeat):
+        start = time.process_time()
+        result = function()
+        durations.append(time.process_time() - start)
+    return round(statistics.median(durations) * 1000, 3), result
+
+
+def measure_payloads(ctx, repeat=20):
+    """
+    Par liste (``page_size=100``) : taille et CPU du rendu JSON (``json`` de
+    DRF, ``orjson``), de chaque compression, puis de la requête complète selon
+    ``Accept-Encoding`` (octets réellement transmis).
+    """
+    client = Client(headers=auth_headers(ctx))
+    json_renderers = {'json': JSONRenderer()}
+    if renderers.orjson is not None:
+        json_renderers['orjson'] = renderers.FastJSONRenderer()
+    encodings = compression.available_encodings()
+
+    results = {}
+    for name, path in PAYLOAD_SCENARIOS:
+        url = path(ctx)
+        data = client.get(url).data
+        rows = []
+        for variant, renderer in json_renderers.items():
+            ms, body = cpu_ms(lambda: renderer.render(data), repeat)
+            rows.append({'step': 'render', 'variant': variant, 'bytes': len(body), 'cpu_ms': ms})
+        for encoding in encodings:
+            ms, compressed = cpu_ms(lambda: compression.ENCODERS[encoding](body), repeat)
+            rows.append({'step': 'compress', 'variant': encoding, 'bytes': len(compressed), 'cpu_ms': ms})
+        for encoding in ['identity', *encodings]:
+            ms, response = cpu_ms(lambda: client.get(url, headers={'Accept-Encoding': encoding}), repeat)
+            rows.append({'step': 'request', 'variant': encoding, 'bytes': len(response.content), 'cpu_ms': ms})
+        results[name] = rows
+    return results
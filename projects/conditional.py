@@ -0,0 +1,81 @@
+"""
+GET conditionnels (ETag / Last-Modified) pour les viewsets du projet.
+
+Détail : les validateurs sont calculés par une requête d'agrégat
+(``MAX(updated_time)`` et ``COUNT``) limitée à l'objet, sans le charger ni
+le sérialiser : une requête qui correspond reçoit un 304.
+
+Listes : l'ETag est l'empreinte de la page servie (``response.data``, qui
+vient du cache des réponses quand il est chaud). Aucune requête en plus :
+un agrégat sur le queryset entier parcourrait toute la table à chaque page,
+y compris en pagination par curseur et sur un succès du cache. Les listes
+n'ont pas de ``Last-Modified`` : une suppression (ou un retrait de
+contributeur) ne change pas ``MAX(updated_time)``.
+"""
+import hashlib
+import json
+from functools import partial
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+
+class ConditionalGetMixin:
+    conditional_field = 'updated_time'
+
+    def get_validators(self, queryset):
+        state = queryset.order_by().aggregate(last=Max(self.conditional_field), count=Count('pk'))
+        last_modified = state['last']
+        # La représentation dépend de l'URL (page, filtres) et de l'utilisateur
+        seed = '|'.join([
+            self.request.get_full_path(),
+            str(self.request.user.pk),
+            last_modified.isoformat() if last_modified else '',
+            str(state['count']),
+        ])
+        etag = quote_etag(hashlib.md5(seed.encode(), usedforsecurity=False).hexdigest())
+        # À la seconde, comme l'en-tête HTTP renvoyé par le client
+        return etag, int(last_modified.timestamp()) if last_modified else None
+
+    def conditional(self, queryset, render):
+        etag, last_modified = self.get_validators(queryset)
+        not_modified = get_conditional_response(
+            self.request._request, etag=etag, last_modified=last_modified
+        )
+        if not_modified is not None:
+            return not_modified
+        response = render()
+        if response.status_code == 200:
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        response = super().list(request, *args, **kwargs)
+        if response.status_code != 200:
+            return response
+        # La représentation dépend aussi du format négocié
+        seed = json.dumps(
+            [request.accepted_renderer.format, response.data], cls=DjangoJSONEncoder, sort_keys=True,
+        )
+        etag = quote_etag(hashlib.md5(seed.encode(), usedforsecurity=False).hexdigest())
+        not_modified = get_conditional_response(request._request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+        response['ETag'] = etag
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        render = partial(super().retrieve, request, *args, **kwargs)
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            queryset = self.filter_queryset(self.get_queryset()).filter(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+            return self.conditional(queryset, render)
+        except (TypeError, ValueError):
+            # Identifiant invalide : retrieve() répondra 404
+            return render()
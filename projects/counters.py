@@ -0,0 +1,119 @@
+"""
+Compteurs dénormalisés : ``Project.issue_count``, ``Project.open_issue_count``
+et ``Issue.comment_count``.
+
+Les écritures unitaires les ajustent par ``F()`` depuis les signaux (voir
+``signals.py``). Les chemins en masse (``bulk_create``, ``bulk_update``,
+``QuerySet.delete()``) ne passent pas par ces ajustements : ils appellent
+``recount_projects`` / ``recount_issues``, qui recalculent les valeurs en une
+seule requête UPDATE à partir des index. ``rebuild`` (commande
+``rebuild_counters``, job ``rebuild-counters``) recalcule tout et ne réécrit
+que les lignes dont un compteur était faux.
+
+Modifier un compteur change la représentation de l'objet : ``updated_time``
+est donc avancé aussi, pour les ETag et la synchronisation incrémentale.
+"""
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import response_cache
+from .models import Project, Issue, Comment
+
+OPEN_ISSUES = ~Q(status='FINISHED')
+
+
+def is_open(status):
+    return status != 'FINISHED'
+
+
+def adjust_project(project_id, issues=0, open_issues=0):
+    changes = {'updated_time': timezone.now()}
+    if issues:
+        changes['issue_count'] = F('issue_count') + issues
+    if open_issues:
+        changes['open_issue_count'] = F('open_issue_count') + open_issues
+    if len(changes) > 1:
+        Project.objects.filter(pk=project_id).update(**changes)
+
+
+def adjust_issue(issue_id, comments):
+    Issue.objects.filter(pk=issue_id).update(
+        comment_count=F('comment_count') + comments, updated_time=timezone.now()
+    )
+
+
+def _project_counts():
+    issues = Issue.objects.filter(project=OuterRef('pk')).values('project')
+    return {
+        'issue_count': Coalesce(
+            Subquery(issues.annotate(n=Count('pk')).values('n'), output_field=IntegerField()),
+            Value(0),
+        ),
+        'open_issue_count': Coalesce(
+            Subquery(
+                issues.filter(OPEN_ISSUES).annotate(n=Count('pk')).values('n'),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        ),
+    }
+
+
+def _issue_counts():
+    comments = Comment.objects.filter(issue=OuterRef('pk')).values('issue')
+    return {
+        'comment_count': Coalesce(
+            Subquery(comments.annotate(n=Count('pk')).values('n'), output_field=IntegerField()),
+            Value(0),
+        ),
+    }
+
+
+def recount_projects(project_ids=None, touch=True):
+    queryset = Project.objects.all() if project_ids is None else Project.objects.filter(pk__in=project_ids)
+    changes = _project_counts()
+    if touch:
+        changes['updated_time'] = timezone.now()
+    return queryset.update(**changes)
+
+
+def recount_issues(issue_ids=None, touch=True):
+    queryset = Issue.objects.all() if issue_ids is None else Issue.objects.filter(pk__in=issue_ids)
+    changes = _issue_counts()
+    if touch:
+        changes['updated_time'] = timezone.now()
+    return queryset.update(**changes)
+
+
+def _changed(queryset, counts):
+    """Lignes dont un compteur stocké diffère du recalcul."""
+    differs = Q()
+    for name in counts:
+        differs |= ~Q(**{name: F(f'fresh_{name}')})
+    stale = queryset.alias(**{f'fresh_{name}': expression for name, expression in counts.items()}).filter(differs)
+    return queryset.filter(pk__in=stale.values('pk'))
+
+
+def rebuild(project_ids=None):
+    """
+    Recalcule les compteurs de tous les projets (ou de ``project_ids``). Seules
+    les lignes corrigées changent d'``updated_time`` : leur ETag change, celui
+    des autres reste valable. Renvoie le nombre de projets et d'issues corrigés.
+    """
+    projects, issues = Project.objects.all(), Issue.objects.all()
+    if project_ids is not None:
+        projects, issues = projects.filter(pk__in=project_ids), issues.filter(project_id__in=project_ids)
+    with transaction.atomic():
+        projects, issues = _changed(projects, _project_counts()), _changed(issues, _issue_counts())
+        affected = set(projects.values_list('pk', flat=True))
+        affected.update(issues.order_by().values_list('project_id', flat=True).distinct())
+        now = timezone.now()
+        fixed_issues = issues.update(**_issue_counts(), updated_time=now)
+        fixed_projects = projects.update(**_project_counts(), updated_time=now)
+        if affected:
+            response_cache.invalidate(
+                response_cache.PROJECTS, *[response_cache.project_scope(pk) for pk in affected]
+            )
+    return fixed_projects, fixed_issues
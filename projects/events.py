@@ -0,0 +1,243 @@
+"""
+Événements d'activité des projets, diffusés en Server-Sent Events par
+``async_views.project_events`` (``GET /api/async/projects/<id>/events/``).
+
+Les signaux publient, après le commit, ``issue.created``, ``issue.updated``,
+``issue.deleted``, les mêmes pour ``comment.*`` et ``project.deleted``.
+Chaque événement porte un identifiant croissant : un client qui se
+reconnecte avec ``Last-Event-ID`` reçoit d'abord ce qu'il a manqué, ou
+``reset`` si l'historique ne remonte plus assez loin (il se resynchronise
+alors par ``changes/``).
+
+Dans un processus, ``Hub`` répartit les événements entre les flux ouverts :
+chaque flux a sa file ``asyncio`` et le hub y dépose les événements par
+``call_soon_threadsafe``, depuis n'importe quel thread. Un flux inactif ne
+coûte donc rien au serveur, au lieu d'une requête de polling par client.
+
+Le backend (``SOFTDESK_EVENTS_BACKEND``) fournit identifiants et historique :
+
+- ``MemoryBackend`` (défaut) : un seul processus, historique en mémoire des
+  ``SOFTDESK_EVENTS_HISTORY`` derniers événements par projet ;
+- ``DatabaseBackend`` : plusieurs workers. Les événements sont écrits dans
+  ``ActivityEvent`` et un thread par worker lit les nouveaux toutes les
+  ``SOFTDESK_EVENTS_POLL_INTERVAL`` secondes, tant qu'un flux est ouvert :
+  une requête indexée par worker au lieu d'une par client.
+"""
+import asyncio
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from softdesk_api.renderers import FastJSONRenderer
+from .models import ActivityEvent
+from .serializers import IssueChangeSerializer, CommentChangeSerializer
+
+Event = namedtuple('Event', 'id project_id type data')
+
+# Déposé dans la file d'un flux trop lent : il est fermé, le client se
+# reconnecte et rattrape son retard par l'historique
+OVERFLOW = object()
+
+
+def setting(name, default):
+    return getattr(settings, f'SOFTDESK_EVENTS_{name}', default)
+
+
+def format_event(event):
+    """Bloc SSE ``id`` / ``event`` / ``data`` (JSON sur une ligne)."""
+    data = FastJSONRenderer().render(event.data).decode()
+    return f'id: {event.id}\nevent: {event.type}\ndata: {data}\n\n'
+
+
+class Subscription:
+    def __init__(self, project_id, loop, maxsize):
+        self.project_id = project_id
+        self.loop = loop
+        self.queue = asyncio.Queue(maxsize)
+        self.overflowed = False
+
+    def offer(self, event):
+        # Exécuté dans la boucle du flux
+        if self.overflowed:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            while not self.queue.empty():
+                self.queue.get_nowait()
+            self.queue.put_nowait(OVERFLOW)
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+
+class Hub:
+    """Flux ouverts dans ce processus, par projet."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = {}
+
+    def subscribe(self, project_id):
+        subscription = Subscription(project_id, asyncio.get_running_loop(), setting('QUEUE_SIZE', 1000))
+        with self._lock:
+            self._subscriptions.setdefault(project_id, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.project_id, set())
+            subscriptions.discard(subscription)
+            if not subscriptions:
+                self._subscriptions.pop(subscription.project_id, None)
+
+    def has_subscriptions(self):
+        with self._lock:
+            return bool(self._subscriptions)
+
+    def dispatch(self, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(event.project_id, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.offer, event)
+            except RuntimeError:
+                # Boucle fermée : le flux n'existe plus
+                self.unsubscribe(subscription)
+
+
+class MemoryBackend:
+    """Un seul processus : identifiants et historique en mémoire."""
+
+    def __init__(self):
+        self.hub = Hub()
+        self._lock = threading.Lock()
+        # Identifiants croissants d'un redémarrage à l'autre : un Last-Event-ID
+        # d'avant le redémarrage est reconnu comme trop ancien
+        self._first_id = time.time_ns() // 1000
+        self._last_id = self._first_id
+        self._history = {}
+        self._dropped = {}  # projet -> dernier identifiant sorti de l'historique
+
+    def publish(self, project_id, type, data):
+        size = setting('HISTORY', 1000)
+        with self._lock:
+            self._last_id += 1
+            event = Event(self._last_id, project_id, type, data)
+            history = self._history.setdefault(project_id, deque())
+            history.append(event)
+            while len(history) > size:
+                self._dropped[project_id] = history.popleft().id
+        self.hub.dispatch(event)
+        return event
+
+    def start(self):
+        pass
+
+    def history(self, project_id, after_id):
+        """Événements postérieurs à ``after_id`` ; ``None`` s'ils ne sont plus tous connus."""
+        with self._lock:
+            if not self._first_id <= after_id <= self._last_id:
+                return None
+            if after_id < self._dropped.get(project_id, self._first_id):
+                return None
+            return [event for event in self._history.get(project_id, ()) if event.id > after_id]
+
+
+class DatabaseBackend:
+    """Plusieurs workers : journal ``ActivityEvent`` lu par un thread par worker."""
+
+    def __init__(self):
+        self.hub = Hub()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._last_id = 0
+        self._pruned_at = 0.0
+
+    def publish(self, project_id, type, data):
+        event = ActivityEvent.objects.create(project_id=project_id, type=type, data=data)
+        if time.monotonic() - self._pruned_at > 60:
+            self.prune()
+        return Event(event.pk, project_id, type, data)
+
+    def prune(self):
+        self._pruned_at = time.monotonic()
+        limit = timezone.now() - timedelta(seconds=setting('RETENTION', 3600))
+        ActivityEvent.objects.filter(created_time__lt=limit).delete()
+
+    def start(self):
+        """Démarre le thread de lecture s'il ne tourne pas (appelé à chaque abonnement)."""
+        with self._lock:
+            if self._thread is not None:
+                return
+            # Position de départ fixée avant la lecture de l'historique du flux
+            self._last_id = ActivityEvent.objects.aggregate(last=Max('id'))['last'] or 0
+            self._thread = threading.Thread(target=self.run, name='softdesk-events', daemon=True)
+            self._thread.start()
+
+    def run(self):
+        try:
+            while True:
+                with self._lock:
+                    if not self.hub.has_subscriptions():
+                        self._thread = None
+                        return
+                self.poll()
+                time.sleep(setting('POLL_INTERVAL', 0.5))
+        finally:
+            connection.close()
+
+    def poll(self):
+        rows = ActivityEvent.objects.filter(id__gt=self._last_id).order_by('id')[:500]
+        for row in rows:
+            self.hub.dispatch(Event(row.pk, row.project_id, row.type, row.data))
+            self._last_id = row.pk
+
+    def history(self, project_id, after_id):
+        first = ActivityEvent.objects.aggregate(first=Min('id'))['first']
+        if first is not None and after_id < first - 1:
+            return None  # purgé
+        limit = setting('HISTORY', 1000)
+        rows = list(ActivityEvent.objects.filter(project_id=project_id, id__gt=after_id).order_by('id')[:limit + 1])
+        if len(rows) > limit:
+            return None
+        return [Event(row.pk, row.project_id, row.type, row.data) for row in rows]
+
+
+_backends = {}
+_backends_lock = threading.Lock()
+
+
+def get_backend():
+    path = setting('BACKEND', 'projects.events.MemoryBackend')
+    with _backends_lock:
+        if path not in _backends:
+            _backends[path] = import_string(path)()
+        return _backends[path]
+
+
+def reset_backends():
+    with _backends_lock:
+        _backends.clear()
+
+
+def publish(project_id, type, data):
+    """Publie après le commit : un flux ne voit jamais une écriture annulée."""
+    data = dict(data)
+    transaction.on_commit(lambda: get_backend().publish(int(project_id), type, data))
+
+
+def publish_issue(issue, type):
+    publish(issue.project_id, type, IssueChangeSerializer(issue).data)
+
+
+def publish_comment(comment, project_id, type):
+    publish(project_id, type, CommentChangeSerializer(comment).data)
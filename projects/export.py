@@ -0,0 +1,122 @@
+"""
+Export en flux (NDJSON ou CSV) des issues d'un projet et de leurs commentaires.
+
+Les lignes sont lues par ``values()`` + ``iterator()`` : aucune instance de
+modèle n'est construite et la mémoire reste constante quelle que soit la taille
+du projet. Les issues (triées par id) et les commentaires (triés par issue puis
+id) sont parcourus en parallèle, comme une jointure par fusion, pour émettre
+chaque issue suivie de ses commentaires en deux requêtes seulement.
+
+Les deux lectures se font sur la même base et dans une même transaction
+(``REPEATABLE READ`` sous PostgreSQL, où ``READ COMMITTED`` donnerait un
+instantané par requête) : une écriture concurrente ne peut pas produire un
+commentaire sans son issue. Sous SQLite, la transaction de lecture ne bloque
+pas les écritures en mode WAL (profil ``production``).
+
+Sous ASGI, un itérateur synchrone serait lu en entier par Django avant
+l'envoi : ``aiter_chunks`` en fait un itérateur asynchrone.
+"""
+import csv
+import itertools
+
+from asgiref.sync import sync_to_async
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections, router, transaction
+
+from .models import Issue, Comment
+
+CHUNK_SIZE = 2000
+ASYNC_BATCH = 200  # morceaux produits par passage dans le thread des vues synchrones
+
+ISSUE_FIELDS = [
+    'id', 'title', 'description', 'tag', 'priority', 'status',
+    'author_id', 'assignee_id', 'created_time', 'updated_time',
+]
+COMMENT_FIELDS = ['id', 'issue_id', 'description', 'author_id', 'created_time', 'updated_time']
+
+CSV_COLUMNS = [
+    'type', 'id', 'issue_id', 'title', 'description', 'tag', 'priority', 'status',
+    'author_id', 'assignee_id', 'created_time', 'updated_time',
+]
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+def iter_rows(project_id, chunk_size=CHUNK_SIZE):
+    """Produit des dicts ``{'type': 'issue'|'comment', ...}`` : chaque issue puis ses commentaires."""
+    # Une seule base pour les deux lectures (le routeur alterne entre réplicas)
+    using = router.db_for_read(Issue)
+    connection = connections[using]
+    # Le niveau d'isolation ne se choisit qu'en tête de transaction
+    repeatable_read = connection.vendor == 'postgresql' and not connection.in_atomic_block
+    with transaction.atomic(using=using):
+        if repeatable_read:
+            with connection.cursor() as cursor:
+                cursor.execute('SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY')
+        issues = (
+            Issue.objects.using(using).filter(project_id=project_id).order_by('id')
+            .values(*ISSUE_FIELDS).iterator(chunk_size=chunk_size)
+        )
+        comments = (
+            Comment.objects.using(using).filter(issue__project_id=project_id).order_by('issue_id', 'id')
+            .values(*COMMENT_FIELDS).iterator(chunk_size=chunk_size)
+        )
+        comment = next(comments, None)
+        for issue in issues:
+            yield {'type': 'issue', **issue}
+            while comment is not None and comment['issue_id'] <= issue['id']:
+                if comment['issue_id'] == issue['id']:
+                    yield {'type': 'comment', **comment}
+                comment = next(comments, None)
+
+
+async def aiter_chunks(chunks, batch=ASYNC_BATCH):
+    """
+    Itérateur asynchrone sur un flux synchrone. Les lots sont produits par
+    ``sync_to_async`` (thread des vues synchrones de la requête) : la
+    connexion, donc la transaction de ``iter_rows``, reste la même d'un lot à
+    l'autre. Le flux est fermé dans ce même thread, même si le client part.
+    """
+    chunks = iter(chunks)
+    next_batch = sync_to_async(lambda: list(itertools.islice(chunks, batch)))
+    try:
+        while True:
+            produced = await next_batch()
+            if not produced:
+                return
+            for chunk in produced:
+                yield chunk
+    finally:
+        if hasattr(chunks, 'close'):
+            await sync_to_async(chunks.close)()
+
+
+def iter_ndjson(rows):
+    encoder = DjangoJSONEncoder()
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+class _Echo:
+    """Pseudo-fichier pour ``csv.writer`` : renvoie la ligne au lieu de l'écrire."""
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.DictWriter(_Echo(), fieldnames=CSV_COLUMNS, extrasaction='ignore')
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow({
+            key: value.isoformat() if hasattr(value, 'isoformat') else value
+            for key, value in row.items()
+        })
+
+
+RENDERERS = {
+    'ndjson': iter_ndjson,
+    'csv': iter_csv,
+}
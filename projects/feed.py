@@ -0,0 +1,112 @@
+"""
+Fil « mon travail » (``GET /api/my-work/``) : les issues dont l'utilisateur est
+assignee ou auteur, tous projets confondus, par activité décroissante
+(``updated_time``, ``id``), avec leurs derniers commentaires.
+
+Une page coûte quatre requêtes quelle que soit la taille des projets :
+
+1. et 2. une requête par rôle, chacune servie par son index
+   (``assignee_id`` ou ``author_id``, ``updated_time``, ``id``) et limitée à
+   ``limit + 1`` lignes ; les deux listes sont fusionnées en Python. Un OR
+   sur les deux colonnes obligerait la base à trier toutes les issues de
+   l'utilisateur à chaque page.
+3. les noms des projets de la page, en une lecture groupée ;
+4. les ``comments`` derniers commentaires de chaque issue de la page
+   (``ROW_NUMBER()`` par issue, index ``comment_issue_created_idx``).
+
+La pagination est par curseur (keyset) : le curseur opaque contient la
+position ``(updated_time, id)`` de la dernière issue de la page.
+"""
+import base64
+import binascii
+
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+from django.utils.dateparse import parse_datetime
+
+from . import membership
+from .models import Project, Issue, Comment
+from .serializers import IssueFeedValuesSerializer, CommentValuesSerializer
+
+ROLES = {'assignee': 'assignee_id', 'author': 'author_id'}
+
+
+def encode_cursor(updated_time, pk):
+    return base64.urlsafe_b64encode(f'{updated_time.isoformat()}|{pk}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """``(updated_time, id)`` ; ``ValueError`` pour un curseur invalide."""
+    try:
+        updated_time, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+    except (binascii.Error, UnicodeError, ValueError):
+        raise ValueError(cursor)
+    position = parse_datetime(updated_time)
+    if position is None:
+        raise ValueError(cursor)
+    return position, int(pk)
+
+
+def issue_rows(user_id, roles, position, limit):
+    """
+    ``limit + 1`` issues au plus, les plus récemment modifiées d'abord : une
+    requête par rôle, puis fusion sans doublon (auteur et assignee à la fois).
+    Les ``limit + 1`` premières de l'union sont parmi les ``limit + 1``
+    premières de leur rôle : la fusion est exacte.
+    """
+    columns = IssueFeedValuesSerializer.get_columns()
+    projects = membership.member_project_filter(user_id, field='project_id')
+    rows = {}
+    for role in roles:
+        queryset = Issue.objects.filter(**{ROLES[role]: user_id}, **projects)
+        if position is not None:
+            updated_time, pk = position
+            # Borne sur updated_time d'abord, pour un parcours d'index borné
+            queryset = queryset.filter(
+                Q(updated_time__lte=updated_time), Q(updated_time__lt=updated_time) | Q(id__lt=pk),
+            )
+        for row in queryset.order_by('-updated_time', '-id').values(*columns)[:limit + 1]:
+            rows[row['id']] = row
+    return sorted(rows.values(), key=lambda row: (row['updated_time'], row['id']), reverse=True)[:limit + 1]
+
+
+def project_names(project_ids):
+    return dict(Project.objects.filter(pk__in=project_ids).values_list('id', 'name'))
+
+
+def recent_comments(issue_ids, per_issue):
+    """Les ``per_issue`` derniers commentaires de chaque issue, en une requête."""
+    if not per_issue or not issue_ids:
+        return {}
+    rows = (
+        Comment.objects.filter(issue_id__in=issue_ids)
+        .annotate(rank=Window(
+            RowNumber(), partition_by=[F('issue_id')], order_by=[F('created_time').desc(), F('id').desc()],
+        ))
+        .filter(rank__lte=per_issue)
+        .order_by('issue_id', '-created_time', '-id')
+        .values(*CommentValuesSerializer.get_columns(), 'issue_id')
+    )
+    rows = list(rows)
+    comments = {}
+    for row, data in zip(rows, CommentValuesSerializer(rows).data):
+        comments.setdefault(row['issue_id'], []).append(data)
+    return comments
+
+
+def page(user, roles, cursor, limit, comments):
+    """Éléments de la page et curseur de la suivante (``None`` en fin de fil)."""
+    rows = issue_rows(user.pk, roles, cursor, limit)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    names = project_names({row['project_id'] for row in rows})
+    latest = recent_comments([row['id'] for row in rows], comments)
+
+    items = []
+    for row, data in zip(rows, IssueFeedValuesSerializer(rows).data):
+        data['project'] = {'id': row['project_id'], 'name': names.get(row['project_id'])}
+        data['roles'] = [role for role, column in ROLES.items() if row[column] == user.pk]
+        data['recent_comments'] = latest.get(row['id'], [])
+        items.append(data)
+    next_cursor = encode_cursor(rows[-1]['updated_time'], rows[-1]['id']) if has_more else None
+    return items, next_cursor
@@ -0,0 +1,216 @@
+"""
+File de tâches en base pour les opérations longues, exécutée par
+``manage.py run_jobs``.
+
+La file est la table ``Job`` : pas de dépendance supplémentaire, et les
+tâches survivent aux redémarrages. Un worker réserve une tâche par un
+``UPDATE ... WHERE status = 'queued'`` conditionnel (portable : SQLite comme
+PostgreSQL) et signale son activité à chaque lot (``heartbeat_time``) ; une
+tâche sans signe de vie depuis ``stale_after`` secondes est remise en file.
+
+Les gestionnaires travaillent par lots, chacun dans sa propre transaction :
+le verrou d'écriture SQLite n'est jamais tenu longtemps, et une tâche
+interrompue reprend là où elle s'était arrêtée.
+"""
+import logging
+import os
+import socket
+import traceback
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import F
+from django.db.models.deletion import Collector
+from django.utils import timezone
+
+from . import counters, export, response_cache, search
+from .models import Project, Contributor, Issue, Tombstone, Job
+
+logger = logging.getLogger('softdesk.jobs')
+
+HANDLERS = {}
+
+
+def handler(kind):
+    def register(function):
+        HANDLERS[kind] = function
+        return function
+    return register
+
+
+def batch_size():
+    return getattr(settings, 'SOFTDESK_JOB_BATCH_SIZE', 200)
+
+
+def export_dir():
+    return Path(getattr(settings, 'SOFTDESK_EXPORT_DIR', Path(settings.BASE_DIR) / 'exports'))
+
+
+def default_worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def enqueue(kind, project_id=None, user=None, unique=False, **params):
+    """
+    Ajoute une tâche. Avec ``unique``, renvoie la tâche du même type déjà en
+    attente ou en cours sur ce projet au lieu d'en créer une seconde.
+    """
+    if unique:
+        existing = active_job(kind, project_id)
+        if existing is not None:
+            return existing
+    return Job.objects.create(kind=kind, project_id=project_id, created_by=user, params=params)
+
+
+def active_job(kind, project_id):
+    return (
+        Job.objects.filter(kind=kind, project_id=project_id, status__in=[Job.QUEUED, Job.RUNNING])
+        .order_by('id').first()
+    )
+
+
+def requeue_stale(stale_after):
+    """Remet en file les tâches dont le worker ne donne plus signe de vie."""
+    limit = timezone.now() - timedelta(seconds=stale_after)
+    return Job.objects.filter(status=Job.RUNNING, heartbeat_time__lt=limit).update(status=Job.QUEUED, worker='')
+
+
+def claim(worker, candidates=10):
+    """Réserve la plus ancienne tâche en attente ; ``None`` si la file est vide."""
+    ids = Job.objects.filter(status=Job.QUEUED).order_by('id').values_list('id', flat=True)[:candidates]
+    for job_id in ids:
+        now = timezone.now()
+        # Un autre worker a pu la prendre entre-temps : l'UPDATE ne touche alors rien
+        claimed = Job.objects.filter(pk=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, worker=worker, started_time=now, heartbeat_time=now,
+            attempts=F('attempts') + 1,
+        )
+        if claimed:
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def report(job, progress, total=None):
+    """Avancement et signe de vie, à appeler après chaque lot."""
+    job.progress = progress
+    changes = {'progress': progress, 'heartbeat_time': timezone.now()}
+    if total is not None:
+        job.total = changes['total'] = total
+    Job.objects.filter(pk=job.pk).update(**changes)
+
+
+def run(job):
+    """Exécute une tâche réservée et enregistre son issue (succès, nouvel essai ou échec)."""
+    try:
+        result = HANDLERS[job.kind](job) or {}
+    except Exception:
+        logger.exception("Tâche %s en échec (essai %s)", job, job.attempts)
+        retry = job.attempts < getattr(settings, 'SOFTDESK_JOB_MAX_ATTEMPTS', 3)
+        Job.objects.filter(pk=job.pk).update(
+            status=Job.QUEUED if retry else Job.FAILED, error=traceback.format_exc(), worker='',
+            finished_time=None if retry else timezone.now(),
+        )
+        return False
+    Job.objects.filter(pk=job.pk).update(
+        status=Job.SUCCEEDED, result=result, error='', finished_time=timezone.now(), heartbeat_time=timezone.now(),
+    )
+    return True
+
+
+def mark_deleting(project_id):
+    """
+    Retire le projet de l'API avant sa suppression en tâche de fond : marqué
+    ``deleting`` (listes, détail, gestion des contributeurs) et privé de ses
+    contributeurs, donc de toutes les routes imbriquées en lecture comme en
+    écriture.
+    """
+    with transaction.atomic():
+        Project.objects.filter(pk=project_id).update(deleting=True)
+        # Signaux de Contributor : caches d'appartenance invalidés
+        Contributor.objects.filter(project_id=project_id).delete()
+    response_cache.invalidate_project(project_id)
+
+
+def remove_exports(project_id):
+    """Supprime les fichiers produits par les exports du projet."""
+    results = Job.objects.filter(kind=Job.EXPORT_PROJECT, project_id=project_id).values_list('result', flat=True)
+    for result in results:
+        if result.get('file'):
+            (export_dir() / result['file']).unlink(missing_ok=True)
+
+
+@handler(Job.DELETE_PROJECT)
+def delete_project(job):
+    """
+    Supprime les issues par lots (leurs commentaires suivent en CASCADE), puis
+    le projet. Chaque lot a le projet pour origine, comme une CASCADE : les
+    signaux ne font rien ligne par ligne (ni trace, ni événement, ni compteur,
+    ni invalidation). Seule la suppression finale du projet publie
+    ``project.deleted`` et invalide les caches (signaux de Project).
+    """
+    project_id = job.project_id
+    mark_deleting(project_id)  # tâches mises en file avant l'ajout du marqueur
+    origin = Project(pk=project_id)
+    using = router.db_for_write(Issue)
+    issues = Issue.objects.filter(project_id=project_id)
+    deleted = job.progress  # reprise après interruption
+    report(job, deleted, deleted + issues.count())
+    while True:
+        ids = list(issues.order_by('id').values_list('id', flat=True)[:batch_size()])
+        if not ids:
+            break
+        with transaction.atomic():
+            collector = Collector(using=using, origin=origin)
+            collector.collect(Issue.objects.filter(pk__in=ids))
+            collector.delete()
+        deleted += len(ids)
+        report(job, deleted)
+
+    with transaction.atomic():
+        Project.objects.filter(pk=project_id).delete()
+        Tombstone.objects.filter(project_id=project_id).delete()
+    remove_exports(project_id)
+    return {'deleted_issues': deleted}
+
+
+@handler(Job.EXPORT_PROJECT)
+def export_project(job):
+    """
+    Écrit le fichier d'export. ``iter_rows`` lit dans une seule transaction :
+    l'avancement n'est enregistré qu'à la fin, une écriture dans la table
+    ``Job`` pendant la lecture ne serait visible qu'au commit et changerait
+    la transaction de lecture en écriture.
+    """
+    output = job.params.get('output', 'ndjson')
+    directory = export_dir()
+    directory.mkdir(parents=True, exist_ok=True)
+    filename = f'project-{job.project_id}-job-{job.pk}.{output}'
+    total = Issue.objects.filter(project_id=job.project_id).count()
+    report(job, 0, total)
+
+    issues = 0
+    with open(directory / filename, 'w', encoding='utf-8', newline='') as file:
+        def rows():
+            nonlocal issues
+            for row in export.iter_rows(job.project_id):
+                issues += row['type'] == 'issue'
+                yield row
+        for chunk in export.RENDERERS[output](rows()):
+            file.write(chunk)
+    report(job, issues, issues)
+    return {'file': filename, 'content_type': export.CONTENT_TYPES[output], 'issues': issues}
+
+
+@handler(Job.REBUILD_COUNTERS)
+def rebuild_counters(job):
+    projects, issues = counters.rebuild([job.project_id] if job.project_id else None)
+    return {'projects': projects, 'issues': issues}
+
+
+@handler(Job.REBUILD_SEARCH_INDEX)
+def rebuild_search_index(job):
+    backend = search.get_backend()
+    backend.rebuild(batch_size(), progress=lambda done, total: report(job, done, total))
+    return {'backend': type(backend).__name__}
@@ -0,0 +1,127 @@
+import json
+import platform
+import subprocess
+from pathlib import Path
+
+import django
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+from django.utils import timezone
+
+from projects import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Crée une base de test jetable, la remplit d'un jeu synthétique, joue chaque route "
+        "de l'API en concurrence (ASGI en processus) et rapporte latences p50/p95/p99, débit "
+        "et requêtes SQL par appel. Les résultats JSON se comparent entre commits (--compare)."
+    )
+
+    def add_arguments(self, parser):
+        for name, default in benchmark.DEFAULT_DATASET.items():
+            parser.add_argument(f'--{name}', type=int, default=default)
+        parser.add_argument('--requests', type=int, default=50, help="Appels par scénario")
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--query-samples', type=int, default=3, help="Appels séquentiels pour compter le SQL")
+        parser.add_argument('--only', help="Expression régulière sur les noms de scénario")
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', help="Fichier JSON de résultats")
+        parser.add_argument('--compare', help="Résultats JSON d'un run précédent")
+        parser.add_argument(
+            '--fail-on-target', action='store_true',
+            help="Code de sortie non nul si un scénario dépasse son objectif de latence",
+        )
+
+    def handle(self, *args, **options):
+        dataset = {name: options[name] for name in benchmark.DEFAULT_DATASET}
+        needed = options['requests'] + options['query_samples']
+        if dataset['issues'] - 1 < needed and self.selects_destroy(options['only']):
+            raise CommandError(
+                f"--issues doit dépasser {needed} : le scénario DELETE supprime une issue par appel."
+            )
+
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        for cache in caches.all():
+            cache.clear()
+        try:
+            results = benchmark.run(
+                dataset, options['requests'], options['concurrency'], options['query_samples'],
+                pattern=options['only'], seed_value=options['seed'],
+            )
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        report = {'meta': self.meta(dataset, options), 'results': results}
+        self.print_results(results)
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(report, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {options['output']}"))
+        if options['compare']:
+            baseline = json.loads(Path(options['compare']).read_text())
+            self.print_comparison(baseline, report)
+        missed = self.print_targets(results)
+        if missed and options['fail_on_target']:
+            raise CommandError(f"Objectif de latence dépassé : {', '.join(missed)}")
+
+    @staticmethod
+    def selects_destroy(pattern):
+        return any(name == 'project-issues-destroy' for name, *_ in benchmark.select_scenarios(pattern))
+
+    @staticmethod
+    def meta(dataset, options):
+        try:
+            commit = subprocess.run(
+                ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                cwd=settings.BASE_DIR, check=True,
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            'commit': commit,
+            'date': timezone.now().isoformat(),
+            'dataset': dataset,
+            'requests': options['requests'],
+            'concurrency': options['concurrency'],
+            'database': connection.vendor,
+            'python': platform.python_version(),
+            'django': django.get_version(),
+        }
+
+    def print_results(self, results):
+        self.stdout.write(
+            f"{'scénario':<32}{'méthode':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}"
+            f"{'p99 ms':>10}{'SQL':>6}{'err':>6}"
+        )
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<32}{r['method']:>8}{r['throughput']:>10.1f}{r['p50_ms']:>10.1f}"
+                f"{r['p95_ms']:>10.1f}{r['p99_ms']:>10.1f}{r['queries']:>6g}{r['errors']:>6}"
+            )
+
+    def print_targets(self, results):
+        """Durée d'un appel seul face à ``benchmark.LATENCY_TARGETS`` ; renvoie les scénarios en échec."""
+        missed = []
+        for name, r in results.items():
+            if 'target_ms' not in r:
+                continue
+            style = self.style.SUCCESS if r['target_met'] else self.style.ERROR
+            self.stdout.write(style(f"{name:<32}{r['sequential_ms']:>10.1f} ms (objectif < {r['target_ms']} ms)"))
+            if not r['target_met']:
+                missed.append(name)
+        return missed
+
+    def print_comparison(self, baseline, report):
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"p95 : {baseline['meta'].get('commit')} -> {report['meta'].get('commit')}"
+        ))
+        for name, before, after, change in benchmark.compare(baseline, report):
+            delta = '' if change is None else f'{change:+.1f} %'
+            style = self.style.ERROR if change and change > 10 else self.style.SUCCESS
+            self.stdout.write(style(f"{name:<32}{before or '-':>10}{after:>10}{delta:>10}"))
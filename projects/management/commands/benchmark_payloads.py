@@ -0,0 +1,38 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from projects import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Octets transmis et temps CPU par page (page_size=100) des listes d'issues et de "
+        "commentaires : rendu json/orjson, compression gzip/br, requête complète."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help="Mesures par cas (médiane)")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        for cache in caches.all():
+            cache.clear()
+        try:
+            # Au moins 100 commentaires sur l'issue de référence
+            ctx = benchmark.seed(users=20, projects=1, contributors=5, issues=150, comments=100)
+            results = benchmark.measure_payloads(ctx, options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for name, rows in results.items():
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(f"  {'étape':<10}{'variante':<10}{'octets':>10}{'CPU ms':>10}")
+            for row in rows:
+                self.stdout.write(
+                    f"  {row['step']:<10}{row['variant']:<10}{row['bytes']:>10}{row['cpu_ms']:>10.2f}"
+                )
@@ -0,0 +1,38 @@
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from projects import benchmark
+
+
+class Command(BaseCommand):
+    help = (
+        "Micro-banc d'essai de sérialisation : --issues issues d'un projet (10 000 par défaut) "
+        "sérialisées par IssueSerializer et par IssueValuesSerializer, sur une base de test jetable."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--issues', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=5, help="Mesures par cas (médiane)")
+
+    def handle(self, *args, **options):
+        setup_test_environment()
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        for cache in caches.all():
+            cache.clear()
+        try:
+            ctx = benchmark.seed(users=20, projects=1, contributors=5, issues=options['issues'], comments=0)
+            result = benchmark.measure_serializers(ctx['project'], options['repeat'])
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        self.stdout.write(f"{result['issues']} issues, JSON identique : {'oui' if result['identical'] else 'NON'}")
+        self.stdout.write(f"{'cas':<18}{'ModelSerializer ms':>20}{'values() ms':>14}{'gain':>8}")
+        for name in ('serialize', 'fetch_serialize'):
+            model_ms, values_ms = result[name]['model_ms'], result[name]['values_ms']
+            self.stdout.write(f"{name:<18}{model_ms:>20.1f}{values_ms:>14.1f}{model_ms / values_ms:>7.1f}x")
+        if not result['identical']:
+            self.stderr.write(self.style.ERROR("Les deux serializers ne produisent pas le même JSON."))
@@ -0,0 +1,146 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, close_old_connections, connection, connections
+
+from projects.benchmark import percentile
+from projects.models import Project, Contributor, Issue, Comment
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Débit d'écriture SQLite avec des écrivains concurrents, pour chaque profil de base "
+        "(SOFTDESK_DB_PROFILE). Chaque profil tourne dans un sous-processus sur un fichier "
+        "de base jetable ; chaque écriture est traitée comme une requête HTTP (connexions "
+        "fermées ou conservées selon CONN_MAX_AGE)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--profiles', default='development,production')
+        parser.add_argument('--writers', type=int, default=8, help="Threads écrivains")
+        parser.add_argument('--writes', type=int, default=200, help="Écritures par thread")
+        parser.add_argument('--output', help="Fichier JSON de résultats")
+        parser.add_argument('--run', action='store_true', help="(interne) mesure le profil courant")
+
+    def handle(self, *args, **options):
+        if options['run']:
+            self.stdout.write(json.dumps(self.measure(options['writers'], options['writes'])))
+            return
+
+        results = {}
+        for profile in options['profiles'].split(','):
+            results[profile] = self.run_profile(profile, options['writers'], options['writes'])
+
+        self.stdout.write(
+            f"{'profil':<14}{'journal':>9}{'écritures/s':>13}{'réussies':>10}{'verrouillées':>14}"
+            f"{'p50 ms':>9}{'p95 ms':>9}"
+        )
+        for profile, r in results.items():
+            self.stdout.write(
+                f"{profile:<14}{r['journal_mode']:>9}{r['throughput']:>13.1f}{r['ok']:>10}{r['locked']:>14}"
+                f"{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+            )
+        if options['output']:
+            Path(options['output']).write_text(json.dumps(results, indent=2))
+            self.stdout.write(self.style.SUCCESS(f"Résultats écrits dans {options['output']}"))
+
+    def run_profile(self, profile, writers, writes):
+        with tempfile.TemporaryDirectory(prefix='softdesk-sqlite-') as directory:
+            env = dict(
+                os.environ, SOFTDESK_DB_PROFILE=profile, SOFTDESK_DB_PATH=str(Path(directory) / 'bench.sqlite3'),
+            )
+            process = subprocess.run(
+                [sys.executable, str(Path(settings.BASE_DIR) / 'manage.py'), 'benchmark_sqlite', '--run',
+                 '--writers', str(writers), '--writes', str(writes)],
+                env=env, capture_output=True, text=True,
+            )
+        if process.returncode:
+            raise CommandError(f"Profil {profile} : {process.stderr.strip()}")
+        return json.loads(process.stdout.strip().splitlines()[-1])
+
+    def measure(self, writers, writes):
+        if connection.vendor != 'sqlite':
+            raise CommandError("Ce banc d'essai ne concerne que SQLite.")
+        call_command('migrate', verbosity=0)
+        owner = CustomUser.objects.create_user(username='bench-owner', password='bench-password')
+        project = Project.objects.create(name='Bench', description='d', type='BACKEND', author=owner)
+        Contributor.objects.create(user=owner, project=project)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+        connections.close_all()
+
+        latencies, counts = [], {'ok': 0, 'locked': 0}
+        lock = threading.Lock()
+        start_barrier = threading.Barrier(writers)
+
+        def writer(index):
+            start_barrier.wait()
+            issue, local_latencies, local = None, [], {'ok': 0, 'locked': 0}
+            for i in range(writes):
+                close_old_connections()  # comme au début d'une requête HTTP
+                started = time.perf_counter()
+                try:
+                    issue = self.write(i, index, owner, project, issue)
+                    local['ok'] += 1
+                except OperationalError as exc:
+                    if 'locked' not in str(exc):
+                        raise
+                    local['locked'] += 1
+                finally:
+                    local_latencies.append(time.perf_counter() - started)
+                    close_old_connections()  # comme à la fin d'une requête HTTP
+            connections.close_all()
+            with lock:
+                latencies.extend(local_latencies)
+                for key in counts:
+                    counts[key] += local[key]
+
+        threads = [threading.Thread(target=writer, args=(index,)) for index in range(writers)]
+        started = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        latencies.sort()
+        return {
+            'profile': settings.SOFTDESK_DB_PROFILE,
+            'journal_mode': journal_mode,
+            'writers': writers,
+            'writes': writers * writes,
+            **counts,
+            'seconds': round(elapsed, 3),
+            'throughput': round(counts['ok'] / elapsed, 1),
+            'p50_ms': round(percentile(latencies, 50) * 1000, 3),
+            'p95_ms': round(percentile(latencies, 95) * 1000, 3),
+        }
+
+    @staticmethod
+    def write(i, index, owner, project, issue):
+        """Cycle d'écritures de l'API : création d'issue, commentaire, modification, suppression."""
+        step = i % 4
+        if step == 0 or issue is None:
+            return Issue.objects.create(
+                title=f'Writer {index} #{i}', description='d', tag='BUG', priority='LOW',
+                project=project, author=owner, assignee=owner,
+            )
+        if step == 1:
+            Comment.objects.create(issue=issue, description=f'Commentaire {i}', author=owner)
+        elif step == 2:
+            issue.title = f'Writer {index} #{i} (modifiée)'
+            issue.save()
+        else:
+            Comment.objects.filter(issue=issue).first().delete()
+        return issue
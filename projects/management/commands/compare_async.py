@@ -0,0 +1,70 @@
+import asyncio
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import AsyncClient
+from django.test.utils import override_settings
+from rest_framework_simplejwt.tokens import AccessToken
+
+from projects.models import Project, Issue
+from users.models import CustomUser
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare, via le gestionnaire ASGI en processus, les lectures des viewsets "
+        "synchrones (/api/...) et des vues asynchrones (/api/async/...) sous N requêtes concurrentes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', help="Utilisateur authentifié (par défaut l'auteur du projet)")
+        parser.add_argument('--project', type=int, help="Projet lu (par défaut le premier)")
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=50)
+
+    def handle(self, *args, **options):
+        project = Project.objects.order_by('id')
+        if options['project']:
+            project = project.filter(pk=options['project'])
+        project = project.first()
+        if project is None:
+            raise CommandError("Aucun projet en base.")
+        user = CustomUser.objects.get(username=options['user']) if options['user'] else project.author
+        issue = Issue.objects.filter(project=project).order_by('id').first()
+
+        paths = [f'projects/{project.pk}/', f'projects/{project.pk}/issues/']
+        if issue:
+            paths.append(f'projects/{project.pk}/issues/{issue.pk}/comments/')
+        headers = {'Authorization': f'Bearer {AccessToken.for_user(user)}'}
+
+        for path in paths:
+            for prefix in ('/api/', '/api/async/'):
+                # Le client de test envoie « Host: testserver »
+                with override_settings(ALLOWED_HOSTS=['testserver']):
+                    latencies, elapsed = asyncio.run(
+                        self.run(prefix + path, headers, options['requests'], options['concurrency'])
+                    )
+                latencies.sort()
+                self.stdout.write(
+                    f"{prefix + path:<55} {len(latencies) / elapsed:8.1f} req/s  "
+                    f"p50 {statistics.median(latencies) * 1000:7.1f} ms  "
+                    f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} ms"
+                )
+
+    async def run(self, url, headers, total, concurrency):
+        client = AsyncClient()
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies = []
+
+        async def one():
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.get(url, headers=headers)
+                latencies.append(time.perf_counter() - start)
+                if response.status_code != 200:
+                    raise CommandError(f"{url} : HTTP {response.status_code}")
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(total)))
+        return latencies, time.perf_counter() - start
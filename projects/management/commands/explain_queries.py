@@ -0,0 +1,74 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from projects.models import Project, Issue
+from projects.views import ProjectViewSet, ContributorViewSet, IssueViewSet, CommentViewSet
+
+
+class Command(BaseCommand):
+    help = (
+        "Affiche le plan d'exécution (EXPLAIN) de la requête de liste de chaque viewset "
+        "et signale les parcours complets de table."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, help="Projet utilisé pour les routes imbriquées")
+        parser.add_argument('--page-size', type=int, default=20)
+        parser.add_argument(
+            '--fail-on-scan', action='store_true',
+            help="Code de sortie non nul si une requête parcourt une table entière",
+        )
+
+    def handle(self, *args, **options):
+        project = Project.objects.filter(pk=options['project']) if options['project'] else Project.objects
+        project = project.order_by('id').first()
+        if project is None:
+            raise CommandError("Aucun projet en base : créez des données ou passez --project.")
+        issue = Issue.objects.filter(project=project).order_by('id').first()
+        kwargs = {'project_pk': str(project.pk), 'issue_pk': str(issue.pk if issue else 0)}
+
+        scans = []
+        for name, viewset, params in [
+            ('projects-list', ProjectViewSet, {}),
+            ('projects-list?scope=member', ProjectViewSet, {'scope': 'member'}),
+            ('project-contributors-list', ContributorViewSet, {}),
+            ('project-issues-list', IssueViewSet, {}),
+            ('issue-comments-list', CommentViewSet, {}),
+        ]:
+            queryset = self.list_queryset(viewset, kwargs, project.author, params)[:options['page_size']]
+            plan = queryset.explain()
+            self.stdout.write(self.style.MIGRATE_HEADING(name))
+            self.stdout.write(str(queryset.query))
+            self.stdout.write(plan + '\n')
+            if self.is_full_scan(plan):
+                scans.append(name)
+
+        if scans:
+            message = f"Parcours complet de table : {', '.join(scans)}"
+            if options['fail_on_scan']:
+                raise CommandError(message)
+            self.stdout.write(self.style.WARNING(message))
+        else:
+            self.stdout.write(self.style.SUCCESS("Aucun parcours complet de table."))
+
+    @staticmethod
+    def list_queryset(viewset, kwargs, user, params=None):
+        request = APIRequestFactory().get('/', params)
+        request.user = user
+        view = viewset(request=Request(request), kwargs=kwargs, action='list', format_kwarg=None)
+        view.request.user = user
+        return view.get_queryset()
+
+    @staticmethod
+    def is_full_scan(plan):
+        """
+        Sur SQLite une ligne ``SCAN <table>`` sans ``USING ... INDEX`` lit toute la table.
+        Les tris en mémoire (``USE TEMP B-TREE``) sont aussi signalés.
+        """
+        for line in plan.splitlines():
+            if 'USE TEMP B-TREE' in line:
+                return True
+            if 'SCAN ' in line and 'INDEX' not in line:
+                return True
+        return False
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from projects import counters
+
+
+class Command(BaseCommand):
+    help = "Recalcule les compteurs dénormalisés des projets et des issues."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--project', type=int, action='append', help="Limiter à ce(s) projet(s)")
+
+    def handle(self, *args, **options):
+        projects, issues = counters.rebuild(options['project'] or None)
+        self.stdout.write(self.style.SUCCESS(f"{projects} projet(s) et {issues} issue(s) corrigés."))
@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from projects import jobs, search
+from projects.models import Job
+
+
+class Command(BaseCommand):
+    help = "Reconstruit l'index de recherche plein texte des issues et commentaires."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Identifiants par transaction")
+        parser.add_argument(
+            '--queue', action='store_true',
+            help="Confier la reconstruction à la file de tâches (manage.py run_jobs)",
+        )
+
+    def handle(self, *args, **options):
+        if options['queue']:
+            job = jobs.enqueue(Job.REBUILD_SEARCH_INDEX, unique=True)
+            self.stdout.write(self.style.SUCCESS(f"Tâche {job.pk} en file ({job.status})."))
+            return
+        backend = search.get_backend()
+        backend.rebuild(options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f"Index reconstruit ({type(backend).__name__})."))
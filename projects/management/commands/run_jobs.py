@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from projects import jobs
+
+
+class Command(BaseCommand):
+    help = (
+        "Worker de la file de tâches (suppressions de projets, exports, reconstructions). "
+        "Plusieurs workers peuvent tourner en parallèle."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help="Vider la file puis sortir")
+        parser.add_argument('--sleep', type=float, default=1.0, help="Attente quand la file est vide (s)")
+        parser.add_argument('--stale-after', type=int, default=300,
+                            help="Remettre en file les tâches sans signe de vie depuis N secondes")
+        parser.add_argument('--worker', default=jobs.default_worker_name())
+
+    def handle(self, *args, **options):
+        processed = 0
+        while True:
+            close_old_connections()
+            jobs.requeue_stale(options['stale_after'])
+            job = jobs.claim(options['worker'])
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+            ok = jobs.run(job)
+            processed += 1
+            if options['verbosity'] > 0:
+                style = self.style.SUCCESS if ok else self.style.ERROR
+                self.stdout.write(style(f"{job.kind} #{job.pk} : {'terminée' if ok else 'en échec'}"))
+        self.stdout.write(f"{processed} tâche(s) traitée(s).")
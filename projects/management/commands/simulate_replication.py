@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from softdesk_api import replicas
+
+
+class Command(BaseCommand):
+    help = (
+        "Réplication simulée pour le développement : copie la base SQLite primaire vers "
+        "chaque réplica de SOFTDESK_READ_REPLICAS toutes les --interval secondes. Le retard "
+        "des réplicas est donc d'au plus --interval secondes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float, default=1.0)
+        parser.add_argument('--once', action='store_true', help="Une seule copie puis sortie")
+
+    def handle(self, *args, **options):
+        aliases = replicas.get_replicas()
+        if not aliases:
+            raise CommandError("Aucun réplica (SOFTDESK_READ_REPLICAS / SOFTDESK_DB_REPLICA_PATHS).")
+        for alias in ['default', *aliases]:
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError(f"{alias} n'est pas une base SQLite : utilisez la réplication du moteur.")
+
+        while True:
+            synced_at = time.time()
+            for alias in aliases:
+                replicas.replicate(alias, synced_at=synced_at)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{len(aliases)} réplica(s) synchronisé(s)")
+            if options['once']:
+                break
+            time.sleep(options['interval'])
+        self.stdout.write(self.style.SUCCESS(f"{len(aliases)} réplica(s) synchronisé(s)."))
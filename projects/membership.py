@@ -0,0 +1,204 @@
+"""
+Cache d'appartenance (utilisateur, projet) partagé par les permissions et les vues.
+
+Deux niveaux :
+- un memo attaché à la requête, pour ne jamais refaire la même vérification
+  dans une même requête (permission puis ``perform_create`` par exemple) ;
+- un backend de cache Django (``SOFTDESK_MEMBERSHIP_CACHE``) partagé entre les
+  requêtes, invalidé par les signaux de ``Contributor`` (voir ``signals.py``).
+
+Les signaux n'invalident que le cache du processus qui écrit. Avec un backend
+local au processus (``LocMemCache``), les autres workers gardent l'ancienne
+réponse jusqu'à expiration : la durée est alors bornée par
+``SOFTDESK_MEMBERSHIP_LOCAL_TTL``. En production, utiliser un cache partagé.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import router
+
+from .models import Contributor
+
+REQUEST_ATTR = '_softdesk_membership'
+TOO_MANY_PROJECTS = 'semi-join'  # valeur mise en cache au-delà de la limite
+
+
+def get_cache():
+    return caches[getattr(settings, 'SOFTDESK_MEMBERSHIP_CACHE', 'default')]
+
+
+def ttl():
+    """
+    Durée de vie des entrées : ``SOFTDESK_MEMBERSHIP_TTL``, ramenée à
+    ``SOFTDESK_MEMBERSHIP_LOCAL_TTL`` (5 s par défaut) sur un cache local au
+    processus, où un contributeur retiré garderait son accès sur les autres workers.
+    """
+    configured = getattr(settings, 'SOFTDESK_MEMBERSHIP_TTL', 300)
+    if isinstance(get_cache(), LocMemCache):
+        return min(configured, getattr(settings, 'SOFTDESK_MEMBERSHIP_LOCAL_TTL', 5))
+    return configured
+
+
+def cache_key(user_id, project_id):
+    return f'softdesk:membership:{user_id}:{project_id}'
+
+
+def _memo(request, user):
+    """Renvoie (memo, user_id) ou None pour un utilisateur anonyme."""
+    user = user if user is not None else request.user
+    if not user or not user.is_authenticated:
+        return None
+    memo = getattr(request, REQUEST_ATTR, None) if request is not None else None
+    if memo is None:
+        memo = {}
+        if request is not None:
+            setattr(request, REQUEST_ATTR, memo)
+    return memo, user.pk
+
+
+def _lookup(request, project_id, user):
+    """Normalise les arguments ; renvoie (memo, clé du memo) ou None si refus d'office."""
+    if not project_id:
+        return None
+    try:
+        project_id = int(project_id)
+    except (TypeError, ValueError):
+        return None
+    state = _memo(request, user)
+    if state is None:
+        return None
+    memo, user_id = state
+    return memo, (user_id, project_id)
+
+
+def _contributors():
+    # Toujours le primaire : une réponse lue sur un réplica en retard resterait en cache
+    return Contributor.objects.db_manager(router.db_for_write(Contributor))
+
+
+def _query(user_id, project_id):
+    return _contributors().filter(project_id=project_id, user_id=user_id)
+
+
+def is_contributor(request, project_id, user=None):
+    """
+    Indique si ``user`` (par défaut ``request.user``) contribue au projet.
+    Aucune requête SQL n'est faite si la réponse est déjà en cache.
+    """
+    lookup = _lookup(request, project_id, user)
+    if lookup is None:
+        return False
+    memo, (user_id, project_id) = lookup
+    if (user_id, project_id) in memo:
+        return memo[(user_id, project_id)]
+
+    cache = get_cache()
+    key = cache_key(user_id, project_id)
+    cached = cache.get(key)
+    if cached is None:
+        cached = int(_query(user_id, project_id).exists())
+        cache.set(key, cached, ttl())
+
+    memo[(user_id, project_id)] = bool(cached)
+    return bool(cached)
+
+
+async def ais_contributor(request, project_id, user=None):
+    """Variante asynchrone de ``is_contributor`` (vues ASGI)."""
+    lookup = _lookup(request, project_id, user)
+    if lookup is None:
+        return False
+    memo, (user_id, project_id) = lookup
+    if (user_id, project_id) in memo:
+        return memo[(user_id, project_id)]
+
+    cache = get_cache()
+    key = cache_key(user_id, project_id)
+    cached = await cache.aget(key)
+    if cached is None:
+        cached = int(await _query(user_id, project_id).aexists())
+        await cache.aset(key, cached, ttl())
+
+    memo[(user_id, project_id)] = bool(cached)
+    return bool(cached)
+
+
+def member_projects(request, project_ids, user=None):
+    """
+    Sous-ensemble de ``project_ids`` dont ``user`` est contributeur.
+    Une lecture groupée du cache, puis au plus une requête SQL pour les
+    projets absents du cache ; les réponses alimentent aussi le memo de la requête.
+    """
+    state = _memo(request, user)
+    if state is None:
+        return set()
+    memo, user_id = state
+    project_ids = {int(project_id) for project_id in project_ids}
+    answers = {
+        project_id: memo[(user_id, project_id)]
+        for project_id in project_ids if (user_id, project_id) in memo
+    }
+
+    cache = get_cache()
+    missing = project_ids - answers.keys()
+    keys = {cache_key(user_id, project_id): project_id for project_id in missing}
+    for key, cached in cache.get_many(keys).items():
+        answers[keys[key]] = bool(cached)
+
+    missing = project_ids - answers.keys()
+    if missing:
+        found = set(
+            _contributors().filter(user_id=user_id, project_id__in=missing)
+            .values_list('project_id', flat=True)
+        )
+        answers.update((project_id, project_id in found) for project_id in missing)
+        cache.set_many(
+            {cache_key(user_id, project_id): int(project_id in found) for project_id in missing},
+            ttl(),
+        )
+
+    for project_id, answer in answers.items():
+        memo[(user_id, project_id)] = answer
+    return {project_id for project_id, answer in answers.items() if answer}
+
+
+def projects_cache_key(user_id):
+    return f'softdesk:membership:{user_id}:projects'
+
+
+def member_project_filter(user_id, field='pk'):
+    """
+    Filtre ``Project`` sur les projets de l'utilisateur (``field='project_id'``
+    pour filtrer un modèle qui pointe vers le projet).
+
+    L'ensemble des identifiants est mis en cache s'il ne dépasse pas
+    ``SOFTDESK_MEMBER_PROJECTS_CACHE_MAX`` ; sinon (ou en cas d'absence du
+    cache) c'est une semi-jointure ``id IN (SELECT project_id ...)`` servie par
+    l'index unique (user_id, project_id) de ``Contributor``.
+    """
+    semi_join = {f'{field}__in': Contributor.objects.filter(user_id=user_id).values('project_id')}
+    limit = getattr(settings, 'SOFTDESK_MEMBER_PROJECTS_CACHE_MAX', 1000)
+    if not limit:
+        return semi_join
+
+    cache = get_cache()
+    key = projects_cache_key(user_id)
+    ids = cache.get(key)
+    if ids is None:
+        ids = list(_contributors().filter(user_id=user_id).values_list('project_id', flat=True)[:limit + 1])
+        if len(ids) > limit:
+            ids = TOO_MANY_PROJECTS
+        cache.set(key, ids, ttl())
+    return semi_join if ids == TOO_MANY_PROJECTS else {f'{field}__in': ids}
+
+
+def invalidate(user_id, project_id):
+    get_cache().delete_many([cache_key(user_id, project_id), projects_cache_key(user_id)])
+
+
+def invalidate_many(pairs):
+    """Invalide une liste de couples ``(user_id, project_id)`` en un seul appel."""
+    keys = set()
+    for user_id, project_id in pairs:
+        keys.update((cache_key(user_id, project_id), projects_cache_key(user_id)))
+    get_cache().delete_many(list(keys))
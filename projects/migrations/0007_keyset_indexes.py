@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:22
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0006_comment_updated_time_issue_updated_time_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['issue', '-created_time', '-id'], name='comment_issue_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'created_time', 'id'], name='issue_project_created_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0007_keyset_indexes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'status'], name='issue_project_status_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:25
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0008_hot_path_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type', models.CharField(choices=[('issue', 'Issue'), ('comment', 'Comment')], max_length=10)),
+                ('object_id', models.BigIntegerField()),
+                ('project_id', models.BigIntegerField()),
+                ('issue_id', models.BigIntegerField(blank=True, null=True)),
+                ('deleted_time', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['issue', 'updated_time', 'id'], name='comment_issue_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['project', 'updated_time', 'id'], name='issue_project_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='tombstone',
+            index=models.Index(fields=['project_id', 'deleted_time', 'id'], name='tombstone_project_deleted_idx'),
+        ),
+    ]
@@ -0,0 +1,108 @@
+from django.db import migrations
+
+# Table FTS5 (SQLite). rowid = id * 2 pour une issue, id * 2 + 1 pour un
+# commentaire : mises à jour et suppressions par rowid. Les triggers sont
+# une copie figée de ceux de projects.search, qui les recrée après chaque
+# migrate (une reconstruction de table par SQLite les supprime).
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_issue_search_insert AFTER INSERT ON projects_issue BEGIN
+        INSERT INTO projects_search_index(rowid, title, body, project_id, issue_id)
+        VALUES (new.id * 2, new.title, new.description, new.project_id, new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_issue_search_update
+    AFTER UPDATE OF title, description ON projects_issue BEGIN
+        UPDATE projects_search_index SET title = new.title, body = new.description
+        WHERE rowid = new.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_issue_search_delete AFTER DELETE ON projects_issue BEGIN
+        DELETE FROM projects_search_index WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_comment_search_insert AFTER INSERT ON projects_comment BEGIN
+        INSERT INTO projects_search_index(rowid, title, body, project_id, issue_id)
+        VALUES (
+            new.id * 2 + 1, '', new.description,
+            (SELECT project_id FROM projects_issue WHERE id = new.issue_id), new.issue_id
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_comment_search_update
+    AFTER UPDATE OF description ON projects_comment BEGIN
+        UPDATE projects_search_index SET body = new.description WHERE rowid = new.id * 2 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_comment_search_delete AFTER DELETE ON projects_comment BEGIN
+        DELETE FROM projects_search_index WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+]
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE projects_search_index USING fts5(
+        title, body, project_id UNINDEXED, issue_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO projects_search_index(rowid, title, body, project_id, issue_id)
+    SELECT id * 2, title, description, project_id, id FROM projects_issue
+    """,
+    """
+    INSERT INTO projects_search_index(rowid, title, body, project_id, issue_id)
+    SELECT c.id * 2 + 1, '', c.description, i.project_id, c.issue_id
+    FROM projects_comment c JOIN projects_issue i ON i.id = c.issue_id
+    """,
+] + SQLITE_TRIGGERS
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS projects_issue_search_insert",
+    "DROP TRIGGER IF EXISTS projects_issue_search_update",
+    "DROP TRIGGER IF EXISTS projects_issue_search_delete",
+    "DROP TRIGGER IF EXISTS projects_comment_search_insert",
+    "DROP TRIGGER IF EXISTS projects_comment_search_update",
+    "DROP TRIGGER IF EXISTS projects_comment_search_delete",
+    "DROP TABLE IF EXISTS projects_search_index",
+]
+
+# Index GIN d'expression (PostgreSQL), mêmes expressions que projects.search
+POSTGRES_FORWARD = [
+    "CREATE INDEX projects_issue_search_idx ON projects_issue "
+    "USING GIN (to_tsvector('simple', title || ' ' || description))",
+    "CREATE INDEX projects_comment_search_idx ON projects_comment "
+    "USING GIN (to_tsvector('simple', description))",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS projects_issue_search_idx",
+    "DROP INDEX IF EXISTS projects_comment_search_idx",
+]
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        for statement in statements.get(schema_editor.connection.vendor, []):
+            schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0009_tombstone_sync_indexes'),
+    ]
+
+    operations = [
+        migrations.RunPython(
+            run({'sqlite': SQLITE_FORWARD, 'postgresql': POSTGRES_FORWARD}),
+            run({'sqlite': SQLITE_BACKWARD, 'postgresql': POSTGRES_BACKWARD}),
+        ),
+    ]
@@ -0,0 +1,113 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:30
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+# Copie figée des triggers de projects.search : SQLite refuse de renommer la
+# table reconstruite par AddField tant qu'un trigger y fait référence.
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_issue_search_insert AFTER INSERT ON projects_issue BEGIN
+        INSERT INTO projects_search_index(rowid, title, body, project_id, issue_id)
+        VALUES (new.id * 2, new.title, new.description, new.project_id, new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_issue_search_update
+    AFTER UPDATE OF title, description ON projects_issue BEGIN
+        UPDATE projects_search_index SET title = new.title, body = new.description
+        WHERE rowid = new.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_issue_search_delete AFTER DELETE ON projects_issue BEGIN
+        DELETE FROM projects_search_index WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_comment_search_insert AFTER INSERT ON projects_comment BEGIN
+        INSERT INTO projects_search_index(rowid, title, body, project_id, issue_id)
+        VALUES (
+            new.id * 2 + 1, '', new.description,
+            (SELECT project_id FROM projects_issue WHERE id = new.issue_id), new.issue_id
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_comment_search_update
+    AFTER UPDATE OF description ON projects_comment BEGIN
+        UPDATE projects_search_index SET body = new.description WHERE rowid = new.id * 2 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_comment_search_delete AFTER DELETE ON projects_comment BEGIN
+        DELETE FROM projects_search_index WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+]
+
+SQLITE_TRIGGER_NAMES = [
+    'projects_issue_search_insert', 'projects_issue_search_update', 'projects_issue_search_delete',
+    'projects_comment_search_insert', 'projects_comment_search_update', 'projects_comment_search_delete',
+]
+
+
+def drop_sqlite_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for name in SQLITE_TRIGGER_NAMES:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+
+def create_sqlite_triggers(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        for statement in SQLITE_TRIGGERS:
+            schema_editor.execute(statement)
+
+
+def count(queryset):
+    return Coalesce(
+        Subquery(queryset.annotate(n=Count('pk')).values('n'), output_field=IntegerField()), Value(0)
+    )
+
+
+def fill_counters(apps, schema_editor):
+    Project = apps.get_model('projects', 'Project')
+    Issue = apps.get_model('projects', 'Issue')
+    Comment = apps.get_model('projects', 'Comment')
+    issues = Issue.objects.filter(project=OuterRef('pk')).values('project')
+    Project.objects.update(
+        issue_count=count(issues),
+        open_issue_count=count(issues.exclude(status='FINISHED')),
+    )
+    Issue.objects.update(
+        comment_count=count(Comment.objects.filter(issue=OuterRef('pk')).values('issue')),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0010_search_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_sqlite_triggers, create_sqlite_triggers),
+        migrations.AddField(
+            model_name='issue',
+            name='comment_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='issue_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='project',
+            name='open_issue_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+        migrations.RunPython(create_sqlite_triggers, drop_sqlite_triggers),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 5.0.7 on 2026-10-18 19:56
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0011_denormalized_counters'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Job',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('delete_project', 'Delete project'), ('export_project', 'Export project'), ('rebuild_counters', 'Rebuild counters'), ('rebuild_search_index', 'Rebuild search index')], max_length=30)),
+                ('status', models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('succeeded', 'Succeeded'), ('failed', 'Failed')], default='queued', max_length=10)),
+                ('project_id', models.BigIntegerField(blank=True, null=True)),
+                ('params', models.JSONField(blank=True, default=dict)),
+                ('result', models.JSONField(blank=True, default=dict)),
+                ('error', models.TextField(blank=True)),
+                ('progress', models.PositiveIntegerField(default=0)),
+                ('total', models.PositiveIntegerField(blank=True, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('worker', models.CharField(blank=True, max_length=100)),
+                ('created_time', models.DateTimeField(auto_now_add=True)),
+                ('started_time', models.DateTimeField(blank=True, null=True)),
+                ('heartbeat_time', models.DateTimeField(blank=True, null=True)),
+                ('finished_time', models.DateTimeField(blank=True, null=True)),
+                ('created_by', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='jobs', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['status', 'id'], name='job_status_idx'), models.Index(fields=['project_id', 'kind', 'status'], name='job_project_kind_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:12
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0012_job_queue'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['assignee', 'updated_time', 'id'], name='issue_assignee_updated_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='issue',
+            index=models.Index(fields=['author', 'updated_time', 'id'], name='issue_author_updated_idx'),
+        ),
+    ]
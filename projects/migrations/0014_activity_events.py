@@ -0,0 +1,26 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0013_my_work_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ActivityEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('project_id', models.BigIntegerField()),
+                ('type', models.CharField(max_length=30)),
+                ('data', models.JSONField(default=dict)),
+                ('created_time', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['project_id', 'id'], name='event_project_idx'), models.Index(fields=['created_time'], name='event_created_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.7 on 2026-10-18 20:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0014_activity_events'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='project',
+            name='deleting',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+    ]
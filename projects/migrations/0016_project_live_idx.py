@@ -0,0 +1,19 @@
+# Generated by Django 5.0.7 on 2026-10-18 21:00
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0015_project_deleting'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='project',
+            index=models.Index(condition=models.Q(('deleting', False)), fields=['id'], name='project_live_idx'),
+        ),
+    ]
@@ -0,0 +1,105 @@
+from django.db import migrations
+
+# La colonne project_id de l'index FTS5 devient indexée : le projet fait partie
+# de l'expression MATCH (voir projects.search). Une table FTS5 ne se modifie
+# pas, elle est recréée puis remplie ; les triggers sont une copie figée de
+# ceux de projects.search.
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_issue_search_insert AFTER INSERT ON projects_issue BEGIN
+        INSERT INTO projects_search_index(rowid, title, body, project_id, issue_id)
+        VALUES (new.id * 2, new.title, new.description, new.project_id, new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_issue_search_update
+    AFTER UPDATE OF title, description ON projects_issue BEGIN
+        UPDATE projects_search_index SET title = new.title, body = new.description
+        WHERE rowid = new.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_issue_search_delete AFTER DELETE ON projects_issue BEGIN
+        DELETE FROM projects_search_index WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_comment_search_insert AFTER INSERT ON projects_comment BEGIN
+        INSERT INTO projects_search_index(rowid, title, body, project_id, issue_id)
+        VALUES (
+            new.id * 2 + 1, '', new.description,
+            (SELECT project_id FROM projects_issue WHERE id = new.issue_id), new.issue_id
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_comment_search_update
+    AFTER UPDATE OF description ON projects_comment BEGIN
+        UPDATE projects_search_index SET body = new.description WHERE rowid = new.id * 2 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_comment_search_delete AFTER DELETE ON projects_comment BEGIN
+        DELETE FROM projects_search_index WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+]
+
+SQLITE_DROP = [
+    "DROP TRIGGER IF EXISTS projects_issue_search_insert",
+    "DROP TRIGGER IF EXISTS projects_issue_search_update",
+    "DROP TRIGGER IF EXISTS projects_issue_search_delete",
+    "DROP TRIGGER IF EXISTS projects_comment_search_insert",
+    "DROP TRIGGER IF EXISTS projects_comment_search_update",
+    "DROP TRIGGER IF EXISTS projects_comment_search_delete",
+    "DROP TABLE IF EXISTS projects_search_index",
+]
+
+SQLITE_FILL = [
+    """
+    INSERT INTO projects_search_index(rowid, title, body, project_id, issue_id)
+    SELECT id * 2, title, description, project_id, id FROM projects_issue
+    """,
+    """
+    INSERT INTO projects_search_index(rowid, title, body, project_id, issue_id)
+    SELECT c.id * 2 + 1, '', c.description, i.project_id, c.issue_id
+    FROM projects_comment c JOIN projects_issue i ON i.id = c.issue_id
+    """,
+]
+
+SQLITE_FORWARD = SQLITE_DROP + [
+    """
+    CREATE VIRTUAL TABLE projects_search_index USING fts5(
+        title, body, project_id, issue_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+] + SQLITE_FILL + SQLITE_TRIGGERS
+
+SQLITE_BACKWARD = SQLITE_DROP + [
+    """
+    CREATE VIRTUAL TABLE projects_search_index USING fts5(
+        title, body, project_id UNINDEXED, issue_id UNINDEXED,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+] + SQLITE_FILL + SQLITE_TRIGGERS
+
+
+def run(statements):
+    def operation(apps, schema_editor):
+        if schema_editor.connection.vendor == 'sqlite':
+            for statement in statements:
+                schema_editor.execute(statement)
+    return operation
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('projects', '0016_project_live_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(run(SQLITE_FORWARD), run(SQLITE_BACKWARD)),
+    ]
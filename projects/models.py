@@ -2,7 +2,29 @@ from django.db import models
 from users.models import CustomUser
 import uuid
 
-class Project(models.Model):
+
+class CounterFieldsMixin:
+    """
+    Les compteurs dénormalisés ne sont modifiés que par des UPDATE ``F()``
+    (voir ``projects.counters``) : ``save()`` d'une instance existante ne les
+    réécrit pas, sinon une valeur lue avant une écriture concurrente
+    écraserait l'incrément. De même pour les ``state_fields``, posés par un
+    UPDATE ciblé (``Project.deleting``, voir ``jobs.mark_deleting``).
+    """
+    counter_fields = ()
+    state_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None and not kwargs.get('force_insert'):
+            skipped = {*self.counter_fields, *self.state_fields} | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.attname for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skipped
+            ]
+        super().save(*args, **kwargs)
+
+
+class Project(CounterFieldsMixin, models.Model):
     TYPE_CHOICES = [
         ('BACKEND', 'Back-end'),
         ('FRONTEND', 'Front-end'),
@@ -16,6 +38,19 @@ class Project(models.Model):
     author = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='owned_projects')
     created_time = models.DateTimeField(auto_now_add=True)
     updated_time = models.DateTimeField(auto_now=True)  # Champ ajouté
+    # Compteurs dénormalisés, tenus à jour par projects.counters
+    issue_count = models.PositiveIntegerField(default=0, editable=False)
+    open_issue_count = models.PositiveIntegerField(default=0, editable=False)
+    counter_fields = ('issue_count', 'open_issue_count')
+    # Suppression en cours (tâche de fond) : le projet n'est plus servi par l'API
+    deleting = models.BooleanField(default=False, editable=False)
+    state_fields = ('deleting',)
+
+    class Meta:
+        indexes = [
+            # Liste des projets (ORDER BY id LIMIT n) : ne parcourt que les projets servis
+            models.Index(fields=['id'], condition=models.Q(deleting=False), name='project_live_idx'),
+        ]
 
     @property
     def project(self):
@@ -34,12 +69,13 @@ class Contributor(models.Model):  # maybe move to users app
     # role = models.CharField(max_length=12, choices=ROLE_CHOICES) # maybe delete contributor is contributor
 
     class Meta:
+        # L'index unique (user, project) sert aussi la vérification d'appartenance
         unique_together = ('user', 'project')
 
     def __str__(self):
-        return f"{self.user.username} - {self.project.name} ({self.role})"
+        return f"{self.user.username} - {self.project.name}"
 
-class Issue(models.Model):
+class Issue(CounterFieldsMixin, models.Model):
     STATUS_CHOICES = [
         ('TODO', 'To Do'),
         ('IN_PROGRESS', 'In Progress'),
@@ -68,6 +104,28 @@ class Issue(models.Model):
     assignee = models.ForeignKey(CustomUser, on_delete=models.CASCADE, related_name='assigned_issues')
     created_time = models.DateTimeField(auto_now_add=True)
     updated_time = models.DateTimeField(auto_now=True)  # Champ ajouté
+    comment_count = models.PositiveIntegerField(default=0, editable=False)  # voir projects.counters
+    counter_fields = ('comment_count',)
+
+    class Meta:
+        indexes = [
+            # Liste paginée (offset ou keyset) des issues d'un projet
+            models.Index(fields=['project', 'created_time', 'id'], name='issue_project_created_idx'),
+            # Filtres par statut dans un projet
+            models.Index(fields=['project', 'status'], name='issue_project_status_idx'),
+            # Synchronisation incrémentale (changes/)
+            models.Index(fields=['project', 'updated_time', 'id'], name='issue_project_updated_idx'),
+            # Fil « mon travail » (my-work/) : issues d'un utilisateur par activité
+            models.Index(fields=['assignee', 'updated_time', 'id'], name='issue_assignee_updated_idx'),
+            models.Index(fields=['author', 'updated_time', 'id'], name='issue_author_updated_idx'),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Statut chargé, pour détecter un changement ouvert/terminé au save()
+        instance._loaded_status = instance.__dict__.get('status')
+        return instance
 
     def __str__(self):
         return self.title
@@ -80,9 +138,122 @@ class Comment(models.Model):
     created_time = models.DateTimeField(auto_now_add=True)
     updated_time = models.DateTimeField(auto_now=True)  # Champ ajouté
 
+    class Meta:
+        indexes = [
+            # Liste paginée des commentaires d'une issue, du plus récent au plus ancien
+            models.Index(fields=['issue', '-created_time', '-id'], name='comment_issue_created_idx'),
+            # Synchronisation incrémentale (changes/)
+            models.Index(fields=['issue', 'updated_time', 'id'], name='comment_issue_updated_idx'),
+        ]
 
     @property
     def project(self):
         return self.issue.project
     def __str__(self):
         return f"Comment by {self.author.username} on {self.issue.title}"
+
+
+class Tombstone(models.Model):
+    """
+    Trace d'une issue ou d'un commentaire supprimé, pour la synchronisation
+    incrémentale (les suppressions en CASCADE ne laissent sinon aucune trace).
+    Les identifiants sont de simples entiers : la trace survit à l'objet.
+    """
+    ISSUE = 'issue'
+    COMMENT = 'comment'
+    TYPE_CHOICES = [
+        (ISSUE, 'Issue'),
+        (COMMENT, 'Comment'),
+    ]
+
+    type = models.CharField(max_length=10, choices=TYPE_CHOICES)
+    object_id = models.BigIntegerField()
+    project_id = models.BigIntegerField()
+    issue_id = models.BigIntegerField(null=True, blank=True)
+    deleted_time = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['project_id', 'deleted_time', 'id'], name='tombstone_project_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.type} {self.object_id} deleted"
+
+
+class Job(models.Model):
+    """
+    Tâche de fond exécutée par ``manage.py run_jobs`` (voir ``projects.jobs``).
+    ``project_id`` est un simple entier : la suppression d'un projet est
+    elle-même une tâche et sa trace doit survivre au projet.
+    """
+    DELETE_PROJECT = 'delete_project'
+    EXPORT_PROJECT = 'export_project'
+    REBUILD_COUNTERS = 'rebuild_counters'
+    REBUILD_SEARCH_INDEX = 'rebuild_search_index'
+    KIND_CHOICES = [
+        (DELETE_PROJECT, 'Delete project'),
+        (EXPORT_PROJECT, 'Export project'),
+        (REBUILD_COUNTERS, 'Rebuild counters'),
+        (REBUILD_SEARCH_INDEX, 'Rebuild search index'),
+    ]
+
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=30, choices=KIND_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    project_id = models.BigIntegerField(null=True, blank=True)
+    params = models.JSONField(default=dict, blank=True)
+    result = models.JSONField(default=dict, blank=True)
+    error = models.TextField(blank=True)
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    worker = models.CharField(max_length=100, blank=True)
+    created_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, related_name='jobs')
+    created_time = models.DateTimeField(auto_now_add=True)
+    started_time = models.DateTimeField(null=True, blank=True)
+    heartbeat_time = models.DateTimeField(null=True, blank=True)
+    finished_time = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # File d'attente : prochaine tâche en attente, tâches bloquées
+            models.Index(fields=['status', 'id'], name='job_status_idx'),
+            # Tâche en cours sur un projet (pas de double suppression)
+            models.Index(fields=['project_id', 'kind', 'status'], name='job_project_kind_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+
+class ActivityEvent(models.Model):
+    """
+    Journal des événements d'activité pour ``projects.events.DatabaseBackend``
+    (plusieurs workers) : chaque worker le lit par ``id`` croissant et le
+    diffuse à ses flux SSE. Purgé après ``SOFTDESK_EVENTS_RETENTION`` secondes.
+    """
+    project_id = models.BigIntegerField()
+    type = models.CharField(max_length=30)
+    data = models.JSONField(default=dict)
+    created_time = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # Reprise d'un flux (Last-Event-ID)
+            models.Index(fields=['project_id', 'id'], name='event_project_idx'),
+            models.Index(fields=['created_time'], name='event_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.type} #{self.pk}"
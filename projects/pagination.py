@@ -1,6 +1,202 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import b64decode
+from urllib import parse
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import Cursor, PageNumberPagination, CursorPagination
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size = 20  # Default number of items per page
     page_size_query_param = 'page_size'  # Clients can override the page size
     max_page_size = 100  # Maximum items per page to avoid large requests
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Pagination par curseur (keyset) : chaque page filtre sur la position du
+    dernier élément au lieu d'un OFFSET, et ne fait pas de COUNT(*).
+    Le coût d'une page profonde est donc le même que celui de la première.
+
+    L'ordre est lu sur la vue (``keyset_ordering``) pour suivre l'index
+    composite du modèle, par exemple ``('created_time', 'id')``. Contrairement
+    à ``CursorPagination`` de DRF, qui ne retient que le premier champ et
+    départage les ex æquo par un décalage, le curseur porte la valeur de
+    chaque champ : ``(created_time, id) > (t, n)``, sans OFFSET ni doublon
+    quand plusieurs lignes partagent un instant (``bulk/``). Le dernier champ
+    de l'ordre doit être unique.
+    """
+    page_size = CustomPageNumberPagination.page_size
+    page_size_query_param = CustomPageNumberPagination.page_size_query_param
+    max_page_size = CustomPageNumberPagination.max_page_size
+    ordering = ('created_time', 'id')
+
+    def get_ordering(self, request, queryset, view):
+        return tuple(getattr(view, 'keyset_ordering', self.ordering))
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        ordering = reverse_ordering(self.ordering) if reverse else self.ordering
+        queryset = queryset.order_by(*ordering)
+        if self.cursor is not None:
+            queryset = queryset.filter(self.after(queryset.model, ordering, self.cursor.position))
+
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        has_more = len(results) > len(self.page)
+        if reverse:
+            self.page.reverse()
+            self.has_next, self.has_previous = True, has_more
+        else:
+            self.has_next, self.has_previous = has_more, self.cursor is not None
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def after(self, model, ordering, position):
+        """
+        Lignes strictement après ``position`` dans ``ordering`` :
+        ``a > x OR (a = x AND b > y)``, plus ``a >= x`` pour borner le
+        parcours de l'index sur le premier champ.
+        """
+        if len(position) != len(ordering):
+            raise NotFound(self.invalid_cursor_message)
+        values = []
+        for field, value in zip(ordering, position):
+            try:
+                values.append(model._meta.get_field(field.lstrip('-')).to_python(value))
+            except (FieldDoesNotExist, DjangoValidationError):
+                raise NotFound(self.invalid_cursor_message)
+
+        condition, equal = Q(), {}
+        for field, value in zip(ordering, values):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            condition |= Q(**equal, **{f'{name}__{lookup}': value})
+            equal[name] = value
+        first = ordering[0]
+        bound = {f"{first.lstrip('-')}__{'lte' if first.startswith('-') else 'gte'}": values[0]}
+        return Q(**bound) & condition
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        position = self.position(self.page[-1]) if self.page else self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=False, position=position))
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        position = self.position(self.page[0]) if self.page else self.cursor.position
+        return self.encode_cursor(Cursor(offset=0, reverse=True, position=position))
+
+    def position(self, instance):
+        return [
+            str(instance[field] if isinstance(instance, dict) else getattr(instance, field))
+            for field in (field.lstrip('-') for field in self.ordering)
+        ]
+
+    def decode_cursor(self, request):
+        """``Cursor`` dont ``position`` est la liste des valeurs de l'ordre ; 404 si illisible."""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            tokens = parse.parse_qs(b64decode(encoded.encode('ascii')).decode('ascii'), keep_blank_values=True)
+            reverse = bool(int(tokens.get('r', ['0'])[0]))
+            position = tokens['p']
+        except (KeyError, TypeError, ValueError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+        return Cursor(offset=0, reverse=reverse, position=position)
+
+
+def reverse_ordering(ordering):
+    return tuple(field[1:] if field.startswith('-') else f'-{field}' for field in ordering)
+
+
+class SwitchablePagination(CustomPageNumberPagination):
+    """
+    Pagination par numéro de page par défaut, par curseur sur demande :
+    ``?pagination=cursor`` (les liens next/previous portent ensuite ``cursor``).
+    """
+    pagination_query_param = 'pagination'
+    cursor_pagination_class = KeysetPagination
+    delegate = None
+
+    def use_cursor(self, request):
+        return (
+            request.query_params.get(self.pagination_query_param) == 'cursor'
+            or self.cursor_pagination_class.cursor_query_param in request.query_params
+        )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.use_cursor(request):
+            self.delegate = self.cursor_pagination_class()
+            return self.delegate.paginate_queryset(queryset, request, view)
+        self.delegate = None
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.delegate is not None:
+            return self.delegate.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def to_html(self):
+        if self.delegate is not None:
+            return self.delegate.to_html()
+        return super().to_html()
+
+
+class AsyncPageNumberPagination(CustomPageNumberPagination):
+    """
+    Même format que ``CustomPageNumberPagination`` pour les vues asynchrones :
+    ``acount()`` et ``async for`` au lieu du Paginator synchrone de Django.
+    """
+
+    async def apaginate_queryset(self, queryset, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        try:
+            self.page_number = int(request.query_params.get(self.page_query_param, 1))
+        except ValueError:
+            self.page_number = 0
+        self.count = await queryset.acount()
+        self.num_pages = max(1, -(-self.count // page_size))
+        if not 1 <= self.page_number <= self.num_pages:
+            raise NotFound(self.invalid_page_message.format(page_number=self.page_number, message=''))
+
+        offset = (self.page_number - 1) * page_size
+        return [obj async for obj in queryset[offset:offset + page_size]]
+
+    def get_next_link(self):
+        if self.page_number >= self.num_pages:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(), self.page_query_param, self.page_number + 1
+        )
+
+    def get_previous_link(self):
+        if self.page_number <= 1:
+            return None
+        url = self.request.build_absolute_uri()
+        if self.page_number == 2:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, self.page_number - 1)
+
+    def get_paginated_data(self, data):
+        return {
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
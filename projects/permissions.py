@@ -1,6 +1,7 @@
 from rest_framework import permissions
 from django.shortcuts import get_object_or_404
-from .models import Project, Contributor, Issue, Comment
+from .models import Project, Issue, Comment
+from .membership import is_contributor
 
 class IsContributor(permissions.BasePermission):
     """
@@ -15,8 +16,8 @@ class IsContributor(permissions.BasePermission):
         project_id = view.kwargs.get('project_pk')
 
         if project_id:
-            # Vérifie que l'utilisateur est contributeur du projet
-            return Contributor.objects.filter(project_id=project_id, user=request.user).exists()
+            # Vérifie que l'utilisateur est contributeur du projet (résultat mis en cache)
+            return is_contributor(request, project_id)
         # Si aucun identifiant n'est fourni, refuser l'accès
         return False
 
@@ -31,4 +32,5 @@ class IsAuthorOrReadOnly(permissions.BasePermission):
             return True
 
         # Seuls les auteurs peuvent modifier ou supprimer l'objet
-        return obj.author == request.user
+        # (comparaison sur author_id pour ne pas charger l'utilisateur)
+        return obj.author_id == request.user.pk
@@ -0,0 +1,137 @@
+"""
+Cache des réponses de liste (projets, issues, commentaires).
+
+Les entrées ne sont jamais supprimées une à une : leur clé contient des
+compteurs de génération (un global pour la liste des projets, un par projet
+pour ses issues et commentaires). Les signaux de ``Project``, ``Issue``,
+``Comment`` et ``Contributor`` incrémentent ces compteurs (voir
+``signals.py``) ; les anciennes entrées ne sont plus lues et expirent d'elles-mêmes.
+
+Seuls ``get``, ``get_many``, ``set``, ``add`` et ``incr`` sont utilisés : tout
+backend de cache Django convient (locmem et fichiers en test, Redis en
+production, où ``incr`` est atomique). Le cache est désactivé si
+``SOFTDESK_RESPONSE_CACHE`` vaut ``None``.
+
+On met en cache les données sérialisées (``response.data``), pas le rendu :
+la négociation de contenu reste celle de DRF.
+"""
+import hashlib
+import time
+from functools import partial
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection, transaction
+from rest_framework.response import Response
+
+from softdesk_api import replicas
+
+PROJECTS = 'projects'
+
+
+def get_cache():
+    alias = getattr(settings, 'SOFTDESK_RESPONSE_CACHE', None)
+    return caches[alias] if alias else None
+
+
+def generation_key(scope):
+    return f'softdesk:generation:{scope}'
+
+
+def project_scope(project_id):
+    return f'project:{int(project_id)}'
+
+
+def new_generation():
+    # Unique même si le compteur a été évincé : une entrée orpheline ne
+    # retrouve jamais sa génération
+    return time.time_ns()
+
+
+def get_generations(cache, scopes):
+    keys = [generation_key(scope) for scope in scopes]
+    values = cache.get_many(keys)
+    for key in keys:
+        if key not in values:
+            cache.add(key, new_generation(), None)
+            values[key] = cache.get(key)
+    return [values[key] for key in keys]
+
+
+def bump(*scopes):
+    cache = get_cache()
+    if cache is None:
+        return
+    for scope in scopes:
+        key = generation_key(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, new_generation(), None)
+
+
+def invalidate(*scopes):
+    """
+    Incrémente les générations tout de suite, et de nouveau au commit si l'on
+    est dans une transaction : une lecture concurrente faite entre les deux
+    aurait mis en cache l'état d'avant le commit sous la nouvelle génération.
+    """
+    bump(*scopes)
+    if connection.in_atomic_block:
+        transaction.on_commit(partial(bump, *scopes))
+
+
+def default_ttl():
+    ttl = getattr(settings, 'SOFTDESK_RESPONSE_CACHE_TTL', 300)
+    if replicas.reading_from_replica():
+        # Lu sur un réplica peut-être en retard sur la génération courante
+        ttl = min(ttl, getattr(settings, 'SOFTDESK_REPLICA_PIN_SECONDS', 5))
+    return ttl
+
+
+def invalidate_project(project_id):
+    """Une écriture dans un projet change ses listes et ses compteurs (liste des projets)."""
+    invalidate(PROJECTS, project_scope(project_id))
+
+
+class CachedListMixin:
+    """
+    Met en cache ``list()``. La vue fournit ``get_cache_scopes()`` (les
+    générations dont dépend la liste) et ``get_cache_audience()`` (la portée
+    de visibilité de l'utilisateur : deux utilisateurs qui voient les mêmes
+    objets partagent l'entrée).
+
+    Les permissions sont vérifiées avant ``list()`` : une entrée n'est
+    jamais servie à un utilisateur qui n'a pas accès à la liste.
+    """
+
+    def get_cache_scopes(self):
+        raise NotImplementedError
+
+    def get_cache_audience(self):
+        return 'all'
+
+    def get_cache_ttl(self):
+        return default_ttl()
+
+    def get_cache_key(self, cache):
+        generations = get_generations(cache, self.get_cache_scopes())
+        seed = '|'.join([
+            self.request.build_absolute_uri(),  # les liens de pagination sont absolus
+            self.get_cache_audience(),
+            *map(str, generations),
+        ])
+        return 'softdesk:response:' + hashlib.md5(seed.encode(), usedforsecurity=False).hexdigest()
+
+    def list(self, request, *args, **kwargs):
+        cache = get_cache()
+        if cache is None:
+            return super().list(request, *args, **kwargs)
+        key = self.get_cache_key(cache)
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, self.get_cache_ttl())
+        return response
@@ -0,0 +1,263 @@
+"""
+Recherche plein texte dans les issues (titre, description) et les commentaires.
+
+Le backend est choisi par ``SOFTDESK_SEARCH_BACKEND`` (chemin pointé), ou
+d'après le moteur de la base par défaut :
+
+- SQLite : table virtuelle FTS5 ``projects_search_index`` tenue à jour par
+  des triggers (voir la migration ``0010_search_index``), donc aussi pour les
+  écritures en masse qui ne déclenchent pas de signaux. Le ``rowid`` encode
+  l'objet : ``id * 2`` pour une issue, ``id * 2 + 1`` pour un commentaire.
+  La colonne ``project_id`` est indexée (``0017_search_project_column``) et
+  le projet fait partie de l'expression MATCH : seuls les documents du
+  projet sont lus et classés, pas toutes les correspondances de la base.
+- PostgreSQL : index GIN sur ``to_tsvector('simple', ...)``, avec les mêmes
+  expressions que dans les requêtes pour que l'index soit utilisé.
+
+Chaque backend renvoie des dicts ``{'type', 'id', 'issue', 'title', 'snippet',
+'rank'}`` triés par pertinence. ``title`` et ``snippet`` sont du HTML : le
+texte saisi par les utilisateurs est échappé, seuls les termes trouvés sont
+entourés de ``<mark>``. La base délimite ces termes par deux caractères
+d'usage privé, remplacés après l'échappement (``render_highlight``).
+"""
+import re
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils.html import escape
+from django.utils.module_loading import import_string
+
+HIGHLIGHT_START = '<mark>'
+HIGHLIGHT_END = '</mark>'
+# Délimiteurs demandés à la base, sans signification en HTML
+MARK_START = '\ue000'
+MARK_END = '\ue001'
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+# Synchronisation de l'index FTS5 sur SQLite. Une migration qui reconstruit
+# projects_issue ou projects_comment doit supprimer ces triggers avant et les
+# recréer après, avec une copie du SQL (voir 0011_denormalized_counters) ; ils
+# sont aussi recréés après chaque migrate (``ensure_sqlite_triggers``).
+SQLITE_TRIGGERS = [
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_issue_search_insert AFTER INSERT ON projects_issue BEGIN
+        INSERT INTO projects_search_index(rowid, title, body, project_id, issue_id)
+        VALUES (new.id * 2, new.title, new.description, new.project_id, new.id);
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_issue_search_update
+    AFTER UPDATE OF title, description ON projects_issue BEGIN
+        UPDATE projects_search_index SET title = new.title, body = new.description
+        WHERE rowid = new.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_issue_search_delete AFTER DELETE ON projects_issue BEGIN
+        DELETE FROM projects_search_index WHERE rowid = old.id * 2;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_comment_search_insert AFTER INSERT ON projects_comment BEGIN
+        INSERT INTO projects_search_index(rowid, title, body, project_id, issue_id)
+        VALUES (
+            new.id * 2 + 1, '', new.description,
+            (SELECT project_id FROM projects_issue WHERE id = new.issue_id), new.issue_id
+        );
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_comment_search_update
+    AFTER UPDATE OF description ON projects_comment BEGIN
+        UPDATE projects_search_index SET body = new.description WHERE rowid = new.id * 2 + 1;
+    END
+    """,
+    """
+    CREATE TRIGGER IF NOT EXISTS projects_comment_search_delete AFTER DELETE ON projects_comment BEGIN
+        DELETE FROM projects_search_index WHERE rowid = old.id * 2 + 1;
+    END
+    """,
+]
+
+
+def ensure_sqlite_triggers(using='default'):
+    conn = connections[using]
+    if conn.vendor != 'sqlite' or 'projects_search_index' not in conn.introspection.table_names():
+        return
+    with conn.cursor() as cursor:
+        for statement in SQLITE_TRIGGERS:
+            cursor.execute(statement)
+
+
+def render_highlight(text):
+    """Texte de la base -> HTML : échappé, puis délimiteurs remplacés par ``<mark>``."""
+    if text is None:
+        return None
+    return str(escape(text)).replace(MARK_START, HIGHLIGHT_START).replace(MARK_END, HIGHLIGHT_END)
+
+
+class BaseSearchBackend:
+
+    def search(self, project_id, query, limit, offset=0):
+        raise NotImplementedError
+
+    def rebuild(self, batch_size=1000, progress=None):
+        """
+        Reconstruit l'index à partir des tables (après un import direct en base),
+        par lots de ``batch_size`` identifiants, chacun dans sa transaction.
+        ``progress(fait, total)`` est appelé après chaque lot.
+        """
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    table = 'projects_search_index'
+
+    @staticmethod
+    def match_expression(query, project_id):
+        """
+        Convertit la saisie utilisateur en expression FTS5 sûre : chaque mot est
+        cité (la syntaxe FTS5 n'est pas exposée), le dernier est un préfixe.
+        Les mots ne sont cherchés que dans le titre et le corps, et le projet
+        est un terme de la colonne ``project_id``.
+        """
+        tokens = TOKEN_RE.findall(query)
+        if not tokens:
+            return None
+        terms = [f'"{token}"' for token in tokens]
+        terms[-1] += '*'
+        return f'project_id : "{int(project_id)}" AND {{title body}} : ({" ".join(terms)})'
+
+    def search(self, project_id, query, limit, offset=0):
+        expression = self.match_expression(query, project_id)
+        if expression is None:
+            return []
+        # bm25 : un mot trouvé dans le titre compte plus que dans le corps ; la
+        # colonne project_id ne compte pas
+        sql = f"""
+            SELECT rowid, issue_id,
+                   highlight({self.table}, 0, %s, %s),
+                   snippet({self.table}, 1, %s, %s, '…', 24),
+                   bm25({self.table}, 5.0, 1.0, 0.0) AS rank
+            FROM {self.table}
+            WHERE {self.table} MATCH %s
+            ORDER BY rank
+            LIMIT %s OFFSET %s
+        """
+        params = [
+            MARK_START, MARK_END, MARK_START, MARK_END,
+            expression, limit, offset,
+        ]
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return [
+            {
+                'type': 'comment' if rowid % 2 else 'issue',
+                'id': rowid // 2,
+                'issue': issue_id,
+                'title': render_highlight(title) or None,
+                'snippet': render_highlight(snippet),
+                'rank': -rank,
+            }
+            for rowid, issue_id, title, snippet, rank in rows
+        ]
+
+    def rebuild(self, batch_size=1000, progress=None):
+        """
+        Par tranches d'identifiants [début, fin) : les issues et commentaires de
+        la tranche occupent les rowid [2 * début, 2 * fin), supprimés puis
+        réinsérés dans une courte transaction. Le verrou d'écriture n'est
+        jamais tenu pour toute la table ; entre deux lots, les triggers
+        gardent l'index à jour.
+        """
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT MAX(id) FROM (SELECT MAX(id) AS id FROM projects_issue "
+                "UNION ALL SELECT MAX(id) FROM projects_comment)"
+            )
+            end = (cursor.fetchone()[0] or 0) + 1
+        for start in range(0, end, batch_size):
+            stop = min(start + batch_size, end)
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {self.table} WHERE rowid >= %s AND rowid < %s", [start * 2, stop * 2])
+                cursor.execute(f"""
+                    INSERT INTO {self.table}(rowid, title, body, project_id, issue_id)
+                    SELECT id * 2, title, description, project_id, id FROM projects_issue
+                    WHERE id >= %s AND id < %s
+                """, [start, stop])
+                cursor.execute(f"""
+                    INSERT INTO {self.table}(rowid, title, body, project_id, issue_id)
+                    SELECT c.id * 2 + 1, '', c.description, i.project_id, c.issue_id
+                    FROM projects_comment c JOIN projects_issue i ON i.id = c.issue_id
+                    WHERE c.id >= %s AND c.id < %s
+                """, [start, stop])
+            if progress is not None:
+                progress(stop, end)
+        # Lignes d'objets disparus au-delà du plus grand identifiant
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table} WHERE rowid >= %s", [end * 2])
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+
+    def search(self, project_id, query, limit, offset=0):
+        if not TOKEN_RE.search(query):
+            return []
+        options = f'StartSel={MARK_START}, StopSel={MARK_END}, MaxWords=35, MinWords=15'
+        # Le classement se fait sur l'index, ts_headline seulement sur la page retenue
+        sql = """
+            WITH q AS (SELECT websearch_to_tsquery('simple', %(query)s) AS query),
+            hits AS (
+                SELECT 'issue' AS type, i.id, i.id AS issue_id, i.title, i.description AS body,
+                       ts_rank(to_tsvector('simple', i.title || ' ' || i.description), q.query) AS rank
+                FROM projects_issue i, q
+                WHERE i.project_id = %(project)s
+                  AND to_tsvector('simple', i.title || ' ' || i.description) @@ q.query
+                UNION ALL
+                SELECT 'comment', c.id, c.issue_id, '', c.description,
+                       ts_rank(to_tsvector('simple', c.description), q.query)
+                FROM projects_comment c JOIN projects_issue i ON i.id = c.issue_id, q
+                WHERE i.project_id = %(project)s
+                  AND to_tsvector('simple', c.description) @@ q.query
+                ORDER BY rank DESC, id
+                LIMIT %(limit)s OFFSET %(offset)s
+            )
+            SELECT hits.type, hits.id, hits.issue_id,
+                   ts_headline('simple', hits.title, q.query, %(options)s),
+                   ts_headline('simple', hits.body, q.query, %(options)s),
+                   hits.rank
+            FROM hits, q
+            ORDER BY hits.rank DESC, hits.id
+        """
+        params = {
+            'query': query, 'project': int(project_id),
+            'limit': limit, 'offset': offset, 'options': options,
+        }
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return [
+            {
+                'type': kind, 'id': pk, 'issue': issue_id,
+                'title': render_highlight(title) or None, 'snippet': render_highlight(snippet), 'rank': rank,
+            }
+            for kind, pk, issue_id, title, snippet, rank in rows
+        ]
+
+    def rebuild(self, batch_size=1000, progress=None):
+        # Index d'expression : toujours à jour, rien à reconstruire
+        pass
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteFTSBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_backend():
+    path = getattr(settings, 'SOFTDESK_SEARCH_BACKEND', None)
+    if path:
+        return import_string(path)()
+    return VENDOR_BACKENDS[connection.vendor]()
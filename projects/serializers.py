@@ -1,11 +1,13 @@
 from rest_framework import serializers
-from .models import Project, Contributor, Issue, Comment
+from softdesk_api.values_serializers import ValuesSerializer
+from users.models import CustomUser
+from .models import Project, Contributor, Issue, Comment, Tombstone, Job
 
 class ProjectSerializer(serializers.ModelSerializer):
     class Meta:
         model = Project
-        fields = ['id', 'name', 'description', 'type', 'author', 'created_time']
-        read_only_fields = ['author', 'created_time']
+        fields = ['id', 'name', 'description', 'type', 'author', 'created_time', 'issue_count', 'open_issue_count']
+        read_only_fields = ['author', 'created_time', 'issue_count', 'open_issue_count']
 class ContributorSerializer(serializers.ModelSerializer):
     class Meta:
         model = Contributor
@@ -15,8 +17,8 @@ class ContributorSerializer(serializers.ModelSerializer):
 class IssueSerializer(serializers.ModelSerializer):
     class Meta:
         model = Issue
-        fields = ['id', 'title', 'description', 'tag', 'priority', 'status', 'assignee', 'author', 'created_time']
-        read_only_fields = ['id', 'author', 'project', 'created_time']
+        fields = ['id', 'title', 'description', 'tag', 'priority', 'status', 'assignee', 'author', 'created_time', 'comment_count']
+        read_only_fields = ['id', 'author', 'project', 'created_time', 'comment_count']
 
 class CommentSerializer(serializers.ModelSerializer):
     class Meta:
@@ -24,7 +26,72 @@ class CommentSerializer(serializers.ModelSerializer):
         fields = ['id', 'description', 'author', 'created_time']
         read_only_fields = ['id', 'author', 'issue', 'created_time']
 
+class ProjectValuesSerializer(ValuesSerializer):
+    serializer_class = ProjectSerializer
+
+class IssueValuesSerializer(ValuesSerializer):
+    serializer_class = IssueSerializer
+
+class CommentValuesSerializer(ValuesSerializer):
+    serializer_class = CommentSerializer
+
+class PreloadedUserField(serializers.PrimaryKeyRelatedField):
+    """
+    Clé primaire d'utilisateur résolue depuis ``context['users']`` (chargé en une
+    requête pour tout un lot) au lieu d'une requête par élément.
+    """
+    def to_internal_value(self, data):
+        users = self.context.get('users')
+        if users is None:
+            return super().to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        try:
+            return users[int(data)]
+        except (TypeError, ValueError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+        except KeyError:
+            self.fail('does_not_exist', pk_value=data)
+
+class IssueBulkSerializer(IssueSerializer):
+    assignee = PreloadedUserField(queryset=CustomUser.objects.all())
+
+class IssueChangeSerializer(IssueSerializer):
+    class Meta(IssueSerializer.Meta):
+        fields = IssueSerializer.Meta.fields + ['updated_time']
+
+class CommentChangeSerializer(CommentSerializer):
+    class Meta(CommentSerializer.Meta):
+        fields = CommentSerializer.Meta.fields + ['issue', 'updated_time']
+
+class IssueFeedSerializer(IssueSerializer):
+    class Meta(IssueSerializer.Meta):
+        fields = IssueSerializer.Meta.fields + ['project', 'updated_time']
+
+class IssueFeedValuesSerializer(ValuesSerializer):
+    serializer_class = IssueFeedSerializer
+
+class TombstoneSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='object_id')
+    issue = serializers.IntegerField(source='issue_id')
+
+    class Meta:
+        model = Tombstone
+        fields = ['type', 'id', 'issue', 'deleted_time']
+
+class JobSerializer(serializers.ModelSerializer):
+    project = serializers.IntegerField(source='project_id', read_only=True)
+    url = serializers.HyperlinkedIdentityField(view_name='jobs-detail')
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'url', 'kind', 'status', 'project', 'params', 'progress', 'total', 'result',
+            'error', 'attempts', 'created_time', 'started_time', 'finished_time',
+        ]
+        read_only_fields = fields
+
 
         # if use all can put __all__
         #add update time 
-        #uuid in read only fields ?
\ No newline at end of file
+        #uuid in read only fields ?
@@ -0,0 +1,151 @@
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from . import counters, events, membership, response_cache, search
+from .models import Project, Contributor, Issue, Comment, Tombstone
+
+
+def origin_model(origin):
+    """Modèle à l'origine d'une suppression (instance ou queryset)."""
+    return getattr(origin, 'model', type(origin))
+
+
+@receiver(post_save, sender=Contributor)
+@receiver(post_delete, sender=Contributor)
+def invalidate_membership(sender, instance, **kwargs):
+    membership.invalidate(instance.user_id, instance.project_id)
+
+
+@receiver(post_save, sender=Issue)
+def count_issue_save(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust_project(
+            instance.project_id, issues=1, open_issues=int(counters.is_open(instance.status)),
+        )
+    else:
+        loaded = getattr(instance, '_loaded_status', None)
+        if loaded is not None and counters.is_open(loaded) != counters.is_open(instance.status):
+            counters.adjust_project(
+                instance.project_id, open_issues=1 if counters.is_open(instance.status) else -1,
+            )
+    instance._loaded_status = instance.status
+
+
+@receiver(post_save, sender=Comment)
+def count_comment_save(sender, instance, created, **kwargs):
+    if created:
+        counters.adjust_issue(instance.issue_id, 1)
+
+
+def is_bulk_deletion(origin):
+    """``QuerySet.delete()`` : l'appelant recalcule les compteurs en une requête."""
+    return hasattr(origin, 'model')
+
+
+@receiver(post_delete, sender=Issue)
+def count_issue_deletion(sender, instance, origin=None, **kwargs):
+    if origin_model(origin) is Project or is_bulk_deletion(origin):
+        return
+    counters.adjust_project(
+        instance.project_id, issues=-1, open_issues=-int(counters.is_open(instance.status)),
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def count_comment_deletion(sender, instance, origin=None, **kwargs):
+    if origin_model(origin) in (Project, Issue) or is_bulk_deletion(origin):
+        return
+    counters.adjust_issue(instance.issue_id, -1)
+
+
+@receiver(post_delete, sender=Issue)
+def record_issue_deletion(sender, instance, origin=None, **kwargs):
+    # La suppression du projet entier n'a pas besoin de traces individuelles
+    if origin_model(origin) is Project:
+        return
+    Tombstone.objects.create(
+        type=Tombstone.ISSUE, object_id=instance.pk, project_id=instance.project_id,
+    )
+
+
+@receiver(post_delete, sender=Comment)
+def record_comment_deletion(sender, instance, origin=None, **kwargs):
+    # Les commentaires supprimés avec leur issue sont couverts par la trace de l'issue
+    if origin_model(origin) in (Project, Issue):
+        return
+    project_id = Issue.objects.filter(pk=instance.issue_id).values_list('project_id', flat=True).first()
+    if project_id is None:
+        return
+    Tombstone.objects.create(
+        type=Tombstone.COMMENT, object_id=instance.pk, project_id=project_id, issue_id=instance.issue_id,
+    )
+
+
+@receiver(post_save, sender=Project)
+@receiver(post_delete, sender=Project)
+@receiver(post_save, sender=Contributor)
+@receiver(post_delete, sender=Contributor)
+@receiver(post_save, sender=Issue)
+@receiver(post_delete, sender=Issue)
+def invalidate_responses(sender, instance, origin=None, **kwargs):
+    # En cascade depuis le projet, une seule invalidation suffit
+    if sender is not Project and origin_model(origin) is Project:
+        return
+    response_cache.invalidate_project(instance.pk if sender is Project else instance.project_id)
+
+
+def comment_project_id(comment):
+    if Comment.issue.is_cached(comment):
+        return comment.issue.project_id
+    return Issue.objects.filter(pk=comment.issue_id).values_list('project_id', flat=True).first()
+
+
+@receiver(post_save, sender=Comment)
+@receiver(post_delete, sender=Comment)
+def invalidate_comment_responses(sender, instance, origin=None, **kwargs):
+    if origin_model(origin) in (Project, Issue):
+        return
+    project_id = comment_project_id(instance)
+    if project_id is not None:
+        response_cache.invalidate_project(project_id)
+
+
+# Flux d'activité (projects.events). Les chemins en masse (bulk_create,
+# bulk_update) publient eux-mêmes.
+
+@receiver(post_save, sender=Issue)
+def publish_issue_save(sender, instance, created, **kwargs):
+    events.publish_issue(instance, 'issue.created' if created else 'issue.updated')
+
+
+@receiver(post_delete, sender=Issue)
+def publish_issue_deletion(sender, instance, origin=None, **kwargs):
+    if origin_model(origin) is Project:
+        return
+    events.publish(instance.project_id, 'issue.deleted', {'id': instance.pk})
+
+
+@receiver(post_save, sender=Comment)
+def publish_comment_save(sender, instance, created, **kwargs):
+    project_id = comment_project_id(instance)
+    if project_id is not None:
+        events.publish_comment(instance, project_id, 'comment.created' if created else 'comment.updated')
+
+
+@receiver(post_delete, sender=Comment)
+def publish_comment_deletion(sender, instance, origin=None, **kwargs):
+    # Supprimés avec leur issue : couverts par issue.deleted
+    if origin_model(origin) in (Project, Issue):
+        return
+    project_id = comment_project_id(instance)
+    if project_id is not None:
+        events.publish(project_id, 'comment.deleted', {'id': instance.pk, 'issue': instance.issue_id})
+
+
+@receiver(post_delete, sender=Project)
+def publish_project_deletion(sender, instance, **kwargs):
+    events.publish(instance.pk, 'project.deleted', {'id': instance.pk})
+
+
+def ensure_search_triggers(sender, using='default', **kwargs):
+    search.ensure_sqlite_triggers(using)
@@ -0,0 +1,93 @@
+"""
+Tableau de bord d'un projet (``GET /api/projects/<id>/stats/``).
+
+Trois requêtes quel que soit le volume du projet :
+
+1. un seul agrégat sur les issues, avec un ``Count(filter=Q(...))`` par valeur
+   de statut, de priorité et de tag ;
+2. les issues ouvertes groupées par assignee ;
+3. les commentaires des ``days`` derniers jours groupés par jour (fuseau courant).
+
+Le résultat est mis en cache par projet sous sa génération de
+``response_cache`` : toute écriture d'issue ou de commentaire du projet
+l'invalide. La date du jour fait partie de la clé, pour que la fenêtre glisse.
+"""
+from datetime import datetime, time, timedelta
+
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from . import response_cache
+from .counters import OPEN_ISSUES
+from .models import Issue, Comment
+
+BREAKDOWNS = (
+    ('status', Issue.STATUS_CHOICES),
+    ('priority', Issue.PRIORITY_CHOICES),
+    ('tag', Issue.TAG_CHOICES),
+)
+
+
+def issue_breakdowns(project_id):
+    aggregates = {'total': Count('pk'), 'open': Count('pk', filter=OPEN_ISSUES)}
+    for field, choices in BREAKDOWNS:
+        for value, _ in choices:
+            aggregates[f'{field}__{value}'] = Count('pk', filter=Q(**{field: value}))
+    counts = Issue.objects.filter(project_id=project_id).aggregate(**aggregates)
+
+    result = {'total': counts['total'], 'open': counts['open']}
+    for field, choices in BREAKDOWNS:
+        result[f'by_{field}'] = {value: counts[f'{field}__{value}'] for value, _ in choices}
+    return result
+
+
+def open_issues_by_assignee(project_id):
+    rows = (
+        Issue.objects.filter(OPEN_ISSUES, project_id=project_id)
+        .values('assignee_id').annotate(count=Count('pk')).order_by('-count', 'assignee_id')
+    )
+    return [{'assignee': row['assignee_id'], 'count': row['count']} for row in rows]
+
+
+def comment_activity(project_id, days, today):
+    """Commentaires par jour sur ``days`` jours jusqu'à ``today`` inclus, jours vides compris."""
+    first_day = today - timedelta(days=days - 1)
+    since = timezone.make_aware(datetime.combine(first_day, time.min))
+    rows = (
+        Comment.objects.filter(issue__project_id=project_id, created_time__gte=since)
+        .annotate(day=TruncDate('created_time')).values('day').annotate(count=Count('pk')).order_by()
+    )
+    per_day = {row['day']: row['count'] for row in rows}
+    by_day = [
+        {'date': day.isoformat(), 'count': per_day.get(day, 0)}
+        for day in (first_day + timedelta(days=offset) for offset in range(days))
+    ]
+    return {'days': days, 'total': sum(per_day.values()), 'by_day': by_day}
+
+
+def compute(project_id, days, today):
+    return {
+        'project': int(project_id),
+        'issues': issue_breakdowns(project_id),
+        'open_issues_by_assignee': open_issues_by_assignee(project_id),
+        'comments': comment_activity(project_id, days, today),
+    }
+
+
+def project_stats(project_id, days):
+    today = timezone.localdate()
+    cache = response_cache.get_cache()
+    if cache is None:
+        return compute(project_id, days, today)
+    generation, = response_cache.get_generations(cache, [response_cache.project_scope(project_id)])
+    # Les jours dépendent du fuseau courant
+    key = ':'.join([
+        'softdesk:stats', str(int(project_id)), str(days), timezone.get_current_timezone_name(),
+        today.isoformat(), str(generation),
+    ])
+    data = cache.get(key)
+    if data is None:
+        data = compute(project_id, days, today)
+        cache.set(key, data, response_cache.default_ttl())
+    return data
@@ -0,0 +1,1724 @@
+import asyncio
+import contextlib
+import csv
+import datetime
+import decimal
+import gzip
+import json
+import unittest
+import uuid
+import tempfile
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.core.cache import cache
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.base import BaseHandler
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import AsyncClient, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import get_resolver, resolve
+from django.core.exceptions import ImproperlyConfigured
+from django.utils import timezone
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from softdesk_api import compression, metrics, renderers, replicas, sqlite
+from users.models import CustomUser
+from . import benchmark, counters, events, export, feed, jobs, membership, search
+from .models import Project, Contributor, Issue, Comment, Tombstone, Job, ActivityEvent
+from .management.commands import explain_queries
+from .serializers import (
+    ProjectSerializer, IssueSerializer, CommentSerializer, JobSerializer,
+    ProjectValuesSerializer, IssueValuesSerializer, CommentValuesSerializer,
+)
+
+
+def adapted_middleware():
+    """Middlewares et hooks que Django fait passer par un thread (ou l'inverse) sous ASGI."""
+    adapted = []
+    adapt_method_mode = BaseHandler.adapt_method_mode
+
+    def spy(self, is_async, method, method_is_async=None, debug=False, name=None):
+        if method_is_async is None:
+            method_is_async = iscoroutinefunction(method)
+        if is_async != method_is_async:
+            adapted.append(name or method.__qualname__)
+        return adapt_method_mode(self, is_async, method, method_is_async, debug, name)
+
+    with mock.patch.object(BaseHandler, 'adapt_method_mode', spy):
+        ASGIHandler()
+    return adapted
+
+
+class ProjectsAPITestCase(TestCase):
+    """Jeu de données commun : un auteur, un projet, des issues et des commentaires."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = CustomUser.objects.create_user(username='author', password='password123')
+        cls.other = CustomUser.objects.create_user(username='other', password='password123')
+        cls.project = Project.objects.create(
+            name='Project', description='Description', type='BACKEND', author=cls.user
+        )
+        Contributor.objects.create(user=cls.user, project=cls.project)
+        cls.issues = [
+            Issue.objects.create(
+                title=f'Issue {i}', description='Description', tag='BUG', priority='LOW',
+                project=cls.project, author=cls.user, assignee=cls.user,
+            )
+            for i in range(30)
+        ]
+        cls.issue = cls.issues[0]
+        for i in range(30):
+            Comment.objects.create(issue=cls.issue, description=f'Comment {i}', author=cls.user)
+
+    def setUp(self):
+        # Les caches survivent au rollback des transactions de test
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def count_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return len(ctx.captured_queries)
+
+
+@override_settings(SOFTDESK_RESPONSE_CACHE=None)  # mesure le chemin non mis en cache
+class QueryCountTests(ProjectsAPITestCase):
+    """Le nombre de requêtes d'une liste ne doit pas dépendre de la taille de page."""
+
+    def assertConstantQueries(self, url):
+        self.client.get(url)  # amorce les caches
+        small = self.count_queries(f'{url}?page_size=2')
+        large = self.count_queries(f'{url}?page_size=30')
+        self.assertEqual(small, large, f'{url} fait des requêtes N+1')
+
+    def test_project_list(self):
+        for i in range(10):
+            Project.objects.create(name=f'P{i}', description='d', type='IOS', author=self.other)
+        self.assertConstantQueries('/api/projects/')
+
+    def test_contributor_list(self):
+        for i in range(5):
+            user = CustomUser.objects.create_user(username=f'contrib{i}', password='password123')
+            Contributor.objects.create(user=user, project=self.project)
+        self.assertConstantQueries(f'/api/projects/{self.project.pk}/contributors/')
+
+    def test_issue_list(self):
+        self.assertConstantQueries(f'/api/projects/{self.project.pk}/issues/')
+
+    def test_comment_list(self):
+        self.assertConstantQueries(
+            f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/'
+        )
+
+    def test_update_keeps_updated_time(self):
+        before = Issue.objects.get(pk=self.issue.pk).updated_time
+        response = self.client.patch(
+            f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/', {'status': 'FINISHED'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertGreater(Issue.objects.get(pk=self.issue.pk).updated_time, before)
+
+
+@override_settings(SOFTDESK_RESPONSE_CACHE=None)
+class KeysetPaginationTests(ProjectsAPITestCase):
+
+    def walk(self, url):
+        self.client.get(url)  # amorce les caches
+        ids, queries = [], []
+        while url:
+            with CaptureQueriesContext(connection) as ctx:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('count', response.data)
+            queries.append(len(ctx.captured_queries))
+            ids += [item['id'] for item in response.data['results']]
+            url = response.data['next']
+        return ids, queries
+
+    def test_issue_cursor_walk(self):
+        ids, queries = self.walk(
+            f'/api/projects/{self.project.pk}/issues/?pagination=cursor&page_size=7'
+        )
+        self.assertEqual(ids, [issue.pk for issue in self.issues])
+        self.assertEqual(len(set(queries)), 1)
+
+    def test_comment_cursor_walk_newest_first(self):
+        ids, _ = self.walk(
+            f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/?pagination=cursor'
+        )
+        expected = list(
+            Comment.objects.filter(issue=self.issue).order_by('-created_time', '-id')
+            .values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_cursor_walk_with_shared_timestamps(self):
+        # Comme après bulk/ : tout le projet partage le même created_time
+        Issue.objects.filter(project=self.project).update(created_time=timezone.now())
+        url = f'/api/projects/{self.project.pk}/issues/?pagination=cursor&page_size=4'
+        ids, _ = self.walk(url)
+        self.assertEqual(ids, [issue.pk for issue in self.issues])
+
+        # Retour en arrière depuis la dernière page par les liens previous
+        while (next_url := self.client.get(url).data['next']) is not None:
+            url = next_url
+        backwards = []
+        with CaptureQueriesContext(connection) as ctx:
+            while url:
+                response = self.client.get(url)
+                backwards = [item['id'] for item in response.data['results']] + backwards
+                url = response.data['previous']
+        self.assertEqual(backwards, ids)
+        self.assertFalse(any('OFFSET' in q['sql'] for q in ctx.captured_queries))
+
+    def test_invalid_cursor(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        for cursor in ('nope', 'cD0x', 'cD1ub3QtYS1kYXRlJnA9MQ=='):  # illisible, un champ, date invalide
+            self.assertEqual(self.client.get(url, {'cursor': cursor}).status_code, 404, cursor)
+
+    def test_page_number_is_default(self):
+        response = self.client.get(f'/api/projects/{self.project.pk}/issues/')
+        self.assertEqual(response.data['count'], len(self.issues))
+
+
+class MembershipCacheTests(ProjectsAPITestCase):
+
+    def membership_queries(self, method, url, data=None):
+        with CaptureQueriesContext(connection) as ctx:
+            response = getattr(self.client, method)(url, data)
+        return response, [
+            q['sql'] for q in ctx.captured_queries if 'projects_contributor' in q['sql']
+        ]
+
+    def test_cache_hit_does_no_membership_query(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        self.client.get(url)
+        response, queries = self.membership_queries('get', url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+    def test_create_checks_membership_once(self):
+        url = f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/'
+        response, queries = self.membership_queries('post', url, {'description': 'Hello'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(queries), 1)
+
+    def test_invalidated_on_contributor_changes(self):
+        self.client.force_authenticate(self.other)
+        url = f'/api/projects/{self.project.pk}/issues/'
+        self.assertEqual(self.client.get(url).status_code, 403)
+        contributor = Contributor.objects.create(user=self.other, project=self.project)
+        self.assertEqual(self.client.get(url).status_code, 200)
+        contributor.delete()
+        self.assertEqual(self.client.get(url).status_code, 403)
+
+    @override_settings(SOFTDESK_MEMBERSHIP_TTL=300, SOFTDESK_MEMBERSHIP_LOCAL_TTL=5)
+    def test_process_local_cache_uses_short_ttl(self):
+        self.assertEqual(membership.ttl(), 5)
+        with override_settings(
+            CACHES={
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'shared': {'BACKEND': 'django.core.cache.backends.dummy.DummyCache'},
+            },
+            SOFTDESK_MEMBERSHIP_CACHE='shared',
+        ):
+            self.assertEqual(membership.ttl(), 300)
+
+
+class ExplainQueriesCommandTests(ProjectsAPITestCase):
+
+    def test_nested_lists_use_indexes(self):
+        out = StringIO()
+        call_command('explain_queries', stdout=out)
+        output = out.getvalue()
+        for name in ('project-issues-list', 'issue-comments-list', 'project-contributors-list'):
+            self.assertIn(name, output)
+        self.assertIn('issue_project_created_idx', output)
+        self.assertIn('comment_issue_created_idx', output)
+
+    def test_fail_on_scan_passes_on_own_workload(self):
+        out = StringIO()
+        call_command('explain_queries', '--fail-on-scan', stdout=out)
+        self.assertIn('projects-list?scope=member', out.getvalue())
+        self.assertIn('project_live_idx', out.getvalue())
+        self.assertIn('Aucun parcours complet de table.', out.getvalue())
+
+    def test_is_full_scan(self):
+        command = explain_queries.Command
+        self.assertTrue(command.is_full_scan('2 0 0 SCAN projects_issue'))
+        self.assertTrue(command.is_full_scan('2 0 0 SEARCH projects_issue\n9 0 0 USE TEMP B-TREE FOR ORDER BY'))
+        self.assertFalse(command.is_full_scan('2 0 0 SCAN projects_issue USING INDEX issue_project_created_idx'))
+
+
+class ConditionalGetTests(ProjectsAPITestCase):
+
+    def test_list_not_modified(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        response = self.client.get(url)
+        self.assertIn('ETag', response)
+        self.assertNotIn('Last-Modified', response)
+        with CaptureQueriesContext(connection) as ctx:
+            cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.assertFalse(any('"projects_issue"."title"' in q['sql'] for q in ctx.captured_queries))
+
+    def test_list_cursor_page_has_no_aggregate(self):
+        url = f'/api/projects/{self.project.pk}/issues/?pagination=cursor'
+        with override_settings(SOFTDESK_RESPONSE_CACHE=None):
+            self.client.get(url)  # appartenance en cache
+            with self.assertNumQueries(1):
+                response = self.client.get(url)
+            self.assertIn('ETag', response)
+            with self.assertNumQueries(1):
+                self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 304)
+
+    def test_list_cache_hit_has_no_query(self):
+        url = '/api/projects/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            self.assertEqual(self.client.get(url)['ETag'], etag)
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_list_etag_changes_on_write(self):
+        url = f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/'
+        etag = self.client.get(url)['ETag']
+        Comment.objects.create(issue=self.issue, description='New', author=self.user)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_if_modified_since_after_delete(self):
+        url = f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/'
+        since = http_date(time.time() + 60)
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=since).status_code, 200)
+        Comment.objects.filter(issue=self.issue).first().delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 29)
+
+    def test_detail_last_modified(self):
+        url = f'/api/projects/{self.project.pk}/'
+        response = self.client.get(url)
+        cached = self.client.get(url, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        self.assertEqual(cached.status_code, 304)
+
+    def test_detail_not_modified(self):
+        url = f'/api/projects/{self.project.pk}/'
+        response = self.client.get(url)
+        cached = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(cached.status_code, 304)
+        self.client.patch(url, {'name': 'Renamed'})
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag']).status_code, 200)
+
+    def test_detail_unknown_object(self):
+        self.assertEqual(self.client.get('/api/projects/999999/').status_code, 404)
+        self.assertEqual(self.client.get('/api/projects/abc/').status_code, 404)
+
+
+class ChangesTests(ProjectsAPITestCase):
+
+    def sync(self, since=None, page_size=100):
+        url = f'/api/projects/{self.project.pk}/changes/'
+        params = {'page_size': page_size}
+        if since:
+            params['since'] = since
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def sync_all(self, since=None, page_size=100):
+        issues, comments, deleted = [], [], []
+        while True:
+            data = self.sync(since, page_size)
+            issues += [item['id'] for item in data['issues']]
+            comments += [item['id'] for item in data['comments']]
+            deleted += [(item['type'], item['id']) for item in data['deleted']]
+            since = data['cursor']
+            if not data['has_more']:
+                return issues, comments, deleted, since
+
+    def test_full_sync_in_pages(self):
+        issues, comments, deleted, _ = self.sync_all(page_size=7)
+        self.assertCountEqual(issues, [issue.pk for issue in self.issues])
+        self.assertEqual(len(comments), 30)
+        self.assertEqual(deleted, [])
+
+    def test_incremental_sync(self):
+        *_, cursor = self.sync_all()
+        self.issues[1].status = 'FINISHED'
+        self.issues[1].save()
+        comment = Comment.objects.filter(issue=self.issue).first()
+        comment_id = comment.pk
+        comment.delete()
+        issue_id = self.issues[2].pk
+        self.issues[2].delete()
+
+        issues, comments, deleted, cursor = self.sync_all(cursor)
+        # L'issue dont un commentaire a été supprimé change aussi (comment_count)
+        self.assertCountEqual(issues, [self.issues[1].pk, self.issue.pk])
+        self.assertEqual(comments, [])
+        self.assertEqual(deleted, [('comment', comment_id), ('issue', issue_id)])
+        self.assertEqual(self.sync(cursor)['issues'], [])
+
+    def test_changes_sharing_one_instant_span_pages(self):
+        *_, cursor = self.sync_all()
+        response = self.client.patch(f'/api/projects/{self.project.pk}/issues/bulk/', [
+            {'id': issue.pk, 'status': 'IN_PROGRESS'} for issue in self.issues[:21]
+        ], format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(len(set(Issue.objects.filter(status='IN_PROGRESS').values_list('updated_time', flat=True))), 1)
+
+        issues, *_ = self.sync_all(cursor, page_size=5)
+        self.assertCountEqual(issues, [issue.pk for issue in self.issues[:21]])
+
+    def test_timestamp_since(self):
+        since = timezone.now()
+        self.issues[1].save()
+        self.assertEqual([item['id'] for item in self.sync(since)['issues']], [self.issues[1].pk])
+        self.assertEqual(self.sync(timezone.now())['issues'], [])
+
+    def test_cascade_does_not_record_comments(self):
+        self.issue.delete()
+        self.assertEqual(
+            list(Tombstone.objects.values_list('type', flat=True)), [Tombstone.ISSUE]
+        )
+
+    def test_requires_contributor(self):
+        self.client.force_authenticate(self.other)
+        response = self.client.get(f'/api/projects/{self.project.pk}/changes/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_invalid_cursor(self):
+        response = self.client.get(f'/api/projects/{self.project.pk}/changes/', {'since': 'nope'})
+        self.assertEqual(response.status_code, 400)
+
+
+class BulkIssueTests(ProjectsAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = f'/api/projects/{self.project.pk}/issues/bulk/'
+
+    def payload(self, count):
+        return [
+            {'title': f'Bulk {i}', 'description': 'd', 'tag': 'TASK', 'priority': 'HIGH',
+             'assignee': self.user.pk}
+            for i in range(count)
+        ]
+
+    def test_bulk_create_constant_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, self.payload(1000), format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertEqual(len(response.data), 1000)
+        self.assertEqual(Issue.objects.filter(title__startswith='Bulk').count(), 1000)
+        self.assertLess(len(ctx.captured_queries), 20)
+
+    def test_bulk_create_reports_item_errors(self):
+        payload = self.payload(3)
+        payload[1]['tag'] = 'NOPE'
+        payload[2]['assignee'] = 999999
+        response = self.client.post(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('tag', response.data[1])
+        self.assertIn('assignee', response.data[2])
+        self.assertFalse(Issue.objects.filter(title__startswith='Bulk').exists())
+
+    def test_bulk_update(self):
+        before = Issue.objects.get(pk=self.issues[3].pk).updated_time
+        payload = [{'id': issue.pk, 'status': 'FINISHED'} for issue in self.issues[:5]]
+        response = self.client.patch(self.url, payload, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(Issue.objects.filter(status='FINISHED').count(), 5)
+        self.assertGreater(Issue.objects.get(pk=self.issues[3].pk).updated_time, before)
+
+    def test_bulk_update_requires_author(self):
+        Contributor.objects.create(user=self.other, project=self.project)
+        self.client.force_authenticate(self.other)
+        response = self.client.patch(self.url, [{'id': self.issue.pk, 'status': 'FINISHED'}], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('id', response.data[0])
+
+    def test_bulk_delete(self):
+        ids = [issue.pk for issue in self.issues[:10]]
+        response = self.client.delete(self.url, ids, format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(Issue.objects.filter(pk__in=ids).exists())
+
+    def test_bulk_delete_unknown_id(self):
+        response = self.client.delete(self.url, [self.issue.pk, 999999], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertTrue(Issue.objects.filter(pk=self.issue.pk).exists())
+
+
+class ExportTests(ProjectsAPITestCase):
+
+    def export(self, output):
+        response = self.client.get(f'/api/projects/{self.project.pk}/export/', {'output': output})
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_groups_comments_under_issue(self):
+        lines = [json.loads(line) for line in self.export('ndjson').splitlines()]
+        self.assertEqual(len(lines), 60)
+        self.assertEqual(lines[0]['type'], 'issue')
+        self.assertEqual(lines[0]['id'], self.issue.pk)
+        self.assertTrue(all(line['type'] == 'comment' for line in lines[1:31]))
+        self.assertTrue(all(line['type'] == 'issue' for line in lines[31:]))
+
+    def test_csv(self):
+        rows = list(csv.DictReader(StringIO(self.export('csv'))))
+        self.assertEqual(len(rows), 60)
+        self.assertEqual(rows[1]['issue_id'], str(self.issue.pk))
+
+    def test_requires_contributor(self):
+        self.client.force_authenticate(self.other)
+        response = self.client.get(f'/api/projects/{self.project.pk}/export/')
+        self.assertEqual(response.status_code, 403)
+
+    def test_unknown_output(self):
+        response = self.client.get(f'/api/projects/{self.project.pk}/export/', {'output': 'xml'})
+        self.assertEqual(response.status_code, 400)
+
+    def test_post_body_not_an_object(self):
+        response = self.client.post(f'/api/projects/{self.project.pk}/export/', ['csv'], format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(Job.objects.get().params, {'output': 'ndjson'})
+
+    def test_rows_read_in_one_transaction(self):
+        depth = len(connection.savepoint_ids)
+        rows = export.iter_rows(self.project.pk)
+        next(rows)
+        self.assertEqual(len(connection.savepoint_ids), depth + 1)
+        rows.close()
+        self.assertEqual(len(connection.savepoint_ids), depth)
+
+    def test_postgresql_snapshot_is_repeatable_read(self):
+        fake = mock.MagicMock(vendor='postgresql', in_atomic_block=False)
+        with mock.patch.object(export, 'connections', {'default': fake}):
+            self.assertEqual(len(list(export.iter_rows(self.project.pk))), 60)
+        fake.cursor.return_value.__enter__.return_value.execute.assert_called_once_with(
+            'SET TRANSACTION ISOLATION LEVEL REPEATABLE READ READ ONLY',
+        )
+
+    async def test_async_stream_under_asgi(self):
+        response = await AsyncClient().get(
+            f'/api/projects/{self.project.pk}/export/',
+            headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        lines = [json.loads(line) async for chunk in response.streaming_content for line in chunk.splitlines()]
+        self.assertEqual(len(lines), 60)
+        self.assertEqual(lines[0]['id'], self.issue.pk)
+
+
+class SearchTests(ProjectsAPITestCase):
+
+    def search(self, q, **params):
+        response = self.client.get(f'/api/projects/{self.project.pk}/search/', {'q': q, **params})
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.data
+
+    def test_ranked_and_highlighted(self):
+        Issue.objects.create(
+            title='Crash au démarrage', description='Le serveur plante', tag='BUG', priority='HIGH',
+            project=self.project, author=self.user, assignee=self.user,
+        )
+        comment = Comment.objects.create(issue=self.issue, description='Même crash ici', author=self.user)
+        results = self.search('crash')['results']
+        self.assertEqual([hit['type'] for hit in results], ['issue', 'comment'])
+        self.assertIn('<mark>Crash</mark>', results[0]['title'])
+        self.assertEqual(results[1]['id'], comment.pk)
+        self.assertEqual(results[1]['issue'], self.issue.pk)
+
+    def test_user_text_is_escaped(self):
+        Issue.objects.create(
+            title='<img src=x onerror=alert(1)> crash', description='<script>crash()</script>', tag='BUG',
+            priority='HIGH', project=self.project, author=self.user, assignee=self.user,
+        )
+        hit = self.search('crash')['results'][0]
+        self.assertEqual(hit['title'], '&lt;img src=x onerror=alert(1)&gt; <mark>crash</mark>')
+        self.assertEqual(hit['snippet'], '&lt;script&gt;<mark>crash</mark>()&lt;/script&gt;')
+
+    def test_postgres_backend(self):
+        # Pas de PostgreSQL ici : requête et mise en forme sur un curseur simulé
+        row = ('issue', 7, 7, f'{search.MARK_START}Crash{search.MARK_END} <b>', 'a & b', 0.5)
+        with mock.patch.object(search, 'connection') as conn:
+            cursor = conn.cursor.return_value.__enter__.return_value
+            cursor.fetchall.return_value = [row]
+            results = search.PostgresSearchBackend().search(3, 'crash', 10, 20)
+        sql, params = cursor.execute.call_args.args
+        self.assertIn("websearch_to_tsquery('simple', %(query)s)", sql)
+        self.assertEqual((params['query'], params['project'], params['limit'], params['offset']), ('crash', 3, 10, 20))
+        self.assertIn(f'StartSel={search.MARK_START}', params['options'])
+        self.assertEqual(results, [{
+            'type': 'issue', 'id': 7, 'issue': 7, 'title': '<mark>Crash</mark> &lt;b&gt;',
+            'snippet': 'a &amp; b', 'rank': 0.5,
+        }])
+        self.assertEqual(search.PostgresSearchBackend().search(3, '  ', 10), [])
+
+    def test_index_follows_writes(self):
+        issue = self.issues[5]
+        issue.title = 'Refonte paiement'
+        issue.save()
+        self.assertEqual(self.search('paiement')['results'][0]['id'], issue.pk)
+        issue.delete()
+        self.assertEqual(self.search('paiement')['results'], [])
+
+    def test_bulk_created_rows_are_indexed(self):
+        Comment.objects.bulk_create([
+            Comment(issue=self.issue, description='introuvable autrement', author=self.user)
+        ])
+        self.assertEqual(len(self.search('introuvable')['results']), 1)
+
+    def test_prefix_pagination_and_syntax(self):
+        data = self.search('Comm', page_size=10)
+        self.assertEqual(len(data['results']), 10)
+        self.assertIsNotNone(data['next'])
+        self.assertEqual(self.search('"AND (OR')['results'], [])
+
+    def test_scoped_to_project(self):
+        other = Project.objects.create(name='Other', description='d', type='IOS', author=self.user)
+        Contributor.objects.create(user=self.user, project=other)
+        response = self.client.get(f'/api/projects/{other.pk}/search/', {'q': 'Comment'})
+        self.assertEqual(response.data['results'], [])
+
+    def test_project_is_a_match_term(self):
+        self.assertEqual(
+            search.SQLiteFTSBackend.match_expression('crash log', 3),
+            'project_id : "3" AND {title body} : ("crash" "log"*)',
+        )
+        # Le numéro du projet n'est pas cherché dans le texte
+        other = Project.objects.create(pk=987654, name='Other', description='d', type='IOS', author=self.user)
+        Contributor.objects.create(user=self.user, project=other)
+        Issue.objects.create(title='Crash', description='d', tag='BUG', priority='LOW',
+                             project=other, author=self.user, assignee=self.user)
+        response = self.client.get(f'/api/projects/{other.pk}/search/', {'q': '987654'})
+        self.assertEqual(response.data['results'], [])
+        response = self.client.get(f'/api/projects/{other.pk}/search/', {'q': 'crash'})
+        self.assertEqual(len(response.data['results']), 1)
+
+    def test_rebuild_command(self):
+        call_command('rebuild_search_index', stdout=StringIO())
+        self.assertEqual(len(self.search('Issue', page_size=100)['results']), 30)
+
+
+class CounterTests(ProjectsAPITestCase):
+
+    def assertCounters(self, issues, open_issues, comments):
+        self.project.refresh_from_db()
+        self.issue.refresh_from_db()
+        self.assertEqual(
+            (self.project.issue_count, self.project.open_issue_count, self.issue.comment_count),
+            (issues, open_issues, comments),
+        )
+
+    def test_single_writes(self):
+        self.assertCounters(30, 30, 30)
+        url = f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/'
+        self.client.patch(url, {'status': 'FINISHED'})
+        self.assertCounters(30, 29, 30)
+        self.client.patch(url, {'title': 'Renamed'})
+        self.assertCounters(30, 29, 30)
+        self.client.post(f'{url}comments/', {'description': 'New'})
+        self.assertCounters(30, 29, 31)
+        Comment.objects.filter(issue=self.issue).first().delete()
+        self.assertCounters(30, 29, 30)
+        self.issues[1].delete()
+        self.assertCounters(29, 28, 30)
+
+    def test_bulk_writes(self):
+        url = f'/api/projects/{self.project.pk}/issues/bulk/'
+        self.client.post(url, [
+            {'title': 'Bulk', 'description': 'd', 'tag': 'TASK', 'priority': 'LOW', 'assignee': self.user.pk}
+        ] * 5, format='json')
+        self.assertCounters(35, 35, 30)
+        self.client.patch(url, [{'id': issue.pk, 'status': 'FINISHED'} for issue in self.issues[:3]], format='json')
+        self.assertCounters(35, 32, 30)
+        self.client.delete(url, [issue.pk for issue in self.issues[1:3]], format='json')
+        self.assertCounters(33, 32, 30)
+
+    @override_settings(SOFTDESK_RESPONSE_CACHE=None)
+    def test_project_list_single_query_with_counts(self):
+        self.client.get('/api/projects/')
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get('/api/projects/')
+        self.assertEqual(response.data['results'][0]['issue_count'], 30)
+        listing = [q for q in ctx.captured_queries if 'LIMIT' in q['sql']]
+        self.assertEqual(len(listing), 1)
+        self.assertNotIn('projects_issue', listing[0]['sql'])
+
+    def test_stale_instance_does_not_overwrite_counters(self):
+        stale_issue = Issue.objects.get(pk=self.issue.pk)
+        stale_project = Project.objects.get(pk=self.project.pk)
+        Comment.objects.create(issue=self.issue, description='c', author=self.user)
+        Issue.objects.create(title='T', description='d', tag='BUG', priority='LOW',
+                             project=self.project, author=self.user, assignee=self.user)
+        stale_issue.title = 'Renommée'
+        stale_issue.save()
+        stale_project.name = 'Renommé'
+        stale_project.save()
+        self.assertCounters(31, 31, 31)
+        self.assertEqual(Issue.objects.get(pk=self.issue.pk).title, 'Renommée')
+
+    def test_rebuild_command(self):
+        Project.objects.update(issue_count=0, open_issue_count=0)
+        Issue.objects.update(comment_count=0)
+        call_command('rebuild_counters', stdout=StringIO())
+        self.assertCounters(30, 30, 30)
+
+    def test_rebuild_touches_only_corrected_rows(self):
+        url = f'/api/projects/{self.project.pk}/issues/{self.issues[1].pk}/'
+        etag = self.client.get(url)['ETag']
+        before = dict(Issue.objects.values_list('pk', 'updated_time'))
+        Issue.objects.filter(pk=self.issue.pk).update(comment_count=0)
+        self.assertEqual(counters.rebuild(), (0, 1))
+        after = dict(Issue.objects.values_list('pk', 'updated_time'))
+        self.assertGreater(after.pop(self.issue.pk), before.pop(self.issue.pk))
+        self.assertEqual(after, before)
+        self.assertEqual(self.client.get(url, headers={'If-None-Match': etag}).status_code, 304)
+
+        # Le compteur corrigé est visible : nouvel ETag et cache invalidé
+        response = self.client.get(f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/')
+        self.assertEqual(response.data['comment_count'], 30)
+        self.assertEqual(counters.rebuild(), (0, 0))
+
+
+class SQLitePragmaTests(TestCase):
+
+    def test_pragmas_applied_on_connection(self):
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            previous = cursor.fetchone()[0]
+        with override_settings(SOFTDESK_SQLITE_PRAGMAS={'cache_size': -1234}):
+            sqlite.apply_pragmas(sender=type(connection), connection=connection)
+        with connection.cursor() as cursor:
+            cursor.execute('PRAGMA cache_size')
+            self.assertEqual(cursor.fetchone()[0], -1234)
+            cursor.execute(f'PRAGMA cache_size = {previous}')
+
+
+class AsyncViewTests(ProjectsAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+        self.async_client = AsyncClient()
+
+    async def assertSameAsSync(self, path):
+        sync = await sync_to_async(self.client.get)(f'/api/{path}')
+        response = await self.async_client.get(f'/api/async/{path}', headers=self.headers)
+        self.assertEqual(response.status_code, sync.status_code)
+        self.assertEqual(
+            json.loads(response.content.decode().replace('/api/async/', '/api/')),
+            json.loads(sync.content),
+        )
+
+    async def test_same_json_as_sync_views(self):
+        project, issue = self.project.pk, self.issue.pk
+        comment = await Comment.objects.filter(issue=self.issue).values_list('pk', flat=True).afirst()
+        for path in [
+            'projects/', f'projects/{project}/',
+            f'projects/{project}/issues/?page=2&page_size=7', f'projects/{project}/issues/{issue}/',
+            f'projects/{project}/issues/{issue}/comments/',
+            f'projects/{project}/issues/{issue}/comments/{comment}/',
+            f'projects/{project}/issues/999999/', f'projects/{project}/issues/?page=99',
+        ]:
+            with self.subTest(path=path):
+                await self.assertSameAsSync(path)
+
+    async def test_requires_authentication_and_membership(self):
+        response = await AsyncClient().get('/api/async/projects/')
+        self.assertEqual(response.status_code, 401)
+        response = await AsyncClient().get(
+            f'/api/async/projects/{self.project.pk}/issues/',
+            headers={'Authorization': f'Bearer {AccessToken.for_user(self.other)}'},
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class BulkContributorTests(ProjectsAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.team = [
+            CustomUser.objects.create_user(username=f'member{i}', password='password123') for i in range(20)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.url = f'/api/projects/{self.project.pk}/contributors/bulk/'
+
+    def members(self):
+        return set(Contributor.objects.filter(project=self.project).values_list('user_id', flat=True))
+
+    def test_bulk_add_is_idempotent_and_constant_queries(self):
+        ids = [user.pk for user in self.team]
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, ids[:10], format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        queries = len(ctx.captured_queries)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(self.url, ids, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(len(ctx.captured_queries), queries)
+        self.assertEqual(len(response.data), 20)
+        self.assertEqual(self.members(), {self.user.pk, *ids})
+
+    def test_bulk_add_membership_visible_immediately(self):
+        member = self.team[0]
+        other_client = APIClient()
+        other_client.force_authenticate(member)
+        issues_url = f'/api/projects/{self.project.pk}/issues/'
+        self.assertEqual(other_client.get(issues_url).status_code, 403)
+        self.client.post(self.url, [member.pk], format='json')
+        self.assertEqual(other_client.get(issues_url).status_code, 200)
+
+    def test_bulk_add_validation(self):
+        response = self.client.post(self.url, [self.team[0].pk, 999999, 'x'], format='json')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data[0], {})
+        self.assertIn('user', response.data[1])
+        self.assertIn('user', response.data[2])
+        self.assertEqual(self.members(), {self.user.pk})
+
+    def test_bulk_remove(self):
+        self.client.post(self.url, [user.pk for user in self.team], format='json')
+        response = self.client.delete(self.url, [self.user.pk], format='json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.delete(self.url, [user.pk for user in self.team[:15]], format='json')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.members(), {self.user.pk, *(user.pk for user in self.team[15:])})
+
+    def test_only_author(self):
+        Contributor.objects.create(user=self.other, project=self.project)
+        self.client.force_authenticate(self.other)
+        response = self.client.post(self.url, [self.team[0].pk], format='json')
+        self.assertEqual(response.status_code, 403)
+        response = self.client.post(
+            f'/api/projects/{self.project.pk}/contributors/', {'user': self.team[0].pk}, format='json'
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_membership_lookup(self):
+        projects = [
+            Project.objects.create(name=f'P{i}', description='d', type='IOS', author=self.other)
+            for i in range(5)
+        ]
+        Contributor.objects.create(user=self.user, project=projects[2])
+        ids = [self.project.pk] + [project.pk for project in projects] + [999999]
+        url = '/api/projects/membership/?ids=' + ','.join(map(str, ids))
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len([q for q in ctx.captured_queries if 'projects_contributor' in q['sql']]), 1)
+        expected = {str(pk): pk in (self.project.pk, projects[2].pk) for pk in ids}
+        self.assertEqual(response.data, expected)
+
+        # Les réponses sont ensuite servies par le cache
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(url).data, expected)
+        self.assertFalse([q for q in ctx.captured_queries if 'projects_contributor' in q['sql']])
+        self.assertEqual(self.client.get('/api/projects/membership/?ids=1,a').status_code, 400)
+
+
+class ScopedProjectListTests(ProjectsAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.others = [
+            Project.objects.create(name=f'P{i}', description='d', type='IOS', author=cls.other)
+            for i in range(5)
+        ]
+
+    def listed(self, url='/api/projects/?scope=member'):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200, response.data)
+        return [project['id'] for project in response.data['results']]
+
+    def test_member_scope(self):
+        self.assertEqual(len(self.listed('/api/projects/')), 6)
+        self.assertEqual(self.listed(), [self.project.pk])
+        Contributor.objects.create(user=self.user, project=self.others[3])
+        self.assertEqual(self.listed(), [self.project.pk, self.others[3].pk])
+        Contributor.objects.filter(user=self.user, project=self.project).delete()
+        self.assertEqual(self.listed(), [self.others[3].pk])
+        self.assertEqual(self.client.get('/api/projects/?scope=nope').status_code, 400)
+
+    @override_settings(SOFTDESK_RESPONSE_CACHE=None)
+    def test_project_ids_cached(self):
+        self.listed()
+        with CaptureQueriesContext(connection) as ctx:
+            self.listed()
+        self.assertFalse([q for q in ctx.captured_queries if 'projects_contributor' in q['sql']])
+
+    @override_settings(SOFTDESK_RESPONSE_CACHE=None, SOFTDESK_MEMBER_PROJECTS_CACHE_MAX=2)
+    def test_semi_join_beyond_cache_limit(self):
+        for project in self.others[:3]:
+            Contributor.objects.create(user=self.user, project=project)
+        self.listed()
+        with CaptureQueriesContext(connection) as ctx:
+            ids = self.listed()
+        self.assertEqual(ids, [self.project.pk] + [project.pk for project in self.others[:3]])
+        listing = [q['sql'] for q in ctx.captured_queries if 'LIMIT' in q['sql']]
+        self.assertEqual(len(listing), 1)
+        self.assertIn('SELECT U0."project_id" FROM "projects_contributor" U0', listing[0])
+
+
+class ResponseCacheTests(ProjectsAPITestCase):
+
+    def list_queries(self, url):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, [q['sql'] for q in ctx.captured_queries if 'LIMIT' in q['sql']]
+
+    def assertCached(self, url):
+        self.client.get(url)
+        response, listing = self.list_queries(url)
+        self.assertEqual(listing, [], f'{url} n\'est pas servie depuis le cache')
+        return response
+
+    def assertFresh(self, url):
+        response, listing = self.list_queries(url)
+        self.assertTrue(listing, f'{url} est servie depuis un cache périmé')
+        return response
+
+    def test_issue_list_invalidated_by_writes(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        self.assertCached(url)
+        Issue.objects.filter(pk=self.issues[1].pk).update(title='Sans signal')
+        self.assertEqual(self.assertCached(url).data['results'][1]['title'], 'Issue 1')
+
+        self.issues[1].title = 'Renommée'
+        self.issues[1].save()
+        self.assertEqual(self.assertFresh(url).data['results'][1]['title'], 'Renommée')
+
+        self.assertCached(url)
+        Comment.objects.create(issue=self.issues[2], description='c', author=self.user)
+        self.assertEqual(self.assertFresh(url).data['results'][2]['comment_count'], 1)
+
+    def test_project_list_invalidated_by_counters(self):
+        self.assertCached('/api/projects/')
+        self.client.post(f'/api/projects/{self.project.pk}/issues/bulk/', [
+            {'title': 'Bulk', 'description': 'd', 'tag': 'TASK', 'priority': 'LOW', 'assignee': self.user.pk}
+        ] * 2, format='json')
+        self.assertEqual(self.assertFresh('/api/projects/').data['results'][0]['issue_count'], 32)
+
+    def test_comment_list_and_scope(self):
+        url = f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/'
+        self.assertCached(url)
+        Comment.objects.filter(issue=self.issue).first().delete()
+        self.assertEqual(self.assertFresh(url).data['count'], 29)
+
+        # Les permissions passent avant le cache
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        Contributor.objects.create(user=self.other, project=self.project)
+        self.assertEqual(self.client.get(url).data['count'], 29)
+
+    def test_query_string_is_part_of_the_key(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        self.assertCached(url)
+        self.assertEqual(len(self.assertFresh(f'{url}?page_size=5').data['results']), 5)
+
+    def test_file_backend(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        with tempfile.TemporaryDirectory() as location, override_settings(CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+            'responses': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache', 'LOCATION': location},
+        }, SOFTDESK_RESPONSE_CACHE='responses'):
+            self.assertCached(url)
+            self.issues[3].delete()
+            self.assertEqual(self.assertFresh(url).data['count'], 29)
+
+
+@override_settings(SOFTDESK_METRICS=True)
+class MetricsTests(ProjectsAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+
+    def sample(self, metric, **labels):
+        return metric.snapshot().get(tuple(labels[name] for name in metric.labels))
+
+    @override_settings(SOFTDESK_RESPONSE_CACHE=None)  # la liste doit lire la base
+    def test_records_queries_and_timings_per_action(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        self.client.get(url)  # amorce les caches
+        metrics.reset()
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(url)
+        labels = {'endpoint': 'project-issues-list', 'action': 'list', 'method': 'GET'}
+        self.assertEqual(self.sample(metrics.REQUESTS, status='200', **labels), 1)
+        counts, total, count = self.sample(metrics.QUERIES, **labels)
+        self.assertEqual((total, count), (len(ctx.captured_queries), 1))
+        self.assertGreater(self.sample(metrics.RENDER_TIME, **labels)[1], 0)
+        self.assertGreater(self.sample(metrics.DB_TIME, **labels)[1], 0)
+
+        self.client.post(url, {'title': 'T', 'description': 'd', 'tag': 'BUG', 'priority': 'LOW',
+                               'assignee': self.user.pk}, format='json')
+        self.assertEqual(
+            self.sample(metrics.REQUESTS, endpoint='project-issues-list', action='create', method='POST',
+                        status='201'),
+            1,
+        )
+
+    def test_prometheus_exposition(self):
+        self.client.get(f'/api/projects/{self.project.pk}/')
+        response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        body = response.content.decode()
+        labels = 'endpoint="projects-detail",action="retrieve",method="GET"'
+        self.assertIn('# TYPE softdesk_request_duration_seconds histogram', body)
+        self.assertIn(f'softdesk_requests_total{{{labels},status="200"}} 1', body)
+        self.assertIn(f'softdesk_request_duration_seconds_bucket{{{labels},le="+Inf"}} 1', body)
+        self.assertIn(f'softdesk_request_duration_seconds_count{{{labels}}} 1', body)
+        self.assertNotIn('endpoint="metrics"', body)
+
+    @override_settings(SOFTDESK_SLOW_QUERY_MS=0, SOFTDESK_SLOW_REQUEST_MS=0)
+    def test_slow_log(self):
+        with self.assertLogs('softdesk.metrics', 'WARNING') as logs:
+            self.client.get(f'/api/projects/{self.project.pk}/')
+        self.assertTrue(any('Requête SQL lente' in line for line in logs.output))
+        self.assertTrue(any(f'GET /api/projects/{self.project.pk}/' in line for line in logs.output))
+
+    async def test_async_views(self):
+        response = await AsyncClient().get(
+            '/api/async/projects/', headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        labels = {'endpoint': 'async-projects-list', 'action': 'project_list', 'method': 'GET'}
+        self.assertEqual(self.sample(metrics.REQUESTS, status='200', **labels), 1)
+        self.assertGreater(self.sample(metrics.QUERIES, **labels)[1], 0)
+
+    @override_settings(SOFTDESK_METRICS=False)
+    def test_disabled(self):
+        self.client.get(f'/api/projects/{self.project.pk}/')
+        self.assertEqual(metrics.REQUESTS.snapshot(), {})
+        self.assertEqual(self.client.get('/metrics').status_code, 404)
+
+
+@override_settings(SOFTDESK_METRICS=True, SOFTDESK_COMPRESSION=True)
+class AsyncMiddlewareTests(SimpleTestCase):
+    """Sous ASGI, ni nos middlewares ni leurs hooks ne passent par un thread."""
+
+    def assertNotAdapted(self, middleware):
+        self.assertEqual([name for name in adapted_middleware() if middleware.__name__ in name], [])
+
+    def test_replica_routing(self):
+        self.assertNotAdapted(replicas.ReplicaRoutingMiddleware)
+
+    def test_compression(self):
+        self.assertNotAdapted(compression.CompressionMiddleware)
+
+    def test_metrics(self):
+        self.assertNotAdapted(metrics.MetricsMiddleware)
+
+
+class ValuesSerializerTests(ProjectsAPITestCase):
+    """Les listes lues en values() doivent rendre exactement le même JSON."""
+
+    def assertSameJSON(self, serializer_class, values_serializer_class, queryset):
+        expected = JSONRenderer().render(serializer_class(queryset, many=True).data)
+        rows = queryset.values(*values_serializer_class.get_columns())
+        self.assertEqual(JSONRenderer().render(values_serializer_class(rows).data), expected)
+
+    def test_parity(self):
+        cases = [
+            (ProjectSerializer, ProjectValuesSerializer, Project.objects.order_by('id')),
+            (IssueSerializer, IssueValuesSerializer, Issue.objects.order_by('id')),
+            (CommentSerializer, CommentValuesSerializer, Comment.objects.order_by('id')),
+        ]
+        for timezone_name in ('UTC', 'Europe/Paris'):
+            with timezone.override(timezone_name):
+                for serializer_class, values_serializer_class, queryset in cases:
+                    with self.subTest(serializer_class.__name__, timezone=timezone_name):
+                        self.assertSameJSON(serializer_class, values_serializer_class, queryset)
+
+    def test_list_endpoints_unchanged(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        for params in ({'page_size': 50}, {'pagination': 'cursor'}):
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids = [item['id'] for item in response.data['results']]
+            issues = Issue.objects.filter(pk__in=ids).order_by('created_time', 'id')
+            self.assertEqual(
+                JSONRenderer().render(response.data['results']),
+                JSONRenderer().render(IssueSerializer(issues, many=True).data),
+            )
+
+    def test_unsupported_field(self):
+        class JobValuesSerializer(IssueValuesSerializer):
+            serializer_class = JobSerializer  # champ url : pas de colonne
+
+        with self.assertRaises(ImproperlyConfigured):
+            JobValuesSerializer.get_columns()
+
+    def test_microbenchmark(self):
+        result = benchmark.measure_serializers(self.project.pk, repeat=1)
+        self.assertEqual(result['issues'], 30)
+        self.assertTrue(result['identical'])
+
+class RendererTests(TestCase):
+    data = {
+        'text': 'Accentué \u2028 ligne',
+        'date': datetime.datetime(2024, 5, 1, 12, 30, 15, 123456, tzinfo=datetime.timezone.utc),
+        'day': datetime.date(2024, 5, 1),
+        'amount': decimal.Decimal('1.50'),
+        'uuid': uuid.UUID(int=1),
+        1: [None, True, 3],
+    }
+
+    @unittest.skipIf(renderers.orjson is None, "orjson n'est pas installé")
+    def test_orjson_matches_drf(self):
+        self.assertEqual(renderers.FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_indent_and_fallback_use_drf(self):
+        indented = renderers.FastJSONRenderer().render(self.data, 'application/json; indent=4')
+        self.assertEqual(indented, JSONRenderer().render(self.data, 'application/json; indent=4'))
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(renderers.FastJSONRenderer().render(self.data), JSONRenderer().render(self.data))
+
+    def test_big_integer_falls_back(self):
+        self.assertEqual(renderers.FastJSONRenderer().render({'n': 2 ** 70}), b'{"n":1180591620717411303424}')
+
+
+class CompressionTests(ProjectsAPITestCase):
+
+    def get(self, url, encoding=None, **headers):
+        if encoding is not None:
+            headers['Accept-Encoding'] = encoding
+        return self.client.get(url, {'page_size': 100}, headers=headers)
+
+    def test_choose_encoding(self):
+        self.assertEqual(compression.choose_encoding('gzip, br', ['br', 'gzip']), 'br')
+        self.assertEqual(compression.choose_encoding('br;q=0.5, gzip', ['br', 'gzip']), 'gzip')
+        self.assertEqual(compression.choose_encoding('*', ['gzip']), 'gzip')
+        self.assertIsNone(compression.choose_encoding('gzip;q=0, identity', ['gzip']))
+        self.assertIsNone(compression.choose_encoding('', ['gzip']))
+
+    @override_settings(SOFTDESK_COMPRESSION_ENCODINGS=('gzip',))
+    def test_gzip_list(self):
+        url = f'/api/projects/{self.project.pk}/issues/'
+        plain = self.get(url)
+        self.assertNotIn('Content-Encoding', plain)
+        response = self.get(url, 'gzip, deflate')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response['Vary'])
+        self.assertLess(len(response.content), len(plain.content))
+        self.assertEqual(gzip.decompress(response.content), plain.content)
+        # ETag affaibli, toujours accepté par If-None-Match
+        self.assertTrue(response['ETag'].startswith('W/'))
+        self.assertEqual(self.get(url, 'gzip', **{'If-None-Match': response['ETag']}).status_code, 304)
+
+    @override_settings(SOFTDESK_COMPRESSION_ENCODINGS=('gzip',))
+    async def test_async_views(self):
+        response = await AsyncClient().get(
+            f'/api/async/projects/{self.project.pk}/issues/', {'page_size': 100},
+            headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}', 'Accept-Encoding': 'gzip'},
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(json.loads(gzip.decompress(response.content))['count'], 30)
+
+    def test_small_and_streaming_responses_untouched(self):
+        response = self.client.get(f'/api/projects/{self.project.pk}/', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response)
+        export = self.client.get(f'/api/projects/{self.project.pk}/export/', headers={'Accept-Encoding': 'gzip'})
+        self.assertTrue(export.streaming)
+        self.assertNotIn('Content-Encoding', export)
+
+    @override_settings(SOFTDESK_COMPRESSION_MIN_SIZE=10 ** 6)
+    def test_threshold(self):
+        response = self.get(f'/api/projects/{self.project.pk}/issues/', 'gzip')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_payload_benchmark(self):
+        results = benchmark.measure_payloads(
+            {'owner': self.user, 'project': self.project.pk, 'issue': self.issue.pk}, repeat=1,
+        )
+        issues = {(row['step'], row['variant']): row for row in results['project-issues-list']}
+        self.assertLess(issues[('request', 'gzip')]['bytes'], issues[('request', 'identity')]['bytes'])
+        self.assertEqual(issues[('request', 'identity')]['bytes'], issues[('render', 'json')]['bytes'])
+
+class ProjectStatsTests(ProjectsAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.url = f'/api/projects/{self.project.pk}/stats/'
+
+    def test_breakdowns(self):
+        Issue.objects.filter(pk__in=[issue.pk for issue in self.issues[:5]]).update(status='FINISHED')
+        Issue.objects.filter(pk__in=[issue.pk for issue in self.issues[5:8]]).update(
+            priority='HIGH', tag='FEATURE', assignee=self.other,
+        )
+        data = self.client.get(self.url).data
+        self.assertEqual(data['issues']['total'], 30)
+        self.assertEqual(data['issues']['open'], 25)
+        self.assertEqual(data['issues']['by_status'], {'TODO': 25, 'IN_PROGRESS': 0, 'FINISHED': 5})
+        self.assertEqual(data['issues']['by_priority'], {'LOW': 27, 'MEDIUM': 0, 'HIGH': 3})
+        self.assertEqual(data['issues']['by_tag'], {'BUG': 27, 'FEATURE': 3, 'TASK': 0})
+        self.assertEqual(data['open_issues_by_assignee'], [
+            {'assignee': self.user.pk, 'count': 22}, {'assignee': self.other.pk, 'count': 3},
+        ])
+
+    def test_comments_by_day(self):
+        old = Comment.objects.filter(issue=self.issue).order_by('id')[:4]
+        Comment.objects.filter(pk__in=[comment.pk for comment in old]).update(
+            created_time=timezone.now() - timedelta(days=2),
+        )
+        comments = self.client.get(self.url, {'days': 7}).data['comments']
+        self.assertEqual(len(comments['by_day']), 7)
+        self.assertEqual(comments['by_day'][-1], {'date': timezone.localdate().isoformat(), 'count': 26})
+        self.assertEqual(comments['by_day'][-3]['count'], 4)
+        self.assertEqual(comments['total'], 30)
+        self.assertEqual(self.client.get(self.url, {'days': 1}).data['comments']['total'], 26)
+
+    @override_settings(SOFTDESK_RESPONSE_CACHE=None)
+    def test_constant_query_count(self):
+        self.client.get(self.url)  # appartenance en cache
+        few = self.count_queries(self.url)
+        Issue.objects.bulk_create([
+            Issue(title='More', description='d', tag='TASK', priority='MEDIUM', status='IN_PROGRESS',
+                  project=self.project, author=self.other, assignee=self.other)
+            for _ in range(50)
+        ])
+        self.assertEqual(self.count_queries(self.url), few)
+        self.assertLessEqual(few, 3)
+
+    def test_cached_until_write(self):
+        self.client.get(self.url)
+        self.assertEqual(self.count_queries(self.url), 0)
+        self.client.post(f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/comments/', {'description': 'New'})
+        self.assertEqual(self.client.get(self.url).data['comments']['total'], 31)
+        self.client.patch(f'/api/projects/{self.project.pk}/issues/{self.issue.pk}/', {'status': 'FINISHED'})
+        self.assertEqual(self.client.get(self.url).data['issues']['by_status']['FINISHED'], 1)
+
+    def test_access_and_validation(self):
+        self.assertEqual(self.client.get(self.url, {'days': 0}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {'days': 'x'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/projects/999999/stats/').status_code, 404)
+        self.assertEqual(self.client.get('/api/projects/abc/stats/').status_code, 404)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+class MyWorkTests(ProjectsAPITestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.shared = Project.objects.create(name='Shared', description='d', type='IOS', author=cls.other)
+        Contributor.objects.create(user=cls.other, project=cls.shared)
+        Contributor.objects.create(user=cls.user, project=cls.shared)
+        cls.assigned = [
+            Issue.objects.create(title=f'Assigned {i}', description='d', tag='TASK', priority='HIGH',
+                                 project=cls.shared, author=cls.other, assignee=cls.user)
+            for i in range(5)
+        ]
+        Issue.objects.create(title='Not mine', description='d', tag='TASK', priority='HIGH',
+                             project=cls.shared, author=cls.other, assignee=cls.other)
+        # Projet dont l'utilisateur n'est pas (ou plus) contributeur
+        hidden = Project.objects.create(name='Hidden', description='d', type='IOS', author=cls.other)
+        Issue.objects.create(title='Hidden', description='d', tag='TASK', priority='HIGH',
+                             project=hidden, author=cls.other, assignee=cls.user)
+
+    def walk(self, **params):
+        ids, url = [], '/api/my-work/'
+        while url:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200, response.data)
+            ids += [item['id'] for item in response.data['results']]
+            url, params = response.data['next'], {}
+        return ids
+
+    def test_feed_items(self):
+        Issue.objects.filter(pk=self.issue.pk).update(updated_time=timezone.now())
+        first = self.client.get('/api/my-work/').data['results'][0]
+        self.assertEqual(first['id'], self.issue.pk)
+        self.assertEqual(first['project'], {'id': self.project.pk, 'name': 'Project'})
+        self.assertEqual(first['roles'], ['assignee', 'author'])
+        latest = Comment.objects.filter(issue=self.issue).order_by('-created_time', '-id')[:3]
+        self.assertEqual([comment['id'] for comment in first['recent_comments']], [c.pk for c in latest])
+        shared = self.client.get('/api/my-work/', {'role': 'assignee', 'page_size': 100}).data['results']
+        item = next(item for item in shared if item['id'] == self.assigned[0].pk)
+        self.assertEqual((item['project']['name'], item['roles']), ('Shared', ['assignee']))
+
+    def test_cursor_walk(self):
+        ids = self.walk(page_size=7)
+        self.assertEqual(len(ids), 35)
+        self.assertEqual(len(set(ids)), 35)
+        expected = Issue.objects.filter(pk__in=ids).order_by('-updated_time', '-id').values_list('id', flat=True)
+        self.assertEqual(ids, list(expected))
+        self.assertEqual(sorted(self.walk(page_size=2, role='assignee')), sorted(ids))
+        self.assertEqual(len(self.walk(role='author')), 30)
+
+    def test_constant_query_count(self):
+        self.client.get('/api/my-work/')  # appartenance en cache
+        self.assertEqual(self.count_queries('/api/my-work/?page_size=5'), 4)
+        self.assertEqual(self.count_queries('/api/my-work/?page_size=50'), 4)
+        self.assertEqual(self.count_queries('/api/my-work/?page_size=50&comments=0&role=author'), 2)
+
+    def test_indexed_role_queries(self):
+        position = (timezone.now(), 10 ** 6)
+        with CaptureQueriesContext(connection) as ctx:
+            feed.issue_rows(self.user.pk, ['assignee', 'author'], position, 10)
+        plans = [connection.cursor().execute('EXPLAIN QUERY PLAN ' + q['sql']).fetchall() for q in ctx]
+        details = [' '.join(str(row[-1]) for row in plan) for plan in plans]
+        self.assertIn('issue_assignee_updated_idx', details[-2])
+        self.assertIn('issue_author_updated_idx', details[-1])
+        self.assertNotIn('TEMP B-TREE', ' '.join(details))  # ordre lu sur l'index
+
+    def test_validation(self):
+        self.assertEqual(self.client.get('/api/my-work/', {'cursor': 'nope'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/my-work/', {'role': 'watcher'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/my-work/', {'comments': 11}).status_code, 400)
+
+class EventStreamTests(ProjectsAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        events.reset_backends()
+        self.addCleanup(events.reset_backends)
+        self.url = f'/api/async/projects/{self.project.pk}/events/'
+        self.headers = {'Authorization': f'Bearer {AccessToken.for_user(self.user)}'}
+
+    @contextlib.asynccontextmanager
+    async def open_stream(self, **headers):
+        response = await AsyncClient().get(self.url, headers={**self.headers, **headers})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        content = response.streaming_content
+        try:
+            self.assertTrue((await anext(content)).startswith(b'retry: '))
+            yield content
+        finally:
+            await content.aclose()
+
+    async def next_event(self, content):
+        chunk = (await asyncio.wait_for(anext(content), 5)).decode()
+        fields = dict(line.split(': ', 1) for line in chunk.strip().split('\n'))
+        return fields.get('id'), fields['event'], json.loads(fields['data'])
+
+    def post_issue(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f'/api/projects/{self.project.pk}/issues/', {
+                'title': 'Live', 'description': 'd', 'tag': 'BUG', 'priority': 'LOW', 'assignee': self.user.pk,
+            }, format='json')
+
+    def test_refused_under_wsgi(self):
+        response = self.client.get(self.url, headers=self.headers)
+        self.assertEqual(response.status_code, 501)
+        self.assertFalse(response.streaming)
+        self.assertFalse(events.get_backend().hub.has_subscriptions())
+
+    async def test_streams_signal_events(self):
+        async with self.open_stream() as content:
+            response = await sync_to_async(self.post_issue)()
+            _, type, data = await self.next_event(content)
+            self.assertEqual(type, 'issue.created')
+            self.assertEqual(data['id'], response.data['id'])
+
+            def delete():
+                with self.captureOnCommitCallbacks(execute=True):
+                    Issue.objects.get(pk=response.data['id']).delete()
+            await sync_to_async(delete)()
+            self.assertEqual((await self.next_event(content))[1], 'issue.deleted')
+
+    async def test_resume_with_last_event_id(self):
+        backend = events.get_backend()
+        first, second, third = [
+            backend.publish(self.project.pk, 'comment.created', {'id': i}) for i in range(3)
+        ]
+        backend.publish(self.project.pk + 1, 'comment.created', {'id': 99})  # autre projet
+        async with self.open_stream(**{'Last-Event-ID': str(first.id)}) as content:
+            self.assertEqual(await self.next_event(content), (str(second.id), 'comment.created', {'id': 1}))
+            self.assertEqual(await self.next_event(content), (str(third.id), 'comment.created', {'id': 2}))
+
+            # Publié pendant le flux : reçu une seule fois
+            await sync_to_async(backend.publish)(self.project.pk, 'comment.updated', {'id': 2})
+            self.assertEqual((await self.next_event(content))[1], 'comment.updated')
+
+    async def test_reset_when_history_is_lost(self):
+        with self.settings(SOFTDESK_EVENTS_HISTORY=2):
+            backend = events.get_backend()
+            first = backend.publish(self.project.pk, 'issue.updated', {'id': 1})
+            for _ in range(3):
+                backend.publish(self.project.pk, 'issue.updated', {'id': 1})
+            for last_event_id in (str(first.id), '1', 'nope'):
+                with self.subTest(last_event_id=last_event_id):
+                    async with self.open_stream(**{'Last-Event-ID': last_event_id}) as content:
+                        self.assertEqual(await self.next_event(content), (None, 'reset', {}))
+
+    async def test_keepalive_and_max_age(self):
+        with self.settings(SOFTDESK_EVENTS_KEEPALIVE=0.01, SOFTDESK_EVENTS_MAX_AGE=0.05):
+            async with self.open_stream() as content:
+                chunks = [chunk async for chunk in content]
+        self.assertTrue(chunks)
+        self.assertTrue(all(chunk == b': keepalive\n\n' for chunk in chunks))
+        self.assertFalse(events.get_backend().hub.has_subscriptions())
+
+    async def test_requires_membership(self):
+        response = await AsyncClient().get(self.url)
+        self.assertEqual(response.status_code, 401)
+        response = await AsyncClient().get(
+            self.url, headers={'Authorization': f'Bearer {AccessToken.for_user(self.other)}'},
+        )
+        self.assertEqual(response.status_code, 403)
+
+    def test_bulk_endpoints_publish(self):
+        backend = events.get_backend()
+        start = backend.publish(self.project.pk, 'issue.updated', {}).id
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/projects/{self.project.pk}/issues/bulk/', [
+                {'title': f'Bulk {i}', 'description': 'd', 'tag': 'TASK', 'priority': 'HIGH', 'assignee': self.user.pk}
+                for i in range(3)
+            ], format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        published = backend.history(self.project.pk, start)
+        self.assertEqual([event.type for event in published], ['issue.created'] * 3)
+        self.assertEqual({event.data['id'] for event in published}, {issue['id'] for issue in response.data})
+
+    def test_nothing_published_without_commit(self):
+        backend = events.get_backend()
+        start = backend.publish(self.project.pk, 'issue.updated', {}).id
+        Comment.objects.create(issue=self.issue, description='rolled back', author=self.user)
+        self.assertEqual(backend.history(self.project.pk, start), [])
+
+    @override_settings(SOFTDESK_EVENTS_BACKEND='projects.events.DatabaseBackend')
+    async def test_database_backend(self):
+        backend = events.get_backend()
+        subscription = backend.hub.subscribe(self.project.pk)
+        self.addCleanup(backend.hub.unsubscribe, subscription)
+        first = await sync_to_async(backend.publish)(self.project.pk, 'issue.created', {'id': 1})
+        await sync_to_async(backend.publish)(self.project.pk + 1, 'issue.created', {'id': 2})
+        second = await sync_to_async(backend.publish)(self.project.pk, 'issue.updated', {'id': 1})
+
+        # Un seul lecteur par processus répartit le journal entre les flux
+        await sync_to_async(backend.poll)()
+        self.assertEqual(await subscription.get(1), first)
+        self.assertEqual(await subscription.get(1), second)
+        self.assertTrue(subscription.queue.empty())
+
+        history = await sync_to_async(backend.history)(self.project.pk, first.id)
+        self.assertEqual(history, [second])
+        await ActivityEvent.objects.filter(pk=first.id).adelete()
+        self.assertIsNone(await sync_to_async(backend.history)(self.project.pk, first.id - 1))
+
+
+class BenchmarkTests(TransactionTestCase):
+    # Les appels concurrents passent par d'autres threads : pas de transaction englobante
+
+    def test_run_small_dataset(self):
+        dataset = {'users': 3, 'projects': 2, 'contributors': 1, 'issues': 10, 'comments': 2}
+        results = benchmark.run(dataset, requests=2, concurrency=2, query_samples=1, pattern='^project-issues')
+        self.assertIn('project-issues-list', results)
+        for name, result in results.items():
+            self.assertEqual(result['errors'], 0, name)
+            self.assertEqual(result['requests'], 2)
+            self.assertLessEqual(result['p50_ms'], result['p99_ms'])
+
+    def test_search_latency_target(self):
+        dataset = {'users': 3, 'projects': 3, 'contributors': 1, 'issues': 50, 'comments': 2}
+        results = benchmark.run(dataset, requests=2, concurrency=2, query_samples=3, pattern='^project-search')
+        self.assertEqual(set(results), set(benchmark.LATENCY_TARGETS))
+        for name, result in results.items():
+            self.assertEqual(result['target_ms'], 50)
+            self.assertTrue(result['target_met'], f"{name} : {result['sequential_ms']} ms")
+
+    def test_run_every_scenario(self):
+        dataset = {'users': 3, 'projects': 2, 'contributors': 1, 'issues': 10, 'comments': 2}
+        results = benchmark.run(dataset, requests=2, concurrency=2, query_samples=1)
+        self.assertEqual(set(results), {scenario[0] for scenario in benchmark.SCENARIOS})
+        for name, result in results.items():
+            self.assertEqual(result['errors'], 0, name)
+            # Le flux SSE n'est servi que sous ASGI : 501 au comptage séquentiel (WSGI)
+            expected_error = [501] if name == 'async-project-events' else []
+            self.assertEqual([code for code in result['status'] if code >= 400], expected_error, name)
+
+    def test_every_api_route_has_a_scenario(self):
+        def names(patterns, prefix=''):
+            for pattern in patterns:
+                route = prefix + str(pattern.pattern)
+                if hasattr(pattern, 'url_patterns'):
+                    yield from names(pattern.url_patterns, route)
+                elif pattern.name and route.startswith('api/'):
+                    yield pattern.name
+
+        dataset = {'users': 3, 'projects': 1, 'contributors': 1, 'issues': 3, 'comments': 1}
+        with tempfile.TemporaryDirectory() as directory, override_settings(SOFTDESK_EXPORT_DIR=directory):
+            ctx = benchmark.prepare(benchmark.seed(**dataset), calls=1)
+        covered = {resolve(path(ctx, 0).split('?')[0]).url_name for _, _, path, _ in benchmark.SCENARIOS}
+        self.assertEqual(set(names(get_resolver().url_patterns)) - covered, set())
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertIsNone(benchmark.percentile([], 50))
+
+
+@override_settings(SOFTDESK_READ_REPLICAS=['replica'], SOFTDESK_REPLICA_STRATEGY='round_robin')
+class ReplicaRoutingTests(TransactionTestCase):
+    """
+    Primaire en mémoire, réplica dans un fichier SQLite alimenté par
+    ``replicas.replicate``. L'alias est déclaré après la préparation des bases
+    de test : le lanceur n'a pas à le créer ni à le vider.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        connections.settings['replica'] = connections.configure_settings({
+            'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': f'{cls.directory.name}/replica.sqlite3'},
+        })['default']
+
+    @classmethod
+    def tearDownClass(cls):
+        connections['replica'].close()
+        del connections['replica']
+        del connections.settings['replica']
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def setUp(self):
+        cache.clear()
+        replicas.reset_lag_cache()
+        self.user = CustomUser.objects.create_user(username='author', password='password123')
+        self.project = Project.objects.create(name='Project', description='d', type='BACKEND', author=self.user)
+        Contributor.objects.create(user=self.user, project=self.project)
+        replicas.replicate('replica')
+        # Écrit après la copie : absent du réplica
+        Project.objects.create(name='Récent', description='d', type='IOS', author=self.user)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def project_count(self, **kwargs):
+        cache.clear()
+        response = self.client.get('/api/projects/', **kwargs)
+        self.assertEqual(response.status_code, 200)
+        return response.data['count']
+
+    def test_safe_requests_read_replica(self):
+        self.assertEqual(self.project_count(), 1)
+        replicas.replicate('replica')
+        self.assertEqual(self.project_count(), 2)
+
+    def test_write_pins_reads_to_primary(self):
+        response = self.client.post('/api/projects/', {'name': 'N', 'description': 'd', 'type': 'IOS'})
+        self.assertEqual(response.status_code, 201)
+        self.assertIn(replicas.PIN_COOKIE, response.cookies)
+        self.assertEqual(self.project_count(), 3)
+        self.client.cookies.clear()
+        self.assertEqual(self.project_count(), 1)
+        self.assertEqual(self.project_count(headers={'X-Pin-Primary': '1'}), 3)
+
+    async def test_async_views_read_replica(self):
+        response = await AsyncClient().get(
+            '/api/async/projects/', headers={'Authorization': f'Bearer {AccessToken.for_user(self.user)}'},
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)['count'], 1)
+
+    def test_pin_cookie_is_per_user(self):
+        self.client.post('/api/projects/', {'name': 'N', 'description': 'd', 'type': 'IOS'})
+        other = CustomUser.objects.create_user(username='other', password='password123')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.project_count(), 1)
+
+    @override_settings(SOFTDESK_REPLICA_MAX_LAG=10)
+    def test_replica_chosen_once_per_request(self):
+        cache.clear()
+        with mock.patch.object(replicas, 'choose_replica', wraps=replicas.choose_replica) as choose, \
+                CaptureQueriesContext(connections['replica']) as captured:
+            response = self.client.get('/api/projects/')
+        self.assertEqual(response.status_code, 200)
+        choose.assert_called_once()
+        self.assertGreater(len(captured.captured_queries), 1)
+
+    def test_lagging_replica_skipped(self):
+        self.assertEqual(self.project_count(), 1)
+        replicas.replicate('replica', synced_at=time.time() - 60)
+        replicas.reset_lag_cache()
+        self.assertEqual(self.project_count(), 2)  # primaire : le réplica est écarté
+
+    def test_membership_read_on_primary(self):
+        member = CustomUser.objects.create_user(username='member', password='password123')
+        Contributor.objects.create(user=member, project=self.project)
+        self.client.force_authenticate(member)
+        self.assertEqual(self.client.get(f'/api/projects/{self.project.pk}/issues/').status_code, 200)
+
+
+class JobTests(ProjectsAPITestCase):
+
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings = override_settings(SOFTDESK_EXPORT_DIR=directory.name, SOFTDESK_JOB_BATCH_SIZE=7)
+        settings.enable()
+        self.addCleanup(settings.disable)
+
+    def run_jobs(self):
+        call_command('run_jobs', '--once', verbosity=0, stdout=StringIO())
+
+    def test_delete_project_is_queued(self):
+        response = self.client.delete(f'/api/projects/{self.project.pk}/')
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.data['status'], Job.QUEUED)
+        self.assertEqual(response['Location'], response.data['url'])
+        self.assertTrue(Project.objects.filter(pk=self.project.pk).exists())
+        # Le projet a déjà disparu de l'API : une seconde demande ne crée pas de tâche
+        self.assertEqual(self.client.delete(f'/api/projects/{self.project.pk}/').status_code, 404)
+        self.assertEqual(Job.objects.count(), 1)
+
+        self.run_jobs()
+        job = self.client.get(f"/api/jobs/{response.data['id']}/").data
+        self.assertEqual(job['status'], Job.SUCCEEDED)
+        self.assertEqual((job['progress'], job['total']), (30, 30))
+        self.assertFalse(Project.objects.filter(pk=self.project.pk).exists())
+        self.assertFalse(Issue.objects.filter(project_id=self.project.pk).exists())
+        self.assertFalse(Comment.objects.exists())
+        self.assertFalse(Contributor.objects.filter(project_id=self.project.pk).exists())
+        self.assertFalse(Tombstone.objects.filter(project_id=self.project.pk).exists())
+
+    def test_deleting_project_refuses_reads_and_writes(self):
+        Contributor.objects.create(user=self.other, project=self.project)
+        self.client.delete(f'/api/projects/{self.project.pk}/')
+        base = f'/api/projects/{self.project.pk}'
+        self.assertEqual(self.client.get(f'{base}/').status_code, 404)
+        self.assertNotIn(self.project.pk, [project['id'] for project in self.client.get('/api/projects/').data['results']])
+        self.assertEqual(self.client.get(f'{base}/issues/').status_code, 403)
+        self.assertEqual(self.client.post(f'{base}/issues/', {'title': 'x', 'description': 'x'}).status_code, 403)
+        self.assertEqual(self.client.get(f'{base}/stats/').status_code, 404)
+        self.assertEqual(self.client.post(f'{base}/contributors/', {'user': self.other.pk}).status_code, 404)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(f'{base}/issues/{self.issue.pk}/comments/').status_code, 403)
+
+    def test_delete_job_skips_per_row_work(self):
+        self.client.delete(f'/api/projects/{self.project.pk}/')
+        with mock.patch.object(events, 'publish') as publish, \
+                mock.patch('projects.jobs.response_cache.invalidate_project') as invalidate_project, \
+                CaptureQueriesContext(connection) as queries:
+            self.run_jobs()
+        # Un seul événement et une seule invalidation pour tout le projet
+        publish.assert_called_once_with(self.project.pk, 'project.deleted', {'id': self.project.pk})
+        self.assertEqual(invalidate_project.call_count, 2)  # marquage (reprise) puis suppression du projet
+        self.assertFalse(Tombstone.objects.exists())
+        self.assertFalse([query for query in queries if 'INSERT INTO "projects_tombstone"' in query['sql']])
+
+    def test_delete_job_removes_exports(self):
+        self.client.post(f'/api/projects/{self.project.pk}/export/', {'output': 'csv'})
+        self.run_jobs()
+        path = jobs.export_dir() / Job.objects.get(kind=Job.EXPORT_PROJECT).result['file']
+        self.assertTrue(path.exists())
+        self.client.delete(f'/api/projects/{self.project.pk}/')
+        self.run_jobs()
+        self.assertFalse(path.exists())
+
+    def test_stale_save_keeps_deleting_flag(self):
+        stale = Project.objects.get(pk=self.project.pk)
+        jobs.mark_deleting(self.project.pk)
+        stale.name = 'Renommé'
+        stale.save()
+        project = Project.objects.get(pk=self.project.pk)
+        self.assertEqual((project.name, project.deleting), ('Renommé', True))
+
+    def test_rebuild_search_index_job(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM projects_search_index')
+            cursor.execute(
+                "INSERT INTO projects_search_index(rowid, title, body, project_id, issue_id) "
+                "VALUES (99999998, 'fantôme', '', %s, 49999999)", [self.project.pk],
+            )
+        out = StringIO()
+        call_command('rebuild_search_index', '--queue', stdout=out)
+        call_command('rebuild_search_index', '--queue', stdout=out)
+        job = Job.objects.get(kind=Job.REBUILD_SEARCH_INDEX)
+        self.assertIn(f'Tâche {job.pk}', out.getvalue())
+
+        self.run_jobs()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.progress, job.total)
+        self.assertGreater(job.total, 7)  # plusieurs lots (SOFTDESK_JOB_BATCH_SIZE=7)
+        backend = search.get_backend()
+        self.assertEqual(len(backend.search(self.project.pk, 'Issue', 100)), 30)
+        self.assertEqual(len(backend.search(self.project.pk, 'Comment', 100)), 30)
+        self.assertEqual(backend.search(self.project.pk, 'fantôme', 100), [])
+
+    def test_delete_requires_author(self):
+        Contributor.objects.create(user=self.other, project=self.project)
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.delete(f'/api/projects/{self.project.pk}/').status_code, 403)
+        self.assertFalse(Job.objects.exists())
+
+    def test_export_job_and_download(self):
+        response = self.client.post(f'/api/projects/{self.project.pk}/export/', {'output': 'csv'})
+        self.assertEqual(response.status_code, 202)
+        job_url = response.data['url']
+        self.assertEqual(self.client.get(f'{job_url}download/').status_code, 404)
+
+        self.run_jobs()
+        self.assertEqual(self.client.get(job_url).data['result']['issues'], 30)
+        download = self.client.get(f'{job_url}download/')
+        self.assertEqual(download.status_code, 200)
+        rows = list(csv.DictReader(StringIO(b''.join(download.streaming_content).decode())))
+        self.assertEqual(len(rows), 60)
+
+    def test_jobs_are_private(self):
+        job = jobs.enqueue(Job.EXPORT_PROJECT, self.project.pk, self.user, output='ndjson')
+        self.client.force_authenticate(self.other)
+        self.assertEqual(self.client.get(f'/api/jobs/{job.pk}/').status_code, 404)
+        self.assertEqual(self.client.get('/api/jobs/').data['count'], 0)
+
+    def test_claim_is_exclusive(self):
+        job = jobs.enqueue(Job.REBUILD_COUNTERS, self.project.pk, self.user)
+        self.assertEqual(jobs.claim('a').pk, job.pk)
+        self.assertIsNone(jobs.claim('b'))
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.worker, job.attempts), (Job.RUNNING, 'a', 1))
+
+    @override_settings(SOFTDESK_JOB_MAX_ATTEMPTS=2)
+    def test_failed_job_is_retried_then_failed(self):
+        job = jobs.enqueue(Job.EXPORT_PROJECT, self.project.pk, self.user, output='xml')
+        with self.assertLogs('softdesk.jobs', 'ERROR'):
+            self.assertFalse(jobs.run(jobs.claim('a')))
+            job.refresh_from_db()
+            self.assertEqual(job.status, Job.QUEUED)
+            self.assertFalse(jobs.run(jobs.claim('a')))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('KeyError', job.error)
+
+    def test_stale_job_is_requeued(self):
+        job = jobs.enqueue(Job.REBUILD_COUNTERS, self.project.pk, self.user)
+        jobs.claim('a')
+        self.assertEqual(jobs.requeue_stale(60), 0)
+        Job.objects.filter(pk=job.pk).update(heartbeat_time=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(jobs.requeue_stale(60), 1)
+        self.assertEqual(jobs.claim('b').pk, job.pk)
+
+    def test_rebuild_counters_job(self):
+        Project.objects.filter(pk=self.project.pk).update(issue_count=0)
+        response = self.client.post(f'/api/projects/{self.project.pk}/rebuild-counters/')
+        self.assertEqual(response.status_code, 202)
+        self.run_jobs()
+        self.project.refresh_from_db()
+        self.assertEqual(self.project.issue_count, 30)
@@ -1,18 +1,42 @@
 from django.urls import path, include
 from rest_framework_nested import routers
-from .views import ProjectViewSet, ContributorViewSet, IssueViewSet, CommentViewSet
+from . import async_views
+from .views import (
+    ProjectViewSet, ContributorViewSet, IssueViewSet, CommentViewSet, ChangesViewSet, SearchViewSet, JobViewSet,
+    MyWorkViewSet,
+)
 
 router = routers.SimpleRouter()
 router.register(r'projects', ProjectViewSet, basename='projects')
+router.register(r'jobs', JobViewSet, basename='jobs')
+router.register(r'my-work', MyWorkViewSet, basename='my-work')
 
 projects_router = routers.NestedSimpleRouter(router, r'projects', lookup='project')
 projects_router.register(r'contributors', ContributorViewSet, basename='project-contributors')
 projects_router.register(r'issues', IssueViewSet, basename='project-issues')
+projects_router.register(r'changes', ChangesViewSet, basename='project-changes')
+projects_router.register(r'search', SearchViewSet, basename='project-search')
 
 issues_router = routers.NestedSimpleRouter(projects_router, r'issues', lookup='issue')
 issues_router.register(r'comments', CommentViewSet, basename='issue-comments')
 
+# Lectures asynchrones (ASGI), même JSON que les routes ci-dessus
+async_urlpatterns = [
+    path('projects/', async_views.project_list, name='async-projects-list'),
+    path('projects/<int:pk>/', async_views.project_detail, name='async-projects-detail'),
+    path('projects/<int:project_pk>/issues/', async_views.issue_list, name='async-project-issues-list'),
+    path('projects/<int:project_pk>/issues/<int:pk>/', async_views.issue_detail,
+         name='async-project-issues-detail'),
+    path('projects/<int:project_pk>/issues/<int:issue_pk>/comments/', async_views.comment_list,
+         name='async-issue-comments-list'),
+    path('projects/<int:project_pk>/issues/<int:issue_pk>/comments/<int:pk>/', async_views.comment_detail,
+         name='async-issue-comments-detail'),
+    # Flux Server-Sent Events de l'activité du projet
+    path('projects/<int:project_pk>/events/', async_views.project_events, name='async-project-events'),
+]
+
 urlpatterns = [
+    path('async/', include(async_urlpatterns)),
     path('', include(router.urls)),
     path('', include(projects_router.urls)),
     path('', include(issues_router.urls)),
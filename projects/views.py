@@ -1,21 +1,192 @@
-from rest_framework import viewsets, permissions
-from .models import Project, Contributor, Issue, Comment
-from .serializers import ProjectSerializer, ContributorSerializer, IssueSerializer, CommentSerializer
+import base64
+import binascii
+
+from rest_framework import viewsets, permissions, status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+from .models import Project, Contributor, Issue, Comment, Tombstone, Job
+from .serializers import (
+    ProjectSerializer, ContributorSerializer, IssueSerializer, CommentSerializer,
+    IssueBulkSerializer, IssueChangeSerializer, CommentChangeSerializer, TombstoneSerializer, JobSerializer,
+    ProjectValuesSerializer, IssueValuesSerializer, CommentValuesSerializer,
+)
 from .permissions import IsAuthorOrReadOnly, IsContributor
-from .pagination import CustomPageNumberPagination
-from rest_framework.exceptions import PermissionDenied
+from . import counters, events, export, feed, jobs, membership, response_cache, search, stats
+from .conditional import ConditionalGetMixin
+from .response_cache import CachedListMixin
+from softdesk_api.values_serializers import ValuesListMixin
+from .membership import is_contributor
+from users.models import CustomUser
+from .pagination import CustomPageNumberPagination, SwitchablePagination
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.db.models import Q
+from django.http import FileResponse, Http404, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+
+def bulk_id(value):
+    """Identifiant entier d'un élément de lot, ``None`` sinon (les booléens sont refusés)."""
+    return value if isinstance(value, int) and not isinstance(value, bool) else None
+
+
+def job_response(job, request):
+    data = JobSerializer(job, context={'request': request}).data
+    return Response(data, status=status.HTTP_202_ACCEPTED, headers={'Location': data['url']})
+
+
+class ReadOptimizedQuerysetMixin:
+    """
+    Restreint les colonnes chargées aux champs du serializer pour les lectures.
+
+    Les relations sont exposées par clé primaire (``author_id``...), donc aucune
+    requête supplémentaire n'est faite par objet : une page coûte un nombre fixe
+    de requêtes quelle que soit sa taille. ``only()`` n'est pas appliqué aux
+    écritures, sinon ``save()`` ignorerait les champs différés (``updated_time``).
+    """
+    read_only_fields = ()
+
+    def optimize_queryset(self, queryset):
+        if self.read_only_fields and self.request.method in permissions.SAFE_METHODS:
+            queryset = queryset.only(*self.read_only_fields)
+        return queryset
+
 
-class ProjectViewSet(viewsets.ModelViewSet):
-    queryset = Project.objects.all()  # select_related retiré
+class ProjectViewSet(
+    ConditionalGetMixin, CachedListMixin, ValuesListMixin, ReadOptimizedQuerysetMixin, viewsets.ModelViewSet,
+):
     serializer_class = ProjectSerializer
+    values_serializer_class = ProjectValuesSerializer
     permission_classes = [permissions.IsAuthenticated, IsAuthorOrReadOnly]
     pagination_class = CustomPageNumberPagination
+    read_only_fields = (
+        'id', 'name', 'description', 'type', 'author_id', 'created_time',
+        'issue_count', 'open_issue_count',
+    )
+
+    scopes = ('all', 'member')
+
+    def get_scope(self):
+        """``?scope=member`` limite la liste aux projets dont l'utilisateur est contributeur."""
+        if self.action != 'list':
+            return 'all'
+        scope = self.request.query_params.get('scope', 'all')
+        if scope not in self.scopes:
+            raise ValidationError({'scope': f"Valeurs possibles : {', '.join(self.scopes)}."})
+        return scope
+
+    def get_queryset(self):
+        queryset = Project.objects.filter(deleting=False).order_by('id')
+        if self.get_scope() == 'member':
+            queryset = queryset.filter(**membership.member_project_filter(self.request.user.pk))
+        return self.optimize_queryset(queryset)
+
+    def get_cache_scopes(self):
+        return [response_cache.PROJECTS]
+
+    def get_cache_audience(self):
+        return f'user:{self.request.user.pk}' if self.get_scope() == 'member' else 'all'
 
     def perform_create(self, serializer):
         project = serializer.save(author=self.request.user)
         Contributor.objects.create(user = self.request.user, project = project)
 
+    membership_max_ids = 500
+
+    @action(detail=False, methods=['get'])
+    def membership(self, request):
+        """
+        ``?ids=1,2,3`` : indique pour chaque projet si l'utilisateur y contribue,
+        en une lecture groupée du cache et au plus une requête.
+        """
+        raw = [value for value in request.query_params.get('ids', '').split(',') if value.strip()]
+        try:
+            project_ids = list(dict.fromkeys(int(value) for value in raw))
+        except ValueError:
+            raise ValidationError({'ids': "Liste d'entiers séparés par des virgules attendue."})
+        if len(project_ids) > self.membership_max_ids:
+            raise ValidationError({'ids': f"Au plus {self.membership_max_ids} projets par requête."})
+        member = membership.member_projects(request, project_ids)
+        return Response({str(project_id): project_id in member for project_id in project_ids})
+
+    def check_contributor(self, pk):
+        """404 pour un projet inexistant, 403 pour un non-contributeur ; renvoie l'identifiant."""
+        try:
+            pk = int(pk)
+        except ValueError:
+            raise Http404
+        if not is_contributor(self.request, pk):
+            if not Project.objects.filter(pk=pk, deleting=False).exists():
+                raise Http404
+            raise PermissionDenied("Vous n'êtes pas contributeur de ce projet.")
+        return pk
+
+    stats_max_days = 365
+
+    @action(detail=True, methods=['get'])
+    def stats(self, request, pk=None):
+        """
+        Tableau de bord : issues par statut, priorité et tag, issues ouvertes par
+        assignee et commentaires par jour sur ``?days=`` jours (30 par défaut).
+        Réservé aux contributeurs ; voir ``projects.stats``.
+        """
+        try:
+            days = int(request.query_params.get('days', 30))
+        except ValueError:
+            days = 0
+        if not 1 <= days <= self.stats_max_days:
+            raise ValidationError({'days': f"Entier entre 1 et {self.stats_max_days} attendu."})
+        return Response(stats.project_stats(self.check_contributor(pk), days))
+
+    def destroy(self, request, *args, **kwargs):
+        """
+        La suppression en CASCADE d'un gros projet est faite par lots en tâche de
+        fond (``manage.py run_jobs``) : 202 et la tâche à suivre. Le projet
+        disparaît de l'API dès maintenant.
+        """
+        project = self.get_object()
+        with transaction.atomic():
+            jobs.mark_deleting(project.pk)
+            job = jobs.enqueue(Job.DELETE_PROJECT, project.pk, request.user, unique=True)
+        return job_response(job, request)
+
+    @action(detail=True, methods=['get', 'post'])
+    def export(self, request, pk=None):
+        """
+        Exporte les issues du projet et leurs commentaires, ``?output=ndjson``
+        (défaut) ou ``?output=csv``. Réservé aux contributeurs.
+        GET renvoie le flux directement ; POST crée une tâche de fond (202) dont
+        le fichier se télécharge ensuite sur ``/api/jobs/<id>/download/``.
+        Sous ASGI, le flux est asynchrone pour ne pas être lu en entier avant l'envoi.
+        """
+        data = request.data if isinstance(request.data, dict) else {}
+        output = request.query_params.get('output') or data.get('output') or 'ndjson'
+        if output not in export.RENDERERS:
+            raise ValidationError({'output': f"Formats disponibles : {', '.join(export.RENDERERS)}."})
+        pk = self.check_contributor(pk)
+
+        if request.method == 'POST':
+            job = jobs.enqueue(Job.EXPORT_PROJECT, pk, request.user, output=output)
+            return job_response(job, request)
+
+        chunks = export.RENDERERS[output](export.iter_rows(pk))
+        if isinstance(request._request, ASGIRequest):
+            chunks = export.aiter_chunks(chunks)
+        response = StreamingHttpResponse(chunks, content_type=export.CONTENT_TYPES[output])
+        response['Content-Disposition'] = f'attachment; filename="project-{pk}.{output}"'
+        return response
+
+    @action(detail=True, methods=['post'], url_path='rebuild-counters')
+    def rebuild_counters(self, request, pk=None):
+        """Recalcul des compteurs du projet en tâche de fond (auteur du projet)."""
+        project = self.get_object()
+        job = jobs.enqueue(Job.REBUILD_COUNTERS, project.pk, request.user, unique=True)
+        return job_response(job, request)
+
 class ContributorViewSet(viewsets.ModelViewSet):
     serializer_class = ContributorSerializer
     permission_classes = [permissions.IsAuthenticated]
@@ -23,70 +194,473 @@ class ContributorViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         project_id = self.kwargs.get("project_pk")
         if project_id:
-            return Contributor.objects.filter(project_id=project_id)
+            return Contributor.objects.filter(project_id=project_id).order_by('id')
         return Contributor.objects.none()
 
+    def get_managed_project_id(self):
+        """Identifiant du projet, si l'utilisateur en est l'auteur (sans charger l'auteur)."""
+        project = get_object_or_404(
+            Project.objects.filter(deleting=False).only('id', 'author_id'), pk=self.kwargs.get("project_pk"),
+        )
+        if project.author_id != self.request.user.pk:
+            raise PermissionDenied("Vous n'êtes pas autorisé à ajouter des contributeurs à ce projet.")
+        return project.pk
+
     def perform_create(self, serializer):
-        project_id = self.kwargs.get("project_pk")
-        project = get_object_or_404(Project, pk=project_id)
+        serializer.save(project_id=self.get_managed_project_id())
 
-        if project.author != self.request.user:
-            raise PermissionDenied("Vous n'êtes pas autorisé à ajouter des contributeurs à ce projet.")
+    bulk_max_items = 1000
+    bulk_batch_size = 500
+
+    @action(detail=False, methods=['post', 'delete'], url_path='bulk')
+    def bulk(self, request, project_pk=None):
+        """
+        Ajout (POST) ou retrait (DELETE) d'une liste d'identifiants d'utilisateurs.
+        L'ajout est idempotent : les utilisateurs déjà contributeurs sont ignorés
+        par la contrainte unique (``ignore_conflicts``). Réservé à l'auteur du projet.
+        """
+        project_id = self.get_managed_project_id()
+        user_ids = request.data
+        if not isinstance(user_ids, list) or not user_ids:
+            raise ValidationError({'non_field_errors': ["Une liste non vide est attendue."]})
+        if len(user_ids) > self.bulk_max_items:
+            raise ValidationError(
+                {'non_field_errors': [f"Au plus {self.bulk_max_items} éléments par requête."]}
+            )
+        ids = [bulk_id(pk) for pk in user_ids]
+        if request.method == 'POST':
+            return self.bulk_add(ids, user_ids, project_id)
+        return self.bulk_remove(ids, user_ids, project_id)
 
-        serializer.save(project=project)
+    def bulk_add(self, ids, user_ids, project_id):
+        existing = set(CustomUser.objects.filter(pk__in=[pk for pk in ids if pk is not None])
+                       .values_list('pk', flat=True))
+        errors = [
+            {} if pk in existing else {'user': [f"Utilisateur {value} introuvable."]}
+            for pk, value in zip(ids, user_ids)
+        ]
+        if any(errors):
+            raise ValidationError(errors)
 
-class IssueViewSet(viewsets.ModelViewSet):
+        with transaction.atomic():
+            Contributor.objects.bulk_create(
+                [Contributor(project_id=project_id, user_id=pk) for pk in existing],
+                batch_size=self.bulk_batch_size, ignore_conflicts=True,
+            )
+        # bulk_create ne déclenche pas les signaux d'invalidation
+        membership.invalidate_many([(pk, project_id) for pk in existing])
+        response_cache.invalidate_project(project_id)
+        contributors = self.get_queryset().filter(user_id__in=existing)
+        return Response(ContributorSerializer(contributors, many=True).data, status=status.HTTP_201_CREATED)
+
+    def bulk_remove(self, ids, user_ids, project_id):
+        author_id = self.request.user.pk
+        errors = [
+            {'user': [f"Identifiant invalide : {value}."]} if pk is None
+            else {'user': ["L'auteur du projet ne peut pas être retiré."]} if pk == author_id
+            else {}
+            for pk, value in zip(ids, user_ids)
+        ]
+        if any(errors):
+            raise ValidationError(errors)
+
+        # Les signaux post_delete de Contributor invalident les caches
+        with transaction.atomic():
+            Contributor.objects.filter(project_id=project_id, user_id__in=ids).delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class IssueViewSet(
+    ConditionalGetMixin, CachedListMixin, ValuesListMixin, ReadOptimizedQuerysetMixin, viewsets.ModelViewSet,
+):
     serializer_class = IssueSerializer
+    values_serializer_class = IssueValuesSerializer
     permission_classes = [permissions.IsAuthenticated, IsContributor, IsAuthorOrReadOnly]
-    pagination_class = CustomPageNumberPagination
+    pagination_class = SwitchablePagination
+    keyset_ordering = ('created_time', 'id')
+    read_only_fields = (
+        'id', 'title', 'description', 'tag', 'priority', 'status',
+        'assignee_id', 'author_id', 'created_time', 'comment_count',
+    )
 
     def get_queryset(self):
         project_id = self.kwargs.get("project_pk")
         if project_id:
-            queryset = Issue.objects.filter(project_id=project_id)
-            # Si nécessaire, décommentez la ligne suivante :
-            # queryset = queryset.select_related('author', 'assignee')
+            queryset = Issue.objects.filter(project_id=project_id).order_by('created_time', 'id')
         else:
             queryset = Issue.objects.none()
-        return queryset
+        return self.optimize_queryset(queryset)
+
+    def get_cache_scopes(self):
+        # IsContributor a déjà refusé les non-contributeurs : tous partagent l'entrée
+        return [response_cache.project_scope(self.kwargs['project_pk'])]
 
     def perform_create(self, serializer):
         project_id = self.kwargs.get("project_pk")
-        project = get_object_or_404(Project, pk=project_id)
 
-        if not project.contributors.filter(user=self.request.user).exists():
+        # Déjà vérifié par IsContributor : le memo de la requête évite une 2e requête.
+        # Un contributeur implique que le projet existe.
+        if not is_contributor(self.request, project_id):
             raise PermissionDenied("Vous n'êtes pas contributeur de ce projet.")
 
-        serializer.save(project=project, author=self.request.user)
+        serializer.save(project_id=project_id, author=self.request.user)
+
+    bulk_max_items = 1000
+    bulk_batch_size = 500
+
+    @action(detail=False, methods=['post', 'patch', 'delete'], url_path='bulk')
+    def bulk(self, request, project_pk=None):
+        """
+        Création (POST), modification (PATCH, chaque élément porte son ``id``) ou
+        suppression (DELETE, liste d'``id``) d'un lot d'issues en une transaction.
+        Le projet et l'appartenance sont vérifiés une seule fois par IsContributor.
+        En cas d'erreur rien n'est écrit et la réponse 400 contient une liste
+        d'erreurs alignée sur les éléments envoyés (``{}`` pour un élément valide).
+        """
+        items = request.data
+        if not isinstance(items, list) or not items:
+            raise ValidationError({'non_field_errors': ["Une liste non vide est attendue."]})
+        if len(items) > self.bulk_max_items:
+            raise ValidationError(
+                {'non_field_errors': [f"Au plus {self.bulk_max_items} éléments par requête."]}
+            )
+
+        if request.method == 'POST':
+            return self.bulk_create_issues(items, project_pk)
+        if request.method == 'PATCH':
+            return self.bulk_update_issues(items, project_pk)
+        return self.bulk_delete_issues(items, project_pk)
+
+    def get_bulk_context(self, items):
+        # Tous les assignees du lot sont chargés en une requête
+        assignee_ids = {
+            item['assignee'] for item in items
+            if isinstance(item, dict) and isinstance(item.get('assignee'), int)
+        }
+        context = self.get_serializer_context()
+        context['users'] = CustomUser.objects.in_bulk(assignee_ids)
+        return context
+
+    def bulk_create_issues(self, items, project_pk):
+        serializer = IssueBulkSerializer(data=items, many=True, context=self.get_bulk_context(items))
+        serializer.is_valid(raise_exception=True)
 
-class CommentViewSet(viewsets.ModelViewSet):
+        issues = [
+            Issue(**data, project_id=project_pk, author=self.request.user)
+            for data in serializer.validated_data
+        ]
+        with transaction.atomic():
+            Issue.objects.bulk_create(issues, batch_size=self.bulk_batch_size)
+            counters.recount_projects([project_pk])
+            # bulk_create ne déclenche pas les signaux
+            for issue in issues:
+                events.publish_issue(issue, 'issue.created')
+        response_cache.invalidate_project(project_pk)
+        return Response(IssueSerializer(issues, many=True).data, status=status.HTTP_201_CREATED)
+
+    get_bulk_id = staticmethod(bulk_id)
+
+    def get_bulk_instances(self, ids, project_pk):
+        ids = [pk for pk in map(self.get_bulk_id, ids) if pk is not None]
+        return Issue.objects.filter(project_id=project_pk).in_bulk(ids)
+
+    def check_bulk_instance(self, instance, pk):
+        if instance is None:
+            return {'id': [f"Issue {pk} introuvable dans ce projet."]}
+        if instance.author_id != self.request.user.pk:
+            return {'id': [f"Seul l'auteur peut modifier ou supprimer l'issue {pk}."]}
+        return {}
+
+    def bulk_update_issues(self, items, project_pk):
+        items = [item if isinstance(item, dict) else {} for item in items]
+        instances = self.get_bulk_instances([item.get('id') for item in items], project_pk)
+        context = self.get_bulk_context(items)
+
+        errors, updates, fields = [], [], set()
+        for item in items:
+            instance = instances.get(self.get_bulk_id(item.get('id')))
+            error = self.check_bulk_instance(instance, item.get('id'))
+            if not error:
+                serializer = IssueBulkSerializer(instance, data=item, partial=True, context=context)
+                if serializer.is_valid():
+                    updates.append((instance, serializer.validated_data))
+                    fields.update(serializer.validated_data)
+                else:
+                    error = serializer.errors
+            errors.append(error)
+        if any(errors):
+            raise ValidationError(errors)
+
+        now = timezone.now()
+        for instance, data in updates:
+            for attr, value in data.items():
+                setattr(instance, attr, value)
+            instance.updated_time = now  # bulk_update ne gère pas auto_now
+        with transaction.atomic():
+            Issue.objects.bulk_update(
+                [instance for instance, _ in updates], [*fields, 'updated_time'],
+                batch_size=self.bulk_batch_size,
+            )
+            if 'status' in fields:
+                counters.recount_projects([project_pk])
+            for instance, _ in updates:
+                events.publish_issue(instance, 'issue.updated')
+        response_cache.invalidate_project(project_pk)
+        return Response(IssueSerializer([instance for instance, _ in updates], many=True).data)
+
+    def bulk_delete_issues(self, ids, project_pk):
+        instances = self.get_bulk_instances(ids, project_pk)
+        errors = [self.check_bulk_instance(instances.get(self.get_bulk_id(pk)), pk) for pk in ids]
+        if any(errors):
+            raise ValidationError(errors)
+
+        with transaction.atomic():
+            Issue.objects.filter(pk__in=instances.keys()).delete()
+            counters.recount_projects([project_pk])
+        response_cache.invalidate_project(project_pk)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+class CommentViewSet(
+    ConditionalGetMixin, CachedListMixin, ValuesListMixin, ReadOptimizedQuerysetMixin, viewsets.ModelViewSet,
+):
     serializer_class = CommentSerializer
+    values_serializer_class = CommentValuesSerializer
     permission_classes = [permissions.IsAuthenticated, IsContributor, IsAuthorOrReadOnly]
-    pagination_class = CustomPageNumberPagination
+    pagination_class = SwitchablePagination
+    keyset_ordering = ('-created_time', '-id')
+    read_only_fields = ('id', 'description', 'author_id', 'created_time')
 
     def get_queryset(self):
         project_id = self.kwargs.get("project_pk")
         issue_id = self.kwargs.get("issue_pk")
 
         if project_id and issue_id:
+            # L'appartenance au projet est déjà vérifiée par IsContributor :
+            # inutile de joindre Contributor sur chaque ligne.
             queryset = Comment.objects.filter(
                 issue_id=issue_id,
                 issue__project_id=project_id,
-                issue__project__contributors__user=self.request.user
-            ).order_by('-created_time')
-            # Si nécessaire, décommentez la ligne suivante :
-            # queryset = queryset.select_related('author', 'issue')
+            ).order_by('-created_time', '-id')
         else:
             queryset = Comment.objects.none()
-        return queryset
+        return self.optimize_queryset(queryset)
+
+    def get_cache_scopes(self):
+        return [response_cache.project_scope(self.kwargs['project_pk'])]
 
     def perform_create(self, serializer):
         project_id = self.kwargs.get("project_pk")
         issue_id = self.kwargs.get("issue_pk")
-        project = get_object_or_404(Project, pk=project_id)
-        issue = get_object_or_404(Issue, pk=issue_id, project=project)
 
-        if not project.contributors.filter(user=self.request.user).exists():
+        if not is_contributor(self.request, project_id):
             raise PermissionDenied("Vous n'êtes pas contributeur de ce projet.")
 
+        issue = get_object_or_404(Issue.objects.only('id', 'project_id'), pk=issue_id, project_id=project_id)
         serializer.save(issue=issue, author=self.request.user)
+
+
+class ChangesViewSet(viewsets.ViewSet):
+    """
+    Synchronisation incrémentale d'un projet : issues et commentaires créés ou
+    modifiés, et suppressions (Tombstone), depuis ``?since=<curseur>``.
+
+    Chaque page renvoie au plus ``page_size`` changements dans l'ordre
+    chronologique et le curseur à repasser pour la suite (``has_more``).
+    Le coût dépend du nombre de changements, pas de la taille du projet.
+    """
+    permission_classes = [permissions.IsAuthenticated, IsContributor]
+    page_size = 100
+    max_page_size = 500
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params.get('page_size', self.page_size))
+        except ValueError:
+            raise ValidationError({'page_size': "Doit être un entier."})
+        return max(1, min(page_size, self.max_page_size))
+
+    # Ordre de la fusion à instant égal ; un ``since`` réduit à un horodatage
+    # se place après les trois
+    KINDS = ('issue', 'comment', 'deleted')
+
+    @staticmethod
+    def encode_cursor(position):
+        moment, kind, pk = position
+        return base64.urlsafe_b64encode(f'{moment.isoformat()}|{kind}|{pk}'.encode()).decode()
+
+    def get_since(self, request):
+        """
+        Position ``(instant, type, id)`` du dernier changement reçu. Plusieurs
+        changements partagent souvent un même instant (``bulk/``) : l'instant
+        seul ne suffit pas à reprendre au bon endroit. Un horodatage ISO est
+        aussi accepté (tout ce qui est strictement postérieur).
+        """
+        since = request.query_params.get('since')
+        if not since:
+            return None
+        kind, pk = len(self.KINDS), 0
+        parsed = parse_datetime(since)
+        if parsed is None:
+            try:
+                moment, kind, pk = base64.urlsafe_b64decode(since.encode()).decode().split('|')
+                parsed, kind, pk = parse_datetime(moment), int(kind), int(pk)
+            except (binascii.Error, UnicodeError, ValueError):
+                parsed = None
+            if parsed is None or not 0 <= kind < len(self.KINDS):
+                raise ValidationError({'since': "Curseur invalide."})
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed, kind, pk
+
+    @staticmethod
+    def after(queryset, field, kind, since):
+        """Lignes de type ``kind`` postérieures à la position ``since``."""
+        if since is None:
+            return queryset
+        moment, since_kind, pk = since
+        if kind < since_kind:
+            return queryset.filter(**{f'{field}__gt': moment})
+        if kind > since_kind:
+            return queryset.filter(**{f'{field}__gte': moment})
+        # Borne sur l'instant d'abord, pour un parcours d'index borné
+        return queryset.filter(
+            Q(**{f'{field}__gte': moment}), Q(**{f'{field}__gt': moment}) | Q(**{field: moment, 'id__gt': pk}),
+        )
+
+    def list(self, request, project_pk=None):
+        since = self.get_since(request)
+        limit = self.get_page_size(request)
+
+        issues = self.after(Issue.objects.filter(project_id=project_pk), 'updated_time', 0, since)
+        comments = self.after(Comment.objects.filter(issue__project_id=project_pk), 'updated_time', 1, since)
+        tombstones = self.after(Tombstone.objects.filter(project_id=project_pk), 'deleted_time', 2, since)
+
+        # Chaque source fournit au plus limit + 1 éléments : les ``limit`` premiers
+        # de la fusion sont donc exacts.
+        changes = sorted(
+            [(obj.updated_time, 0, obj) for obj in issues.order_by('updated_time', 'id')[:limit + 1]]
+            + [(obj.updated_time, 1, obj) for obj in comments.order_by('updated_time', 'id')[:limit + 1]]
+            + [(obj.deleted_time, 2, obj) for obj in tombstones.order_by('deleted_time', 'id')[:limit + 1]],
+            key=lambda change: (change[0], change[1], change[2].pk),
+        )
+        has_more = len(changes) > limit
+        page = changes[:limit]
+
+        if page:
+            moment, kind, obj = page[-1]
+            cursor = self.encode_cursor((moment, kind, obj.pk))
+        else:
+            cursor = request.query_params.get('since')
+        context = {'request': request}
+        return Response({
+            'issues': IssueChangeSerializer(
+                [obj for _, kind, obj in page if kind == 0], many=True, context=context
+            ).data,
+            'comments': CommentChangeSerializer(
+                [obj for _, kind, obj in page if kind == 1], many=True, context=context
+            ).data,
+            'deleted': TombstoneSerializer(
+                [obj for _, kind, obj in page if kind == 2], many=True, context=context
+            ).data,
+            'cursor': cursor or None,
+            'has_more': has_more,
+        })
+
+
+class SearchViewSet(viewsets.ViewSet):
+    """
+    Recherche plein texte dans les issues et commentaires d'un projet :
+    ``?q=<texte>&page=<n>&page_size=<n>``. Résultats classés par pertinence,
+    termes trouvés surlignés (voir ``projects.search`` pour les backends).
+    """
+    permission_classes = [permissions.IsAuthenticated, IsContributor]
+    pagination_class = CustomPageNumberPagination
+
+    def list(self, request, project_pk=None):
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            raise ValidationError({'q': "Ce paramètre est obligatoire."})
+        paginator = self.pagination_class()
+        try:
+            page = max(1, int(request.query_params.get(paginator.page_query_param, 1)))
+        except ValueError:
+            raise ValidationError({paginator.page_query_param: "Doit être un entier."})
+        page_size = paginator.get_page_size(request)
+
+        # Un élément de plus pour savoir s'il existe une page suivante, sans COUNT
+        hits = search.get_backend().search(
+            project_pk, query, limit=page_size + 1, offset=(page - 1) * page_size
+        )
+        next_url = None
+        if len(hits) > page_size:
+            next_url = replace_query_param(
+                request.build_absolute_uri(), paginator.page_query_param, page + 1
+            )
+        return Response({'next': next_url, 'results': hits[:page_size]})
+
+
+class MyWorkViewSet(viewsets.ViewSet):
+    """
+    Issues dont l'utilisateur est assignee ou auteur (``?role=assignee|author``
+    pour n'en garder qu'un), dans tous ses projets, les plus récemment modifiées
+    d'abord, avec leur projet et leurs ``?comments=`` derniers commentaires
+    (3 par défaut). Pagination par curseur : suivre ``next``. Voir ``projects.feed``.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CustomPageNumberPagination
+    max_comments = 10
+
+    def get_roles(self, request):
+        role = request.query_params.get('role')
+        if role is None:
+            return list(feed.ROLES)
+        if role not in feed.ROLES:
+            raise ValidationError({'role': f"Valeurs possibles : {', '.join(feed.ROLES)}."})
+        return [role]
+
+    def get_comments(self, request):
+        try:
+            comments = int(request.query_params.get('comments', 3))
+        except ValueError:
+            comments = -1
+        if not 0 <= comments <= self.max_comments:
+            raise ValidationError({'comments': f"Entier entre 0 et {self.max_comments} attendu."})
+        return comments
+
+    def list(self, request):
+        cursor = request.query_params.get('cursor')
+        try:
+            position = feed.decode_cursor(cursor) if cursor else None
+        except ValueError:
+            raise ValidationError({'cursor': "Curseur invalide."})
+        limit = self.pagination_class().get_page_size(request)
+        results, next_cursor = feed.page(
+            request.user, self.get_roles(request), position, limit, self.get_comments(request),
+        )
+        next_url = None
+        if next_cursor is not None:
+            next_url = replace_query_param(request.build_absolute_uri(), 'cursor', next_cursor)
+        return Response({'next': next_url, 'results': results})
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Tâches de fond lancées par l'utilisateur : état, avancement, résultat."""
+    serializer_class = JobSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = CustomPageNumberPagination
+
+    def get_queryset(self):
+        return Job.objects.filter(created_by=self.request.user).order_by('-id')
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Fichier produit par une tâche d'export terminée."""
+        job = self.get_object()
+        if job.kind != Job.EXPORT_PROJECT or job.status != Job.SUCCEEDED:
+            raise Http404
+        path = jobs.export_dir() / job.result['file']
+        if not path.exists():
+            raise Http404
+        return FileResponse(
+            open(path, 'rb'), as_attachment=True, filename=job.result['file'],
+            content_type=job.result['content_type'],
+        )
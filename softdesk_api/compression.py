@@ -0,0 +1,136 @@
+"""
+Compression des réponses négociée sur ``Accept-Encoding``.
+
+Contrairement à ``GZipMiddleware`` de Django :
+
+- Brotli (``br``) est proposé quand le paquet ``brotli`` est installé ; gzip
+  sinon, ou si le client ne l'accepte pas. Les valeurs ``q`` du client sont
+  respectées, à égalité l'ordre de ``SOFTDESK_COMPRESSION_ENCODINGS`` décide.
+- Seules les réponses d'au moins ``SOFTDESK_COMPRESSION_MIN_SIZE`` octets et
+  d'un type de ``SOFTDESK_COMPRESSION_TYPES`` sont compressées : sous ce
+  seuil, le gain ne paie pas le temps CPU.
+- Les réponses en flux (exports, événements) ne sont pas touchées, pour que
+  chaque morceau parte dès qu'il est produit.
+
+Comme Django, un ETag fort devient faible et gzip ajoute quelques octets
+aléatoires dans l'en-tête (atténuation de BREACH).
+"""
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.utils.cache import patch_vary_headers
+from django.utils.text import compress_string
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+DEFAULT_TYPES = (
+    'application/json', 'application/x-ndjson', 'application/javascript', 'text/',
+)
+
+
+def compress_gzip(content):
+    return compress_string(content, max_random_bytes=100)
+
+
+def compress_brotli(content):
+    return brotli.compress(content, quality=getattr(settings, 'SOFTDESK_BROTLI_QUALITY', 4))
+
+
+ENCODERS = {'gzip': compress_gzip}
+if brotli is not None:
+    ENCODERS['br'] = compress_brotli
+
+
+def available_encodings():
+    """Encodages utilisables, par ordre de préférence du serveur."""
+    preferred = getattr(settings, 'SOFTDESK_COMPRESSION_ENCODINGS', ('br', 'gzip'))
+    return [encoding for encoding in preferred if encoding in ENCODERS]
+
+
+def parse_accept_encoding(header):
+    """``'gzip;q=0.5, br'`` -> ``{'gzip': 0.5, 'br': 1.0}``."""
+    qualities = {}
+    for part in header.split(','):
+        coding, *params = [item.strip() for item in part.split(';')]
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params:
+            name, _, value = param.partition('=')
+            if name.strip().lower() == 'q':
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        qualities[coding.lower()] = quality
+    return qualities
+
+
+def choose_encoding(header, encodings):
+    """Encodage accepté de plus grande qualité ; ``None`` pour ne pas compresser."""
+    qualities = parse_accept_encoding(header)
+    wildcard = qualities.get('*', 0.0)
+    best, best_quality = None, 0.0
+    for encoding in encodings:
+        quality = qualities.get(encoding, wildcard)
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+def is_compressible(response):
+    content_type = response.get('Content-Type', '').split(';')[0].strip().lower()
+    types = getattr(settings, 'SOFTDESK_COMPRESSION_TYPES', DEFAULT_TYPES)
+    return any(
+        content_type.startswith(prefix) if prefix.endswith('/') else content_type == prefix
+        for prefix in types
+    )
+
+
+class CompressionMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SOFTDESK_COMPRESSION', True):
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return self.process_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return self.process_response(request, await self.get_response(request))
+
+    def process_response(self, request, response):
+        if (
+            response.streaming
+            or response.has_header('Content-Encoding')
+            or len(response.content) < getattr(settings, 'SOFTDESK_COMPRESSION_MIN_SIZE', 1024)
+            or not is_compressible(response)
+        ):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+        encoding = choose_encoding(request.META.get('HTTP_ACCEPT_ENCODING', ''), available_encodings())
+        if encoding is None:
+            return response
+        compressed = ENCODERS[encoding](response.content)
+        if len(compressed) >= len(response.content):
+            return response
+
+        response.content = compressed
+        response.headers['Content-Length'] = str(len(compressed))
+        response.headers['Content-Encoding'] = encoding
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        return response
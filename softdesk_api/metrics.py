@@ -0,0 +1,299 @@
+"""
+Instrumentation des requêtes : nombre de requêtes SQL, temps passé en base,
+temps de rendu (sérialisation JSON) et temps total, par route et par action.
+
+Les mesures sont agrégées dans des histogrammes en mémoire (par processus) et
+exposées au format texte Prometheus par ``metrics_view``. Avec
+``SOFTDESK_METRICS = False`` le middleware se retire de la chaîne au démarrage
+(``MiddlewareNotUsed``) : il ne reste qu'une lecture de variable de contexte
+par requête SQL.
+
+Les requêtes SQL sont comptées par ``record_query``, posé sur chaque connexion
+à sa création (``connection_created``). La requête HTTP en cours est lue dans
+une variable de contexte : sous ASGI, les accès à la base se font dans
+d'autres threads (``sync_to_async``), qui en reçoivent une copie.
+
+Réglages :
+- ``SOFTDESK_METRICS`` : active la collecte (défaut : ``False``) ;
+- ``SOFTDESK_SLOW_QUERY_MS`` : journalise sur ``softdesk.metrics`` chaque
+  requête SQL plus lente que ce seuil (défaut : ``None``, désactivé) ;
+- ``SOFTDESK_SLOW_REQUEST_MS`` : idem pour les requêtes HTTP entières.
+
+Pour une réponse en flux (export), seul le temps jusqu'au premier octet est
+mesuré : les requêtes faites pendant l'itération ne sont pas comptées.
+"""
+import contextvars
+import logging
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, Http404
+
+logger = logging.getLogger('softdesk.metrics')
+
+LABELS = ('endpoint', 'action', 'method')
+TIME_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+
+REQUEST_ATTR = '_softdesk_metrics'
+
+
+def escape(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_labels(names, values, extra=()):
+    pairs = [f'{name}="{escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{escape(value)}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def format_number(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value)) if abs(value) < 1e15 else repr(value)
+    return repr(value)
+
+
+class Histogram:
+    """Histogramme cumulatif à étiquettes, sûr entre threads."""
+
+    def __init__(self, name, documentation, buckets, labels=LABELS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets)
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._series = {}  # valeurs d'étiquettes -> [compteurs par seau, somme, total]
+
+    def observe(self, labels, value):
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+                    break
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {labels: (list(counts), total, count) for labels, (counts, total, count) in self._series.items()}
+
+    def clear(self):
+        with self._lock:
+            self._series.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total, count) in sorted(self.snapshot().items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts + [count - sum(counts)]):
+                cumulative += bucket_count
+                label_text = format_labels(self.labels, labels, [('le', format_number(float(bound)))])
+                lines.append(f'{self.name}_bucket{label_text} {cumulative}')
+            label_text = format_labels(self.labels, labels)
+            lines.append(f'{self.name}_sum{label_text} {format_number(total)}')
+            lines.append(f'{self.name}_count{label_text} {count}')
+        return lines
+
+
+class Counter:
+
+    def __init__(self, name, documentation, labels=LABELS + ('status',)):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def inc(self, labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self._values)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.documentation}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(self.snapshot().items()):
+            lines.append(f'{self.name}{format_labels(self.labels, labels)} {value}')
+        return lines
+
+
+REQUESTS = Counter('softdesk_requests_total', 'Requêtes HTTP traitées.')
+DURATION = Histogram('softdesk_request_duration_seconds', 'Temps total de traitement.', TIME_BUCKETS)
+DB_TIME = Histogram('softdesk_request_db_seconds', 'Temps passé dans les requêtes SQL.', TIME_BUCKETS)
+RENDER_TIME = Histogram(
+    'softdesk_request_render_seconds', 'Temps de rendu de la réponse (sérialisation).', TIME_BUCKETS
+)
+QUERIES = Histogram('softdesk_request_queries', 'Nombre de requêtes SQL par requête HTTP.', QUERY_BUCKETS)
+
+REGISTRY = [REQUESTS, DURATION, DB_TIME, RENDER_TIME, QUERIES]
+
+
+def render_metrics():
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return '\n'.join(lines) + '\n'
+
+
+def reset():
+    for metric in REGISTRY:
+        metric.clear()
+
+
+_current = contextvars.ContextVar('softdesk_metrics', default=None)
+
+
+def instrument_connection(sender, connection, **kwargs):
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+def record_query(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    return stats(execute, sql, params, many, context)
+
+
+class RequestStats:
+    __slots__ = ('queries', 'db_time', 'render_time', 'render_start')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_time = 0.0
+        self.render_time = 0.0
+        self.render_start = None
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.queries += 1
+            self.db_time += elapsed
+            threshold = getattr(settings, 'SOFTDESK_SLOW_QUERY_MS', None)
+            if threshold is not None and elapsed * 1000 >= threshold:
+                logger.warning(
+                    'Requête SQL lente (%.1f ms) sur %s : %s',
+                    elapsed * 1000, context['connection'].alias, sql,
+                )
+
+
+def resolve_action(view_func, method):
+    """Action DRF (``list``, ``retrieve``, ``bulk``...) ou nom de la vue."""
+    actions = getattr(view_func, 'actions', None)
+    if actions:
+        return actions.get(method.lower(), method.lower())
+    return getattr(view_func, '__name__', '')
+
+
+class MetricsMiddleware:
+    """
+    À placer en tête de ``MIDDLEWARE`` pour que le temps total couvre les
+    autres middlewares. Les routes sont identifiées par leur nom d'URL
+    (``project-issues-list``), jamais par le chemin, pour borner le nombre de
+    séries.
+
+    Synchrone ou asynchrone selon la chaîne : sous ASGI, aucun passage par un
+    thread n'est ajouté aux vues asynchrones.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not getattr(settings, 'SOFTDESK_METRICS', False):
+            raise MiddlewareNotUsed()
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Django adapte les hooks au mode de la chaîne d'après leur type
+            self.process_template_response = self.aprocess_template_response
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        stats = RequestStats()
+        setattr(request, REQUEST_ATTR, stats)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    async def __acall__(self, request):
+        stats = RequestStats()
+        setattr(request, REQUEST_ATTR, stats)
+        token = _current.set(stats)
+        start = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        self.record(request, response, stats, time.perf_counter() - start)
+        return response
+
+    def process_template_response(self, request, response):
+        return self.start_render(request, response)
+
+    async def aprocess_template_response(self, request, response):
+        return self.start_render(request, response)
+
+    def start_render(self, request, response):
+        # Les réponses DRF sont rendues juste après ce hook
+        stats = getattr(request, REQUEST_ATTR, None)
+        if stats is not None:
+            stats.render_start = time.perf_counter()
+            response.add_post_render_callback(lambda rendered: self.rendered(stats))
+        return response
+
+    @staticmethod
+    def rendered(stats):
+        stats.render_time = time.perf_counter() - stats.render_start
+
+    def record(self, request, response, stats, elapsed):
+        # Route résolue par le handler : pas de hook process_view à adapter
+        match = getattr(request, 'resolver_match', None)
+        endpoint = match.view_name if match is not None else '<unresolved>'
+        if endpoint == 'metrics':
+            return
+        action = resolve_action(match.func, request.method) if match is not None else ''
+        labels = (endpoint, action, request.method)
+        REQUESTS.inc(labels + (str(response.status_code),))
+        DURATION.observe(labels, elapsed)
+        DB_TIME.observe(labels, stats.db_time)
+        RENDER_TIME.observe(labels, stats.render_time)
+        QUERIES.observe(labels, stats.queries)
+        threshold = getattr(settings, 'SOFTDESK_SLOW_REQUEST_MS', None)
+        if threshold is not None and elapsed * 1000 >= threshold:
+            logger.warning(
+                'Requête lente (%.1f ms, %d requêtes SQL, %.1f ms en base) : %s %s',
+                elapsed * 1000, stats.queries, stats.db_time * 1000, request.method, request.get_full_path(),
+            )
+
+
+def metrics_view(request):
+    """Exposition Prometheus (format texte 0.0.4) des métriques du processus."""
+    if not getattr(settings, 'SOFTDESK_METRICS', False):
+        raise Http404()
+    return HttpResponse(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,41 @@
+"""
+Rendu JSON par ``orjson`` quand il est installé (dépendance optionnelle).
+
+``FastJSONRenderer`` produit les mêmes octets que le ``JSONRenderer`` de DRF
+pour les réponses compactes : séparateurs courts, UTF-8 sans échappement
+ASCII, U+2028 et U+2029 échappés. Les types qu'``orjson`` ne connaît pas, et
+les dates (formatées par DRF en millisecondes et ``Z``), passent par
+l'encodeur de DRF. Sans ``orjson``, ou pour une sortie indentée (API
+navigable, ``Accept: application/json; indent=4``), le rendu est celui de DRF.
+"""
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+ORJSON_OPTIONS = (
+    orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson is not None else 0
+)
+
+
+class FastJSONRenderer(JSONRenderer):
+
+    def can_use_orjson(self, accepted_media_type, renderer_context):
+        return (
+            orjson is not None and self.compact and not self.ensure_ascii
+            and self.get_indent(accepted_media_type, renderer_context) is None
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None or not self.can_use_orjson(accepted_media_type, renderer_context or {}):
+            return super().render(data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(data, default=self.encoder_class().default, option=ORJSON_OPTIONS)
+        except (orjson.JSONEncodeError, TypeError):
+            # Entier de plus de 64 bits, récursion trop profonde... : rendu de DRF
+            return super().render(data, accepted_media_type, renderer_context)
+        # Comme JSONRenderer : sous-ensemble strict de JavaScript
+        return ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
@@ -0,0 +1,269 @@
+"""
+Lectures sur réplicas pour les viewsets des applications ``projects`` et ``users``.
+
+- ``ReplicaRoutingMiddleware`` marque les requêtes GET/HEAD/OPTIONS servies par
+  ces applications (variable de contexte, donc sûre entre threads et tâches
+  ASGI) ; ``ReplicaRouter`` envoie alors leurs lectures vers un réplica.
+  Tout le reste (écritures, commandes, admin, migrations) reste sur ``default``.
+- Lecture après écriture : une écriture réussie pose un cookie signé de courte
+  durée (``SOFTDESK_REPLICA_PIN_SECONDS``) qui renvoie les lectures de cet
+  utilisateur vers le primaire. Un client sans cookies envoie l'en-tête
+  ``X-Pin-Primary: 1`` pendant ce délai.
+- Choix du réplica (``SOFTDESK_REPLICA_STRATEGY``) : ``round_robin`` ou
+  ``lag`` (le moins en retard). Avec ``SOFTDESK_REPLICA_MAX_LAG``, un réplica
+  trop en retard est écarté ; sans réplica utilisable, on lit le primaire.
+  Le choix est fait à la première lecture puis gardé pour toute la requête :
+  le total d'une liste et sa page viennent du même réplica.
+
+Le retard est mesuré par ``replica_lag()`` et gardé en mémoire
+``SOFTDESK_REPLICA_LAG_REFRESH`` secondes. En local, la commande
+``simulate_replication`` copie la base SQLite primaire vers les réplicas.
+"""
+import contextvars
+import itertools
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+from django.utils.functional import SimpleLazyObject, empty
+
+PIN_COOKIE = 'softdesk_pin'
+PIN_HEADER = 'HTTP_X_PIN_PRIMARY'
+PIN_SALT = 'softdesk.replicas.pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+REPLICATION_TABLE = 'softdesk_replication'
+
+_read_context = contextvars.ContextVar('softdesk_read_context', default=None)
+
+
+def get_replicas():
+    return list(getattr(settings, 'SOFTDESK_READ_REPLICAS', ()))
+
+
+class ReadContext:
+    """Requête en cours de lecture ; ``pinned_user`` vient du cookie d'épinglage."""
+    __slots__ = ('request', 'pinned_user', 'forced', 'used_replica', 'alias')
+
+    def __init__(self, request, pinned_user, forced):
+        self.request = request
+        self.pinned_user = pinned_user
+        self.forced = forced
+        self.used_replica = False
+        self.alias = None
+
+    def replica(self):
+        """Base de lecture de la requête, choisie une seule fois (primaire si aucun réplica n'est utilisable)."""
+        if self.alias is None:
+            self.alias = choose_replica() or DEFAULT_DB_ALIAS
+        return self.alias
+
+    def pinned(self):
+        if self.forced:
+            return True
+        if self.pinned_user is None:
+            return False
+        # L'utilisateur n'est connu qu'après l'authentification DRF : d'ici là,
+        # un cookie valide suffit à rester sur le primaire. L'utilisateur
+        # paresseux de la session n'est pas évalué (il ferait une requête).
+        user = getattr(self.request, 'user', None)
+        if user is None or (isinstance(user, SimpleLazyObject) and user._wrapped is empty):
+            return True
+        if not user.is_authenticated:
+            return True
+        return str(user.pk) == self.pinned_user
+
+
+def reading_from_replica():
+    """Indique si la requête en cours a lu (ou lira) sur un réplica."""
+    context = _read_context.get()
+    return context is not None and context.used_replica
+
+
+# Retard des réplicas
+
+_lag_lock = threading.Lock()
+_lag_cache = {}  # alias -> (instant de la mesure, retard en secondes)
+
+
+def replica_lag(alias):
+    """Retard de réplication en secondes ; ``None`` si inconnu (réplica écarté)."""
+    connection = connections[alias]
+    try:
+        with connection.cursor() as cursor:
+            if connection.vendor == 'postgresql':
+                cursor.execute(
+                    "SELECT COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)"
+                )
+                return float(cursor.fetchone()[0])
+            if connection.vendor == 'sqlite':
+                # Écrit par simulate_replication à chaque copie
+                cursor.execute(f"SELECT synced_at FROM {REPLICATION_TABLE}")
+                row = cursor.fetchone()
+                return max(0.0, time.time() - row[0]) if row else None
+    except DatabaseError:
+        return None
+    return 0.0
+
+
+def get_lag(alias):
+    refresh = getattr(settings, 'SOFTDESK_REPLICA_LAG_REFRESH', 1.0)
+    now = time.monotonic()
+    with _lag_lock:
+        measured = _lag_cache.get(alias)
+    if measured is not None and now - measured[0] < refresh:
+        return measured[1]
+    lag = replica_lag(alias)
+    with _lag_lock:
+        _lag_cache[alias] = (now, lag)
+    return lag
+
+
+def reset_lag_cache():
+    with _lag_lock:
+        _lag_cache.clear()
+
+
+_round_robin_lock = threading.Lock()
+_round_robin = itertools.count()
+
+
+def choose_replica():
+    replicas = get_replicas()
+    if not replicas:
+        return None
+    strategy = getattr(settings, 'SOFTDESK_REPLICA_STRATEGY', 'round_robin')
+    max_lag = getattr(settings, 'SOFTDESK_REPLICA_MAX_LAG', None)
+
+    if strategy == 'lag' or max_lag is not None:
+        lags = {alias: get_lag(alias) for alias in replicas}
+        replicas = [
+            alias for alias in replicas
+            if lags[alias] is not None and (max_lag is None or lags[alias] <= max_lag)
+        ]
+        if not replicas:
+            return None
+        if strategy == 'lag':
+            return min(replicas, key=lags.get)
+
+    with _round_robin_lock:
+        index = next(_round_robin)
+    return replicas[index % len(replicas)]
+
+
+def replicate(target, source=DEFAULT_DB_ALIAS, synced_at=None):
+    """
+    Réplication simulée SQLite vers SQLite : copie complète par l'API de
+    sauvegarde, puis date de la copie dans ``softdesk_replication`` (lue par
+    ``replica_lag``).
+    """
+    source_connection, target_connection = connections[source], connections[target]
+    source_connection.ensure_connection()
+    target_connection.ensure_connection()
+    synced_at = time.time() if synced_at is None else synced_at
+    source_connection.connection.backup(target_connection.connection)
+    with target_connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE IF NOT EXISTS {REPLICATION_TABLE} (synced_at REAL NOT NULL)")
+        cursor.execute(f"DELETE FROM {REPLICATION_TABLE}")
+        cursor.execute(f"INSERT INTO {REPLICATION_TABLE} (synced_at) VALUES (%s)", [synced_at])
+
+
+class ReplicaRouter:
+
+    def db_for_read(self, model, **hints):
+        context = _read_context.get()
+        if context is None or context.pinned():
+            return DEFAULT_DB_ALIAS
+        alias = context.replica()
+        if alias == DEFAULT_DB_ALIAS:
+            return alias
+        context.used_replica = True
+        return alias
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Les réplicas sont des copies du primaire
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Le schéma arrive sur les réplicas par la réplication
+        return db not in get_replicas()
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Active la lecture sur réplica pour les requêtes sûres des applications de
+    ``SOFTDESK_REPLICA_APPS`` et pose le cookie d'épinglage après une écriture.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+            # Django adapte les hooks au mode de la chaîne d'après leur type
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        # set() plutôt que reset(token) : sous ASGI, process_view peut
+        # s'exécuter dans un autre contexte que __call__
+        _read_context.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _read_context.set(None)
+        self.process_response(request, response)
+        return response
+
+    async def __acall__(self, request):
+        _read_context.set(None)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _read_context.set(None)
+        self.process_response(request, response)
+        return response
+
+    def process_response(self, request, response):
+        if request.method not in SAFE_METHODS and response.status_code < 400:
+            self.pin(request, response)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        self.route_reads(request, view_func)
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        # Même tâche que la vue : la variable de contexte lui parvient
+        self.route_reads(request, view_func)
+
+    def route_reads(self, request, view_func):
+        if request.method not in SAFE_METHODS or not get_replicas():
+            return
+        owner = getattr(view_func, 'cls', view_func)
+        app = owner.__module__.split('.')[0]
+        if app not in getattr(settings, 'SOFTDESK_REPLICA_APPS', ('projects', 'users')):
+            return
+        _read_context.set(ReadContext(request, self.pinned_user(request), bool(request.META.get(PIN_HEADER))))
+
+    @staticmethod
+    def pinned_user(request):
+        # Cookie absent, falsifié ou expiré : None
+        return request.get_signed_cookie(
+            PIN_COOKIE, default=None, salt=PIN_SALT, max_age=getattr(settings, 'SOFTDESK_REPLICA_PIN_SECONDS', 5),
+        )
+
+    @staticmethod
+    def pin(request, response):
+        user = getattr(request, 'user', None)
+        if not get_replicas() or user is None or not user.is_authenticated:
+            return
+        response.set_signed_cookie(
+            PIN_COOKIE, str(user.pk), salt=PIN_SALT, max_age=getattr(settings, 'SOFTDESK_REPLICA_PIN_SECONDS', 5),
+            httponly=True, samesite='Lax',
+        )
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -43,6 +44,11 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # En tête pour mesurer toute la chaîne (voir softdesk_api/metrics.py)
+    'softdesk_api.metrics.MetricsMiddleware',
+    # Avant CommonMiddleware et les autres : compresse la réponse finale
+    'softdesk_api.compression.CompressionMiddleware',
+    'softdesk_api.replicas.ReplicaRoutingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -79,10 +85,106 @@ WSGI_APPLICATION = 'softdesk_api.wsgi.application'
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+        'NAME': os.environ.get('SOFTDESK_DB_PATH', BASE_DIR / 'db.sqlite3'),
     }
 }
 
+# Profil de base choisi par SOFTDESK_DB_PROFILE (« development » par défaut).
+# « production » : connexions persistantes et PRAGMA SQLite appliqués à chaque
+# nouvelle connexion (voir softdesk_api/sqlite.py).
+SOFTDESK_DB_PROFILE = os.environ.get('SOFTDESK_DB_PROFILE', 'development')
+SOFTDESK_SQLITE_PRAGMAS = {}
+
+if SOFTDESK_DB_PROFILE == 'production':
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {
+            'timeout': 20,  # attente d'un verrou (secondes) avant « database is locked »
+        },
+    })
+    SOFTDESK_SQLITE_PRAGMAS = {
+        'journal_mode': 'WAL',  # lecteurs et écrivain concurrents
+        'synchronous': 'NORMAL',  # sûr en WAL, un fsync par checkpoint
+        'mmap_size': 256 * 1024 * 1024,
+        'cache_size': -64 * 1024,  # en Kio : 64 Mio par connexion
+        'busy_timeout': 20000,  # millisecondes
+        'temp_store': 'MEMORY',
+    }
+elif SOFTDESK_DB_PROFILE != 'development':
+    raise ValueError(f"SOFTDESK_DB_PROFILE inconnu : {SOFTDESK_DB_PROFILE!r}")
+
+# Réplicas en lecture (softdesk_api/replicas.py) : alias de DATABASES. En local,
+# SOFTDESK_DB_REPLICA_PATHS (fichiers SQLite séparés par des virgules) déclare
+# replica1, replica2... alimentés par « manage.py simulate_replication ».
+SOFTDESK_READ_REPLICAS = []
+for index, path in enumerate(filter(None, os.environ.get('SOFTDESK_DB_REPLICA_PATHS', '').split(',')), 1):
+    DATABASES[f'replica{index}'] = {**DATABASES['default'], 'NAME': path, 'TEST': {'MIRROR': 'default'}}
+    SOFTDESK_READ_REPLICAS.append(f'replica{index}')
+
+DATABASE_ROUTERS = ['softdesk_api.replicas.ReplicaRouter']
+SOFTDESK_REPLICA_APPS = ('projects', 'users')  # viewsets dont les lectures vont aux réplicas
+SOFTDESK_REPLICA_STRATEGY = 'round_robin'  # ou 'lag' : le réplica le moins en retard
+SOFTDESK_REPLICA_MAX_LAG = None  # secondes ; au-delà, le réplica est écarté
+SOFTDESK_REPLICA_LAG_REFRESH = 1.0  # secondes entre deux mesures du retard
+SOFTDESK_REPLICA_PIN_SECONDS = 5  # lectures sur le primaire après une écriture
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.0/topics/cache/
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    }
+}
+
+# Cache d'appartenance (utilisateur, projet) utilisé par IsContributor
+SOFTDESK_MEMBERSHIP_CACHE = 'default'
+SOFTDESK_MEMBERSHIP_TTL = 300  # secondes
+# Les signaux n'invalident que le cache du processus qui écrit : avec LocMemCache,
+# un contributeur retiré garde son accès sur les autres workers jusqu'à expiration.
+# La durée y est donc bornée par cette valeur ; en production, cache partagé (Redis).
+SOFTDESK_MEMBERSHIP_LOCAL_TTL = 5  # secondes
+# Identifiants des projets d'un utilisateur (?scope=member) mis en cache jusqu'à
+# cette taille ; au-delà, ou à 0, semi-jointure sur Contributor
+SOFTDESK_MEMBER_PROJECTS_CACHE_MAX = 1000
+
+# Cache des réponses de liste (projects.response_cache) ; None pour désactiver
+SOFTDESK_RESPONSE_CACHE = 'default'
+SOFTDESK_RESPONSE_CACHE_TTL = 300  # secondes
+
+# Cache en processus des utilisateurs authentifiés par JWT (users.authentication)
+SOFTDESK_AUTH_CACHE_SIZE = 10000
+SOFTDESK_AUTH_CACHE_TTL = 60  # secondes
+
+# File de tâches de fond (projects.jobs, manage.py run_jobs)
+SOFTDESK_JOB_BATCH_SIZE = 200  # issues supprimées ou exportées entre deux signes de vie
+SOFTDESK_JOB_MAX_ATTEMPTS = 3
+SOFTDESK_EXPORT_DIR = BASE_DIR / 'exports'
+
+# Flux d'activité SSE (projects.events) : MemoryBackend pour un seul processus,
+# DatabaseBackend (journal ActivityEvent) avec plusieurs workers
+SOFTDESK_EVENTS_BACKEND = 'projects.events.MemoryBackend'
+SOFTDESK_EVENTS_HISTORY = 1000  # événements rejouables par projet (Last-Event-ID)
+SOFTDESK_EVENTS_RETENTION = 3600  # secondes de journal gardées par DatabaseBackend
+SOFTDESK_EVENTS_POLL_INTERVAL = 0.5  # secondes entre deux lectures du journal
+SOFTDESK_EVENTS_KEEPALIVE = 15  # secondes entre deux commentaires de maintien
+SOFTDESK_EVENTS_MAX_AGE = 300  # durée d'un flux ; le client se reconnecte
+
+# Compression des réponses (softdesk_api.compression) : Brotli si le paquet
+# brotli est installé, sinon gzip
+SOFTDESK_COMPRESSION = True
+SOFTDESK_COMPRESSION_MIN_SIZE = 1024  # octets ; en dessous, réponse non compressée
+SOFTDESK_COMPRESSION_ENCODINGS = ('br', 'gzip')  # préférence du serveur à qualité égale
+SOFTDESK_BROTLI_QUALITY = 4  # 0-11 : au-delà, le gain de taille coûte cher en CPU
+
+# Métriques par route exposées sur /metrics (softdesk_api.metrics). Désactivées
+# par défaut : /metrics n'est pas authentifié, à restreindre au reverse proxy
+SOFTDESK_METRICS = os.environ.get('SOFTDESK_METRICS') == '1'
+SOFTDESK_SLOW_QUERY_MS = None  # journalise les requêtes SQL plus lentes que ce seuil
+SOFTDESK_SLOW_REQUEST_MS = None
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.0/ref/settings/#auth-password-validators
@@ -128,11 +230,17 @@ AUTH_USER_MODEL = 'users.CustomUser'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWTAuthentication sans chargement de l'utilisateur à chaque requête
+        'users.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
+    'DEFAULT_RENDERER_CLASSES': [
+        # orjson si installé, sinon le JSONRenderer de DRF (softdesk_api/renderers.py)
+        'softdesk_api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 10,
 }
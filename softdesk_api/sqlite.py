@@ -0,0 +1,19 @@
+"""
+Réglage des connexions SQLite (profil « production » de ``settings.py``).
+
+``apply_pragmas`` est branché sur ``connection_created`` : les PRAGMA de
+``SOFTDESK_SQLITE_PRAGMAS`` sont appliqués une fois par connexion, et avec
+``CONN_MAX_AGE`` une connexion sert de nombreuses requêtes.
+"""
+from django.conf import settings
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    if connection.vendor != 'sqlite':
+        return
+    pragmas = getattr(settings, 'SOFTDESK_SQLITE_PRAGMAS', None)
+    if not pragmas:
+        return
+    with connection.cursor() as cursor:
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
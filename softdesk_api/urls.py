@@ -1,5 +1,6 @@
 from django.contrib import admin
 from django.urls import path, include
+from softdesk_api.metrics import metrics_view
 from rest_framework_simplejwt.views import (
     TokenObtainPairView,
     TokenRefreshView,
@@ -11,4 +12,5 @@ urlpatterns = [
     path('api/token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('api/', include('users.urls')),
     path('api/', include('projects.urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
\ No newline at end of file
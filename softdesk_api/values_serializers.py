@@ -0,0 +1,165 @@
+"""
+Sérialisation rapide des listes, en lecture seule, à partir de lignes ``values()``.
+
+Un ``ModelSerializer`` construit une instance de modèle par ligne puis appelle
+``get_attribute`` et ``to_representation`` champ par champ : sur une grande
+page, c'est ce travail Python qui domine. ``ValuesSerializer`` lit les champs
+lisibles du serializer de référence une fois pour toutes (colonne ``values()``
+et conversion éventuelle), puis construit chaque dict par ``zip`` sur un
+``itemgetter``. Seules les dates sont converties, directement par
+``isoformat()`` ; les autres types courants sont déjà au bon format en sortie
+de la base.
+
+Le JSON produit est identique à celui du serializer de référence (mêmes clés,
+même ordre, mêmes formats) ; un champ qui ne correspond pas à une colonne
+(méthode, lien, source pointée) lève ``ImproperlyConfigured``.
+"""
+from functools import cache
+from operator import itemgetter
+
+from django.conf import settings
+from django.core.exceptions import FieldDoesNotExist, ImproperlyConfigured
+from django.utils import timezone
+from rest_framework import ISO_8601, fields, relations
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+# Champs DRF dont to_representation() rend la valeur de la base inchangée
+IDENTITY_FIELDS = (
+    fields.CharField, fields.IntegerField, fields.BooleanField, fields.ReadOnlyField,
+)
+
+
+def is_identity(field):
+    if isinstance(field, relations.PrimaryKeyRelatedField):
+        return field.pk_field is None
+    if isinstance(field, fields.ChoiceField):
+        # Choix textuels : la chaîne stockée est la représentation
+        return all(isinstance(key, str) for key in field.choices)
+    return isinstance(field, IDENTITY_FIELDS)
+
+
+@cache
+def compile_fields(serializer_class):
+    """
+    Champs lisibles du serializer : ``(clé, colonne, champ)``, le champ valant
+    ``None`` quand la valeur de la base est déjà sa représentation.
+    """
+    serializer = serializer_class()
+    model = serializer.Meta.model
+    compiled = []
+    for field in serializer._readable_fields:
+        if len(field.source_attrs) != 1:
+            raise ImproperlyConfigured(
+                f"{serializer_class.__name__}.{field.field_name} : source sans colonne ({field.source})."
+            )
+        try:
+            model_field = model._meta.get_field(field.source_attrs[0])
+        except FieldDoesNotExist as exc:
+            raise ImproperlyConfigured(
+                f"{serializer_class.__name__}.{field.field_name} : pas de champ de modèle."
+            ) from exc
+        if not model_field.concrete or model_field.many_to_many:
+            raise ImproperlyConfigured(
+                f"{serializer_class.__name__}.{field.field_name} : champ sans colonne."
+            )
+        compiled.append((field.field_name, model_field.attname, None if is_identity(field) else field))
+    return tuple(compiled)
+
+
+def datetime_converter(field, current_timezone):
+    """Comme ``DateTimeField.to_representation``, fuseau résolu une fois par appel."""
+    output_format = getattr(field, 'format', api_settings.DATETIME_FORMAT)
+    if output_format is None:
+        return None
+    field_timezone = getattr(field, 'timezone', current_timezone)
+    iso = output_format.lower() == ISO_8601
+
+    def convert(value):
+        if isinstance(value, str):
+            return value
+        if field_timezone is not None and timezone.is_aware(value):
+            value = value.astimezone(field_timezone)
+        else:
+            value = field.enforce_timezone(value)
+        if not iso:
+            return value.strftime(output_format)
+        value = value.isoformat()
+        return value[:-6] + 'Z' if value.endswith('+00:00') else value
+
+    return convert
+
+
+def date_converter(field):
+    output_format = getattr(field, 'format', api_settings.DATE_FORMAT)
+    if output_format is None:
+        return None
+    if output_format.lower() == ISO_8601:
+        return lambda value: value if isinstance(value, str) else value.isoformat()
+    return lambda value: value.strftime(output_format)
+
+
+def converter(field, current_timezone):
+    if isinstance(field, fields.DateTimeField):
+        return datetime_converter(field, current_timezone)
+    if isinstance(field, fields.DateField):
+        return date_converter(field)
+    return field.to_representation
+
+
+class ValuesSerializer:
+    """
+    Équivalent en lecture seule de ``serializer_class(rows, many=True).data``
+    pour des lignes ``queryset.values(*cls.get_columns())``.
+    """
+    serializer_class = None
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    @classmethod
+    def get_columns(cls):
+        return tuple(column for _, column, _ in compile_fields(cls.serializer_class))
+
+    @property
+    def data(self):
+        compiled = compile_fields(self.serializer_class)
+        keys = tuple(key for key, _, _ in compiled)
+        columns = self.get_columns()
+        getter = itemgetter(*columns) if len(columns) > 1 else (lambda row: (row[columns[0]],))
+        # Le fuseau courant peut être activé par requête : résolu une fois par page
+        current_timezone = timezone.get_current_timezone() if settings.USE_TZ else None
+        converters = [
+            (key, convert) for key, convert in (
+                (key, converter(field, current_timezone)) for key, _, field in compiled if field is not None
+            )
+            if convert is not None
+        ]
+
+        data = []
+        for row in self.rows:
+            item = dict(zip(keys, getter(row)))
+            for key, convert in converters:
+                value = item[key]
+                if value is not None:
+                    item[key] = convert(value)
+            data.append(item)
+        return data
+
+
+class ValuesListMixin:
+    """
+    ``list()`` servi par ``values_serializer_class`` : le queryset de la vue
+    (filtres, ordre, pagination par page ou par curseur) est lu en ``values()``.
+    """
+    values_serializer_class = None
+
+    def list(self, request, *args, **kwargs):
+        serializer_class = self.values_serializer_class
+        if serializer_class is None:
+            return super().list(request, *args, **kwargs)
+        queryset = self.filter_queryset(self.get_queryset()).values(*serializer_class.get_columns())
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response(serializer_class(page).data)
+        return Response(serializer_class(queryset).data)
@@ -0,0 +1,145 @@
+"""
+Authentification JWT sans requête par appel.
+
+``CachedJWTAuthentication`` remplace le chargement complet de ``CustomUser``
+fait par ``JWTAuthentication`` à chaque requête : les quelques colonnes utiles
+(id, username, statut) sont gardées dans un cache LRU avec TTL propre au
+processus, et l'utilisateur est reconstruit comme instance ``CustomUser`` aux
+champs différés. Les vues peuvent donc l'affecter à une clé étrangère
+(``author=request.user``) sans requête ; accéder à un autre champ (email,
+age...) charge l'utilisateur depuis la base à la demande.
+
+Le cache est invalidé par les signaux de ``CustomUser`` (voir ``signals.py``) ;
+le TTL borne le délai pour les autres processus et les ``QuerySet.update()``.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .models import CustomUser
+
+# Dans l'ordre des champs du modèle, comme l'attend Model.from_db()
+SNAPSHOT_FIELDS = [
+    field.attname for field in CustomUser._meta.concrete_fields
+    if field.attname in {'id', 'username', 'is_active', 'is_staff', 'is_superuser', 'password'}
+]
+
+
+class LRUTTLCache:
+    """Cache LRU borné dont les entrées expirent après ``ttl`` secondes."""
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires, value = entry
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+user_cache = LRUTTLCache(
+    maxsize=getattr(settings, 'SOFTDESK_AUTH_CACHE_SIZE', 10000),
+    ttl=getattr(settings, 'SOFTDESK_AUTH_CACHE_TTL', 60),
+)
+
+
+def invalidate_user(user_id):
+    user_cache.delete(user_id)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+
+    @staticmethod
+    def get_user_id(validated_token):
+        try:
+            return validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+
+    @staticmethod
+    def snapshot_queryset(user_id):
+        # Lu sur le primaire : un compte tout juste créé n'est peut-être pas
+        # encore sur les réplicas, et l'instantané reste en cache
+        return CustomUser.objects.db_manager(router.db_for_write(CustomUser)).filter(**{api_settings.USER_ID_FIELD: user_id}).values_list(*SNAPSHOT_FIELDS)
+
+    def get_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        snapshot = user_cache.get(user_id)
+        if snapshot is None:
+            snapshot = self.snapshot_queryset(user_id).first()
+            if snapshot is not None:
+                user_cache.set(user_id, snapshot)
+        return self.build_user(snapshot, validated_token)
+
+    async def aget_user(self, validated_token):
+        user_id = self.get_user_id(validated_token)
+        snapshot = user_cache.get(user_id)
+        if snapshot is None:
+            snapshot = await self.snapshot_queryset(user_id).afirst()
+            if snapshot is not None:
+                user_cache.set(user_id, snapshot)
+        return self.build_user(snapshot, validated_token)
+
+    async def aauthenticate(self, request):
+        """Variante asynchrone de ``authenticate()`` pour les vues ASGI (``HttpRequest``)."""
+        header = self.get_header(request)
+        if header is None:
+            return None
+        raw_token = self.get_raw_token(header)
+        if raw_token is None:
+            return None
+        validated_token = self.get_validated_token(raw_token)
+        return await self.aget_user(validated_token), validated_token
+
+    def build_user(self, snapshot, validated_token):
+        if snapshot is None:
+            raise AuthenticationFailed(_("User not found"), code="user_not_found")
+
+        # Nouvelle instance à chaque requête : le cache ne partage que des tuples
+        user = CustomUser.from_db(router.db_for_write(CustomUser), SNAPSHOT_FIELDS, snapshot)
+
+        if not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(
+                api_settings.REVOKE_TOKEN_CLAIM
+            ) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(
+                    _("The user's password has been changed."), code="password_changed"
+                )
+
+        return user
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from softdesk_api.values_serializers import ValuesSerializer
 from .models import CustomUser
 
 class UserSerializer(serializers.ModelSerializer):
@@ -10,3 +11,6 @@ class UserSerializer(serializers.ModelSerializer):
     def create(self, validated_data):
         user = CustomUser.objects.create_user(**validated_data)
         return user
+
+class UserValuesSerializer(ValuesSerializer):
+    serializer_class = UserSerializer
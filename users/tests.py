@@ -1,3 +1,68 @@
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
 
-# Create your tests here.
+from .authentication import CachedJWTAuthentication, user_cache
+from .models import CustomUser
+from .serializers import UserSerializer, UserValuesSerializer
+
+
+class CachedJWTAuthenticationTests(TestCase):
+
+    def setUp(self):
+        user_cache.clear()
+        self.user = CustomUser.objects.create_user(
+            username='alice', password='password123', email='alice@example.com'
+        )
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def user_queries(self, url='/api/projects/'):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        return response, [q for q in ctx.captured_queries if 'users_customuser' in q['sql']]
+
+    def test_cache_hit_skips_user_lookup(self):
+        self.user_queries()
+        response, queries = self.user_queries()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(queries, [])
+
+    def test_deactivation_invalidates(self):
+        self.user_queries()
+        self.user.is_active = False
+        self.user.save()
+        response, _ = self.user_queries()
+        self.assertEqual(response.status_code, 401)
+
+    def test_user_can_be_used_as_foreign_key(self):
+        self.user_queries()
+        response = self.client.post(
+            '/api/projects/', {'name': 'P', 'description': 'd', 'type': 'IOS'}
+        )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['author'], self.user.pk)
+
+    def test_full_model_loaded_on_demand(self):
+        self.user_queries()
+        user = CachedJWTAuthentication().get_user(AccessToken.for_user(self.user))
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(user.email, 'alice@example.com')
+        self.assertEqual(len(ctx.captured_queries), 1)
+
+
+class UserValuesSerializerTests(TestCase):
+
+    def test_parity(self):
+        CustomUser.objects.create_user(username='bob', password='password123', age=30, can_be_contacted=True)
+        CustomUser.objects.create_user(username='carol', password='password123')
+        users = CustomUser.objects.order_by('username')
+        rows = users.values(*UserValuesSerializer.get_columns())
+        self.assertEqual(
+            JSONRenderer().render(UserValuesSerializer(rows).data),
+            JSONRenderer().render(UserSerializer(users, many=True).data),
+        )
+        self.assertNotIn('password', UserValuesSerializer(rows).data[0])
@@ -1,11 +1,13 @@
 from rest_framework import viewsets, serializers
 from rest_framework.permissions import AllowAny
 from .models import CustomUser
-from .serializers import UserSerializer
+from softdesk_api.values_serializers import ValuesListMixin
+from .serializers import UserSerializer, UserValuesSerializer
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(ValuesListMixin, viewsets.ModelViewSet):
     queryset = CustomUser.objects.all().order_by('username')  # Ordre alphabétique par nom d'utilisateur
     serializer_class = UserSerializer
+    values_serializer_class = UserValuesSerializer  # liste sans instance de modèle
 
     # Allow any user to create accounts, restrict other operations
     def get_permissions(self):